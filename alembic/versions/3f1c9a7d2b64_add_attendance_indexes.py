@@ -0,0 +1,28 @@
+"""Add attendance indexes
+
+Revision ID: 3f1c9a7d2b64
+Revises: aec0b01704c7
+Create Date: 2026-10-18 13:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2b64'
+down_revision = 'aec0b01704c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Статистика по парам фильтрует по дате и номеру пары и сортирует по времени
+    op.create_index('ix_attendance_date_lesson_timestamp', 'attendance', ['date', 'lesson_number', 'timestamp'], unique=False)
+    # История и постраничный вывод сортируют по времени
+    op.create_index(op.f('ix_attendance_timestamp'), 'attendance', ['timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_attendance_timestamp'), table_name='attendance')
+    op.drop_index('ix_attendance_date_lesson_timestamp', table_name='attendance')
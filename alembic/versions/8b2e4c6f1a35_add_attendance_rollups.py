@@ -0,0 +1,50 @@
+"""Add attendance rollup tables
+
+Revision ID: 8b2e4c6f1a35
+Revises: 3f1c9a7d2b64
+Create Date: 2026-10-18 15:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4c6f1a35'
+down_revision = '3f1c9a7d2b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Агрегаты посещаемости; историю заполняет utils/backfill_rollups.py
+    op.create_table('attendance_lesson_rollup',
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('lesson_number', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('sum_count', sa.BigInteger(), nullable=False),
+    sa.Column('max_count', sa.Integer(), nullable=False),
+    sa.Column('total_records', sa.Integer(), nullable=False),
+    sa.Column('last_timestamp', sa.DateTime(), nullable=True),
+    sa.Column('last_count', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('date', 'lesson_number')
+    )
+    op.create_table('attendance_hour_rollup',
+    sa.Column('hour', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('sum_count', sa.BigInteger(), nullable=False),
+    sa.Column('max_count', sa.Integer(), nullable=False),
+    sa.Column('total_records', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('hour')
+    )
+    op.create_table('attendance_weekday_rollup',
+    sa.Column('weekday', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('sum_count', sa.BigInteger(), nullable=False),
+    sa.Column('max_count', sa.Integer(), nullable=False),
+    sa.Column('total_records', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('weekday')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('attendance_weekday_rollup')
+    op.drop_table('attendance_hour_rollup')
+    op.drop_table('attendance_lesson_rollup')
@@ -1,7 +1,10 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
+from app.core.attendance_writer import attendance_writer
+from app.core.cache import stats_cache
 from app.core.database import get_db
-from app.models.student import Attendance
+from app.core.export import ExportFormat, keyset_after, keyset_before, stream_query
+from app.models.student import Attendance, AttendanceLessonRollup
 from pydantic import BaseModel
 import datetime
 from typing import Optional, Dict, Any
@@ -56,25 +59,47 @@ def get_lesson_number(time):
     return None  # Вне расписания пар
 
 @router.post("/attendance", response_model=AttendanceRead)
-def create_attendance(att: AttendanceCreate, db: Session = Depends(get_db)):
+def create_attendance(att: AttendanceCreate):
     """
-    Создать новую запись о посещаемости
+    Создать новую запись о посещаемости.
+    
+    Запись сохраняется сразу (в ответе - ее id); записи детекции, ожидающие
+    в буфере отложенной записи, сбрасываются перед ней.
     """
+    current_time = datetime.datetime.now()
+    
     # Если номер пары не указан, определяем его автоматически
     lesson_number = att.lesson_number
     if lesson_number is None:
-        current_time = datetime.datetime.now()
         lesson_number = get_lesson_number(current_time)
     
-    row = Attendance(
-        count=att.count, 
-        lesson_number=lesson_number,
-        date=datetime.datetime.now().date()
-    )
-    db.add(row)
-    db.commit()
-    db.refresh(row)
-    return row
+    return attendance_writer.write(att.count, current_time, lesson_number)
+
+@router.get("/attendance/writer-stats")
+def get_writer_stats():
+    """
+    Получить состояние буфера отложенной записи: количество ожидающих записей и время сбросов
+    """
+    return attendance_writer.stats()
+
+@router.get("/attendance/cache-stats")
+def get_cache_stats():
+    """
+    Получить состояние кэша статистики: попадания, промахи, вытеснения и сбросы
+    """
+    return stats_cache.stats()
+
+def filter_attendance(query, lesson_number=None, date=None):
+    """
+    Применяет фильтры по номеру пары и дате, если они указаны
+    """
+    if lesson_number is not None:
+        query = query.filter(Attendance.lesson_number == lesson_number)
+    
+    if date is not None:
+        query = query.filter(Attendance.date == date)
+    
+    return query
 
 @router.get("/attendance", response_model=list[AttendanceRead])
 def read_attendance(
@@ -82,21 +107,56 @@ def read_attendance(
     limit: int = 100, 
     lesson_number: Optional[int] = None,
     date: Optional[datetime.date] = None,
+    before_timestamp: Optional[datetime.datetime] = None,
+    before_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Получить историю посещаемости с возможностью фильтрации по номеру пары и дате
+    Получить историю посещаемости с возможностью фильтрации по номеру пары и дате.
+    
+    Записи возвращаются от новых к старым. Для следующей страницы передайте
+    timestamp и id последней полученной записи в before_timestamp и before_id -
+    такой курсор работает одинаково быстро на любой глубине, в отличие от skip.
     """
-    query = db.query(Attendance)
+    query = filter_attendance(db.query(Attendance), lesson_number, date)
+    query = keyset_before(query, Attendance.timestamp, Attendance.id, before_timestamp, before_id)
+    query = query.order_by(Attendance.timestamp.desc(), Attendance.id.desc())
     
-    # Применяем фильтры, если они указаны
-    if lesson_number is not None:
-        query = query.filter(Attendance.lesson_number == lesson_number)
+    # skip оставлен для совместимости и применяется только без курсора
+    if before_timestamp is None:
+        query = query.offset(skip)
     
-    if date is not None:
-        query = query.filter(Attendance.date == date)
+    return query.limit(limit).all()
+
+@router.get("/attendance/export")
+def export_attendance(
+    format: ExportFormat = Query("csv", description="Формат выгрузки: csv, ndjson или json"),
+    lesson_number: Optional[int] = None,
+    date: Optional[datetime.date] = None,
+    after_timestamp: Optional[datetime.datetime] = None,
+    after_id: Optional[int] = None,
+):
+    """
+    Выгрузить историю посещаемости файлом (потоком, порциями из БД) в порядке возрастания времени
+    """
+    def build_query(db):
+        query = db.query(
+            Attendance.id,
+            Attendance.timestamp,
+            Attendance.count,
+            Attendance.lesson_number,
+            Attendance.date
+        )
+        query = filter_attendance(query, lesson_number, date)
+        query = keyset_after(query, Attendance.timestamp, Attendance.id, after_timestamp, after_id)
+        return query.order_by(Attendance.timestamp.asc(), Attendance.id.asc())
     
-    return query.order_by(Attendance.timestamp.desc()).offset(skip).limit(limit).all()
+    return stream_query(
+        build_query,
+        ["id", "timestamp", "count", "lesson_number", "date"],
+        format,
+        filename="attendance"
+    )
 
 @router.get("/attendance/by-lesson", response_model=list[AttendanceRead])
 def get_attendance_by_lesson(
@@ -110,20 +170,24 @@ def get_attendance_by_lesson(
     if date is None:
         date = datetime.datetime.now().date()
     
-    # Создаем подзапрос для получения последней записи по каждой паре
-    subquery = db.query(
-        Attendance.lesson_number,
-        func.max(Attendance.timestamp).label('max_timestamp')
-    ).filter(Attendance.date == date).group_by(Attendance.lesson_number).subquery()
-    
-    # Соединяем с основной таблицей, чтобы получить полные записи
-    query = db.query(Attendance).join(
-        subquery,
-        (Attendance.lesson_number == subquery.c.lesson_number) & 
-        (Attendance.timestamp == subquery.c.max_timestamp)
-    )
+    def compute():
+        # Создаем подзапрос для получения последней записи по каждой паре
+        subquery = db.query(
+            Attendance.lesson_number,
+            func.max(Attendance.timestamp).label('max_timestamp')
+        ).filter(Attendance.date == date).group_by(Attendance.lesson_number).subquery()
+        
+        # Соединяем с основной таблицей, чтобы получить полные записи
+        query = db.query(Attendance).join(
+            subquery,
+            (Attendance.lesson_number == subquery.c.lesson_number) & 
+            (Attendance.timestamp == subquery.c.max_timestamp)
+        )
+        
+        return [rec.to_dict() for rec in query.order_by(Attendance.lesson_number).all()]
     
-    return query.order_by(Attendance.lesson_number).all()
+    # Результат кэшируется до записи новых данных за эту дату
+    return stats_cache.get_or_compute(("by-lesson", date), compute, tags=[("date", date)])
 
 @router.get("/attendance/daily-stats")
 def get_daily_stats(
@@ -136,33 +200,40 @@ def get_daily_stats(
     if date is None:
         date = datetime.datetime.now().date()
     
-    # Получаем максимальное количество студентов для каждой пары
-    result = {}
-    for lesson_num in range(1, 9):  # Для пар с 1 по 8
-        max_count = db.query(func.max(Attendance.count)).filter(
-            Attendance.date == date,
-            Attendance.lesson_number == lesson_num
-        ).scalar()
+    def compute():
+        # Максимумы по парам берем из таблицы агрегатов - не более 8 строк за день
+        max_counts = dict(db.query(
+            AttendanceLessonRollup.lesson_number,
+            AttendanceLessonRollup.max_count
+        ).filter(
+            AttendanceLessonRollup.date == date,
+            AttendanceLessonRollup.lesson_number.between(1, 8)
+        ).all())
+        
+        result = {}
+        for lesson_num in range(1, 9):  # Для пар с 1 по 8
+            result[f"lesson_{lesson_num}"] = max_counts.get(lesson_num) or 0
+        
+        # Добавляем информацию о расписании пар
+        lesson_schedule = {
+            "lesson_1": "8:30-10:00",
+            "lesson_2": "10:15-11:45",
+            "lesson_3": "12:00-13:30",
+            "lesson_4": "14:15-15:45",
+            "lesson_5": "16:00-17:30",
+            "lesson_6": "17:40-19:10",
+            "lesson_7": "19:15-20:45",
+            "lesson_8": "20:50-22:20"
+        }
         
-        result[f"lesson_{lesson_num}"] = max_count or 0
-    
-    # Добавляем информацию о расписании пар
-    lesson_schedule = {
-        "lesson_1": "8:30-10:00",
-        "lesson_2": "10:15-11:45",
-        "lesson_3": "12:00-13:30",
-        "lesson_4": "14:15-15:45",
-        "lesson_5": "16:00-17:30",
-        "lesson_6": "17:40-19:10",
-        "lesson_7": "19:15-20:45",
-        "lesson_8": "20:50-22:20"
-    }
-    
-    return {
-        "date": date.isoformat(),
-        "attendance": result,
-        "schedule": lesson_schedule
-    }
+        return {
+            "date": date.isoformat(),
+            "attendance": result,
+            "schedule": lesson_schedule
+        }
+    
+    # Результат кэшируется до записи новых данных за эту дату
+    return stats_cache.get_or_compute(("daily-stats", date), compute, tags=[("date", date)])
 
 @router.get("/attendance/lesson-stats")
 def get_lesson_stats(
@@ -178,45 +249,47 @@ def get_lesson_stats(
     if date is None:
         date = datetime.datetime.now().date()
     
-    # Получаем максимальное количество студентов для указанной пары
-    max_count = db.query(func.max(Attendance.count)).filter(
-        Attendance.date == date,
-        Attendance.lesson_number == lesson_number
-    ).scalar() or 0
-    
-    # Получаем временной ряд посещаемости для данной пары
-    time_series_query = db.query(Attendance).filter(
-        Attendance.date == date,
-        Attendance.lesson_number == lesson_number
-    ).order_by(Attendance.timestamp.asc())
-    
-    time_series = []
-    for record in time_series_query:
-        time_series.append({
-            "timestamp": record.timestamp.isoformat(),
-            "count": record.count
-        })
-    
-    # Получаем текущее/последнее количество студентов
-    current_count = time_series[-1]["count"] if time_series else None
-    
-    # Время начала и окончания пары
-    lesson_times = {
-        1: "8:30-10:00",
-        2: "10:15-11:45",
-        3: "12:00-13:30",
-        4: "14:15-15:45",
-        5: "16:00-17:30",
-        6: "17:40-19:10",
-        7: "19:15-20:45",
-        8: "20:50-22:20"
-    }
-    
-    return {
-        "date": date.isoformat(),
-        "lesson_number": lesson_number,
-        "lesson_time": lesson_times.get(lesson_number, "Неизвестное время"),
-        "max_count": max_count,
-        "current_count": current_count,
-        "time_series": time_series
-    }
\ No newline at end of file
+    def compute():
+        # Получаем временной ряд посещаемости для данной пары (один проход по индексу date, lesson_number, timestamp)
+        time_series_query = db.query(Attendance.timestamp, Attendance.count).filter(
+            Attendance.date == date,
+            Attendance.lesson_number == lesson_number
+        ).order_by(Attendance.timestamp.asc())
+        
+        time_series = [
+            {"timestamp": timestamp.isoformat(), "count": count}
+            for timestamp, count in time_series_query
+        ]
+        
+        # Максимальное и текущее/последнее количество студентов - из таблицы агрегатов
+        rollup = db.get(AttendanceLessonRollup, (date, lesson_number))
+        max_count = rollup.max_count if rollup else 0
+        current_count = rollup.last_count if rollup else None
+        
+        # Время начала и окончания пары
+        lesson_times = {
+            1: "8:30-10:00",
+            2: "10:15-11:45",
+            3: "12:00-13:30",
+            4: "14:15-15:45",
+            5: "16:00-17:30",
+            6: "17:40-19:10",
+            7: "19:15-20:45",
+            8: "20:50-22:20"
+        }
+        
+        return {
+            "date": date.isoformat(),
+            "lesson_number": lesson_number,
+            "lesson_time": lesson_times.get(lesson_number, "Неизвестное время"),
+            "max_count": max_count,
+            "current_count": current_count,
+            "time_series": time_series
+        }
+    
+    # Результат кэшируется до записи новых данных по этой паре
+    return stats_cache.get_or_compute(
+        ("lesson-stats", date, lesson_number),
+        compute,
+        tags=[("lesson", date, lesson_number)]
+    )
@@ -1,40 +1,96 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session
-from app.ml.yolo_detector import detect_people_from_camera, detect_people_from_image, get_available_cameras
+from app.ml import yolo_detector
+from app.ml.yolo_detector import detect_people_from_camera, detect_people_from_image, registry
+from app.ml.camera_inventory import camera_inventory
+from app.ml.model_registry import ModelNotReadyError, ModelNotFoundError
+from app.ml.inference_batcher import QueueFullError
+from app.ml.motion_gate import motion_gate_stats
+from app.ml.tracker import tracker_stats
+from app.ml.frame_cache import lookup_frame, store_frame, frame_cache_stats
+from app.ml.capture_profile import capture_profiler
+from app.ml.camera_scheduler import camera_scheduler
+from app.core.attendance_writer import attendance_writer
+from app.core.config import COUNT_ADJUSTMENT
+from app.core.cache import stats_cache
 from app.core.database import get_db
-from app.models.student import Attendance
+from app.core.log import get_logger, SampledLogger
+from app.core import metrics
+from app.core.export import ExportFormat, keyset_after, keyset_before, stream_query
+from app.core.executors import inference_pool, decode_pool, db_pool, get_executor_stats, PoolOverloadedError
+from app.core.rollups import read_rollup_stats
+from app.models.student import Attendance, AttendanceHourRollup, AttendanceWeekdayRollup
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import base64
 import cv2
 import numpy as np
+import threading
 import time
 import datetime
-import traceback
-from collections import defaultdict
 
 router = APIRouter()
 
+logger = get_logger(__name__)
+sampled_logger = SampledLogger(logger)
+
 # Переменные для отслеживания изменений в количестве людей
 last_count = None
 last_db_save_time = 0
 MIN_SAVE_INTERVAL = 10  # минимальный интервал между записями в БД (в секундах)
+# Проверка интервала и запись времени последнего сохранения - под блокировкой:
+# record_detection может выполняться одновременно в нескольких потоках
+_save_lock = threading.Lock()
+
+# Описание параметра компактного формата ответа
+COMPACT_DESCRIPTION = "Вернуть рамки плоским массивом xyxy вместо списка словарей"
+
+# Описание параметра источника кадров
+SOURCE_DESCRIPTION = ("Идентификатор потока кадров (вкладки, камеры); неизменившиеся кадры источника не прогоняются "
+                      "через модель, люди сопровождаются трекером. Без source каждый кадр обрабатывается отдельно")
+
+# Описание параметра выбора модели
+MODEL_DESCRIPTION = "Название модели детектора (список - /api/v1/models); по умолчанию - основная модель"
+
+# Ошибки перегрузки и незагруженной модели - на них отвечаем 503, а не пустым результатом
+OVERLOAD_ERRORS = (QueueFullError, PoolOverloadedError, ModelNotReadyError)
+# Ошибки детекции, на которые отвечает обработчик приложения (503 или 404 для неизвестной модели)
+DETECTION_ERRORS = (ModelNotFoundError, *OVERLOAD_ERRORS)
 
 class DetectionResult(BaseModel):
     count: int
     boxes: List[Dict[str, Any]]
     camera_id: Optional[int] = 0
     error: Optional[str] = None
+    # Компактный формат: плоский массив координат [x1, y1, x2, y2, ...] и уверенности
+    xyxy: Optional[List[int]] = None
+    conf: Optional[List[float]] = None
+    # Идентификаторы треков рамок (компактный формат; в полном - поле id рамки)
+    ids: Optional[List[int]] = None
+    # False - кадр не изменился и возвращен результат предыдущего инференса
+    inferred: Optional[bool] = None
+    # True - количество и рамки получены из треков источника (на кадрах без инференса - продвинуты трекером)
+    tracked: Optional[bool] = None
+    # True - такой же кадр уже обрабатывался, результат взят из кэша
+    cached: Optional[bool] = None
+    # Модель, выполнившая детекцию
+    model: Optional[str] = None
 
 class CameraInfo(BaseModel):
     id: int
     name: str
     available: bool
+    # Камера уже открыта рабочим потоком захвата (детекция с нее работает, повторно не открывается)
+    busy: bool = False
+    device: Optional[str] = None
 
 class ImageRequest(BaseModel):
     image: str  # base64 encoded image
+    model_name: Optional[str] = None  # название модели (если не указано в параметрах запроса)
 
 class AttendanceRecord(BaseModel):
+    # id вместе с timestamp - курсор следующей страницы (before_id, before_timestamp)
+    id: Optional[int] = None
     timestamp: str
     count: int
 
@@ -50,54 +106,97 @@ class HourStatistics(BaseModel):
     max_count: int
     total_records: int
 
+@metrics.timed_stage("decode")
+def decode_image_bytes(image_bytes):
+    """
+    Декодирует закодированное изображение (JPEG, PNG) в numpy array (BGR) без лишних копий
+    """
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+@metrics.timed_stage("decode_base64")
+def decode_base64(image):
+    """
+    Извлекает байты изображения из base64 (data URL или чистый base64)
+    """
+    image_data = image.split(',')[1] if ',' in image else image
+    return base64.b64decode(image_data)
+
 @router.get("/detect-live", response_model=DetectionResult)
-async def detect_live(camera_id: int = Query(0, description="ID камеры (0 - встроенная, 1+ - внешние)"), db: Session = Depends(get_db)):
+async def detect_live(
+    camera_id: int = Query(0, description="ID камеры (0 - встроенная, 1+ - внешние)"),
+    compact: bool = Query(False, description=COMPACT_DESCRIPTION),
+    model_name: Optional[str] = Query(None, description=MODEL_DESCRIPTION)
+):
     """
     Запуск детекции студентов в реальном времени с камеры и запись в БД.
     
     - **camera_id**: ID камеры (0 - встроенная, 1+ - внешние)
+    - **compact**: вернуть рамки плоским массивом xyxy
+    - **model_name**: название модели детектора
     """
     try:
-        print(f"Запрос на детекцию с камеры {camera_id}")
-        result = detect_people_from_camera(camera_id)
+        logger.debug("Запрос на детекцию с камеры %d", camera_id)
+        metrics.set_camera(camera_id)
+        started = time.perf_counter()
+        result = await inference_pool.run(detect_people_from_camera, camera_id, compact, model_name)
+        capture_profiler.record(f"camera:{camera_id}", time.perf_counter() - started)
         
-        print(f"Результат детекции: {result}")
+        logger.debug("Результат детекции: %s", result)
         
         # Проверяем наличие ошибок
         if "error" in result and result["error"]:
-            print(f"Ошибка при детекции с камеры {camera_id}: {result['error']}")
+            sampled_logger.warning(f"camera-{camera_id}", "Ошибка при детекции с камеры %d: %s",
+                                   camera_id, result["error"], extra={"camera_id": camera_id})
         else:
-            # Сохраняем историю в БД только если нет ошибок
-            try:
-                attendance = Attendance(count=result['count'])
-                db.add(attendance)
-                db.commit()
-                db.refresh(attendance)
-                print(f"Сохранено в БД: камера {camera_id}, количество людей: {result['count']}")
-            except Exception as e:
-                print(f"Ошибка при сохранении в БД: {str(e)}")
-                traceback.print_exc()
+            # Сохраняем историю в БД только если нет ошибок (запись уходит в буфер отложенной записи)
+            attendance_writer.add(result['count'])
 
         return result
+    except DETECTION_ERRORS:
+        raise
     except Exception as e:
-        print(f"Необработанная ошибка в detect-live: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Необработанная ошибка в detect-live: %s", e)
         raise HTTPException(status_code=500, detail=f"Ошибка сервера: {str(e)}")
 
+@router.get("/cameras/latest")
+async def cameras_latest():
+    """
+    Получить последние результаты детекции всех камер, наблюдаемых в фоне (SCHEDULER_CAMERAS).
+    
+    Ответ отдается сразу из памяти; поле age - возраст результата в секундах.
+    """
+    return camera_scheduler.latest()
+
+@router.get("/cameras/{camera_id}/latest")
+async def camera_latest(camera_id: int):
+    """
+    Получить последний результат детекции камеры, наблюдаемой в фоне
+    """
+    result = camera_scheduler.latest(camera_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Камера {camera_id} не наблюдается в фоне")
+    return result
+
+@router.get("/camera-scheduler")
+async def camera_scheduler_stats():
+    """
+    Получить состояние фоновой детекции по камерам: частоту кадров, задержку и ошибки каждой камеры
+    """
+    return camera_scheduler.stats()
+
 @router.get("/available-cameras", response_model=Dict[str, List[CameraInfo]])
 async def available_cameras():
     """
-    Получить список доступных камер в системе
+    Получить список доступных камер в системе.
+    
+    Список хранится в памяти и обновляется в фоне: по таймеру и при подключении камер
+    (в Windows - только по таймеру, см. CameraInventory).
     """
     try:
-        cameras = get_available_cameras()
-        camera_info = [
-            CameraInfo(
-                id=camera_id,
-                name=f"Камера {camera_id}",
-                available=True
-            ) for camera_id in cameras
-        ]
+        # Первое перечисление камер может блокировать, поэтому выполняем его вне цикла событий
+        cameras = await decode_pool.run(camera_inventory.cameras)
+        camera_info = [CameraInfo(available=True, **camera) for camera in cameras]
         
         # Если камеры не найдены, добавляем хотя бы одну
         if not camera_info:
@@ -105,108 +204,288 @@ async def available_cameras():
             
         return {"available_cameras": camera_info}
     except Exception as e:
-        print(f"Ошибка при получении списка камер: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Ошибка при получении списка камер: %s", e)
         # Возвращаем хотя бы одну камеру в случае ошибки
         return {"available_cameras": [CameraInfo(id=0, name="Основная камера", available=True)]}
 
-@router.post("/detect-image", response_model=DetectionResult)
-async def detect_image(request: ImageRequest, db: Session = Depends(get_db)):
+def client_source(connection):
     """
-    Детекция студентов из загруженного изображения и запись в БД.
+    Адрес клиента - источник по умолчанию для профиля захвата.
+    Для сравнения кадров и сопровождения не используется: за одним адресом
+    (NAT, прокси, несколько вкладок) может быть несколько потоков кадров
+    """
+    return connection.client.host if connection.client else "unknown"
+
+def record_detection(result):
+    """
+    Записывает количество людей в БД (не чаще раза в MIN_SAVE_INTERVAL)
     """
     global last_count, last_db_save_time
     
-    try:
-        print("Получен запрос на обработку изображения")
-        # Декодируем base64 изображение
-        image_data = request.image.split(',')[1] if ',' in request.image else request.image
-        image_bytes = base64.b64decode(image_data)
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        print(f"Декодировано изображение размером: {img.shape if img is not None else 'None'}")
-        
-        if img is None:
-            print("Ошибка декодирования изображения")
-            return {"count": 0, "boxes": [], "error": "Не удалось декодировать изображение"}
-        
-        # Запускаем детекцию
-        result = detect_people_from_image(img)
-        current_count = result['count']
+    current_count = result['count']
+    
+    logger.debug("Результат детекции: %s", result)
+    
+    # Корректируем количество для статистики (вычитаем COUNT_ADJUSTMENT); трекер уже отсеял
+    # ложные срабатывания, поэтому количество подтвержденных треков не корректируется
+    adjusted_count = current_count if result.get("tracked") else max(0, current_count - COUNT_ADJUSTMENT)
+    
+    # Записываем в БД каждые 10 секунд, если скорректированное количество людей > 0;
+    # одновременные запросы не должны оба пройти проверку интервала
+    with _save_lock:
         current_time = time.time()
-        
-        print(f"Результат детекции: {result}")
-        
-        # Корректируем количество для статистики (вычитаем 1)
-        adjusted_count = max(0, current_count - 1)
-        
-        # Записываем в БД каждые 10 секунд, если скорректированное количество людей > 0
-        if adjusted_count > 0 and (current_time - last_db_save_time >= MIN_SAVE_INTERVAL):
-            now = datetime.datetime.now()
-            print(f"Сохраняем в БД: исходное количество = {current_count}, скорректированное = {adjusted_count}, время = {now}")
-            try:
-                attendance = Attendance(count=adjusted_count, timestamp=now)
-                db.add(attendance)
-                db.commit()
-                
-                print("Запись успешно сохранена в БД")
-                
-                # Обновляем время последней записи
-                last_db_save_time = current_time
-            except Exception as e:
-                print(f"Ошибка при сохранении в БД: {str(e)}")
-                traceback.print_exc()
-        
+        save = adjusted_count > 0 and current_time - last_db_save_time >= MIN_SAVE_INTERVAL
+        if save:
+            # Обновляем время последней записи
+            last_db_save_time = current_time
         # Обновляем последнее количество
         last_count = current_count
-        
+    
+    if save:
+        now = datetime.datetime.now()
+        logger.info("Сохраняем в БД: исходное количество = %d, скорректированное = %d, время = %s",
+                    current_count, adjusted_count, now)
+        attendance_writer.add(adjusted_count, now)
+
+async def process_image(img, compact=False, source=None, model_name=None, on_detections=None, profile_source=None):
+    """
+    Детекция студентов на декодированном изображении и запись в БД (не чаще раза в MIN_SAVE_INTERVAL)
+    
+    Args:
+        source: Идентификатор потока кадров, переданный клиентом (None - без сравнения кадров и сопровождения)
+        profile_source: Источник для профиля захвата (по умолчанию - source)
+    """
+    profile_source = profile_source or source
+    if img is None:
+        sampled_logger.warning("decode", "Ошибка декодирования изображения")
+        return {"count": 0, "boxes": [], "error": "Не удалось декодировать изображение"}
+    
+    # Запускаем детекцию; время обработки учитывается в профиле захвата источника
+    started = time.perf_counter()
+    result = await inference_pool.run(detect_people_from_image, img, compact, source, model_name, on_detections)
+    if profile_source is not None:
+        capture_profiler.record(profile_source, time.perf_counter() - started)
+    record_detection(result)
+    return result
+
+async def process_image_bytes(image_bytes, compact=False, source=None, model_name=None, profile_source=None):
+    """
+    Детекция студентов на закодированном изображении (JPEG, PNG).
+    
+    Если такой же кадр уже обрабатывался той же версией модели (по хэшу байтов),
+    детекции берутся из кэша без декодирования и инференса. В кэше хранятся
+    детекции модели, а не ответ: они проходят через трекер источника запроса,
+    поэтому кадры разных источников не получают чужие треки и количество.
+    """
+    # После замены весов модели ключ меняется - старые результаты не используются
+    model_key = registry.model_key(model_name)
+    cached, cache_keys = await decode_pool.run(lookup_frame, image_bytes, model_key)
+    if cached is not None:
+        detections, model = cached
+        result = yolo_detector.track_detections(detections, source, model_key, compact)
+        result.update(inferred=False, cached=True, model=model)
+        record_detection(result)
         return result
+    
+    img = await decode_pool.run(decode_image_bytes, image_bytes)
+    # Кэшируем только детекции модели (без демо-данных и результатов, переиспользованных для источника)
+    detections = []
+    result = await process_image(img, compact, source, model_name, detections.append, profile_source)
+    if detections and not result.get("error"):
+        store_frame(cache_keys, (detections[0], result.get("model")))
+    return result
+
+@router.post("/detect-image", response_model=DetectionResult)
+async def detect_image(
+    request: ImageRequest,
+    http_request: Request,
+    compact: bool = Query(False, description=COMPACT_DESCRIPTION),
+    source: Optional[str] = Query(None, description=SOURCE_DESCRIPTION),
+    model_name: Optional[str] = Query(None, description=MODEL_DESCRIPTION)
+):
+    """
+    Детекция студентов из загруженного изображения (base64 в JSON) и запись в БД.
+    """
+    try:
+        logger.debug("Получен запрос на обработку изображения")
+        # Декодируем base64 изображение
+        image_bytes = await decode_pool.run(decode_base64, request.image)
+        return await process_image_bytes(image_bytes, compact, source, model_name or request.model_name,
+                                         source or client_source(http_request))
+    except DETECTION_ERRORS:
+        raise
     except Exception as e:
-        print(f"Ошибка при обработке изображения: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Ошибка при обработке изображения: %s", e)
         return {"count": 0, "boxes": [], "error": str(e)}
 
-@router.get("/attendance", response_model=List[AttendanceRecord])
-async def attendance(db: Session = Depends(get_db)):
+@router.post("/detect-image-binary", response_model=DetectionResult)
+async def detect_image_binary(
+    request: Request,
+    compact: bool = Query(False, description=COMPACT_DESCRIPTION),
+    source: Optional[str] = Query(None, description=SOURCE_DESCRIPTION),
+    model_name: Optional[str] = Query(None, description=MODEL_DESCRIPTION)
+):
+    """
+    Детекция студентов из изображения, переданного в двоичном виде, и запись в БД.
+    
+    Принимает либо тело запроса с закодированным изображением (Content-Type: image/jpeg,
+    image/png или application/octet-stream), либо multipart/form-data с файлом в поле "image".
+    """
+    try:
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("image")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=422, detail="Ожидается файл изображения в поле 'image'")
+            image_bytes = await upload.read()
+        else:
+            image_bytes = await request.body()
+        
+        if not image_bytes:
+            raise HTTPException(status_code=422, detail="Пустое тело запроса")
+        
+        return await process_image_bytes(image_bytes, compact, source, model_name, source or client_source(request))
+    except (HTTPException, *DETECTION_ERRORS):
+        raise
+    except Exception as e:
+        logger.exception("Ошибка при обработке изображения: %s", e)
+        return {"count": 0, "boxes": [], "error": str(e)}
+
+@router.websocket("/ws/detect")
+async def detect_websocket(websocket: WebSocket, compact: bool = False, source: Optional[str] = None,
+                           model_name: Optional[str] = None):
     """
-    Получить историю посещаемости для фронтенда.
+    Постоянный канал детекции: клиент отправляет кадры (двоичные сообщения с JPEG/PNG
+    или текстовые с base64), сервер отвечает результатом детекции в JSON на каждый кадр.
     """
+    await websocket.accept()
+    # Кадры одного соединения считаются одним источником
+    if source is None:
+        source = f"ws:{client_source(websocket)}:{websocket.client.port if websocket.client else id(websocket)}"
     try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            
+            try:
+                if message.get("bytes") is not None:
+                    image_bytes = message["bytes"]
+                else:
+                    image_bytes = await decode_pool.run(decode_base64, message.get("text") or "")
+                result = await process_image_bytes(image_bytes, compact, source, model_name)
+            except OVERLOAD_ERRORS as e:
+                # Сообщаем клиенту о перегрузке, соединение остается открытым
+                result = {"count": 0, "boxes": [], "error": str(e), "overloaded": True}
+            except ModelNotFoundError as e:
+                result = {"count": 0, "boxes": [], "error": str(e)}
+            except Exception as e:
+                logger.exception("Ошибка при обработке кадра из WebSocket: %s", e)
+                result = {"count": 0, "boxes": [], "error": str(e)}
+            
+            await websocket.send_json(result)
+    except WebSocketDisconnect:
+        pass
+
+@router.get("/capture-profile")
+async def capture_profile(
+    request: Request,
+    source: Optional[str] = Query(None, description=SOURCE_DESCRIPTION),
+    camera_id: Optional[int] = Query(None, description="ID камеры - профиль опроса /detect-live")
+):
+    """
+    Получить профиль захвата кадров: длинную сторону кадра (max_side), качество JPEG
+    и интервал между кадрами.
+    
+    Профиль подстраивается под заполненность очереди инференса и измеренное время
+    обработки кадров источника: клиент уменьшает кадр до max_side перед отправкой
+    и присылает кадры не чаще, чем раз в interval_ms.
+    """
+    if camera_id is not None:
+        source = f"camera:{camera_id}"
+    return capture_profiler.profile(source or client_source(request))
+
+@router.get("/inference-queue")
+async def inference_queue():
+    """
+    Получить настройки и текущее состояние очереди пакетного инференса, пулов потоков
+    и пропуска неизменившихся кадров. Верхний уровень - очередь модели по умолчанию,
+    очереди остальных моделей - в поле models.
+    """
+    status = yolo_detector.model_status()
+    slot = registry.default_slot()
+    if slot is None:
+        return {"enabled": False, "model": status, "pools": get_executor_stats()}
+    return {
+        "enabled": True,
+        "detector": slot.detector.info(),
+        **slot.batcher.stats(),
+        "models": {name: model.get("queue") for name, model in status["models"].items()},
+        "pools": get_executor_stats(),
+        "motion_gate": motion_gate_stats(),
+        "frame_cache": frame_cache_stats(),
+        "tracker": tracker_stats(),
+    }
+
+@router.get("/attendance", response_model=List[AttendanceRecord])
+async def attendance(
+    before_timestamp: Optional[datetime.datetime] = Query(None, description="Вернуть записи до этого времени (курсор)"),
+    before_id: Optional[int] = Query(None, description="ID последней полученной записи (курсор вместе с before_timestamp)"),
+    limit: int = Query(50, ge=1, le=1000, description="Максимальное количество записей"),
+    db: Session = Depends(get_db)
+):
+    """
+    Получить историю посещаемости для фронтенда (от новых записей к старым).
+    
+    Для следующей страницы передайте timestamp и id последней полученной записи
+    в before_timestamp и before_id.
+    """
+    def load_records():
         # Получаем только записи с count > 0
-        records = db.query(Attendance).filter(Attendance.count > 0).order_by(Attendance.timestamp.desc()).limit(50).all()
+        query = db.query(Attendance.id, Attendance.timestamp, Attendance.count).filter(Attendance.count > 0)
+        query = keyset_before(query, Attendance.timestamp, Attendance.id, before_timestamp, before_id)
+        return query.order_by(Attendance.timestamp.desc(), Attendance.id.desc()).limit(limit).all()
+    
+    try:
+        records = await db_pool.run(load_records)
         
-        print(f"Найдено {len(records)} записей с ненулевым количеством людей")
+        logger.debug("Найдено %d записей с ненулевым количеством людей", len(records))
         
         # Используем локальное время без преобразования из UTC
-        result = []
-        for rec in records:
-            result.append({
-                "timestamp": rec.timestamp.isoformat(),
-                "count": rec.count
-            })
-        
-        return result
+        return [{"id": rec.id, "timestamp": rec.timestamp.isoformat(), "count": rec.count} for rec in records]
+    except OVERLOAD_ERRORS:
+        raise
     except Exception as e:
-        print(f"Ошибка при получении истории посещаемости: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Ошибка при получении истории посещаемости: %s", e)
         raise HTTPException(status_code=500, detail=f"Ошибка при получении данных из БД: {str(e)}")
 
 @router.get("/attendance-history")
-async def attendance_history(db: Session = Depends(get_db)):
+async def attendance_history(
+    format: ExportFormat = Query("json", description="Формат ответа: json (массив), ndjson или csv"),
+    after_timestamp: Optional[datetime.datetime] = Query(None, description="Вернуть записи после этого времени (курсор)"),
+    after_id: Optional[int] = Query(None, description="ID последней полученной записи (курсор вместе с after_timestamp)"),
+    limit: Optional[int] = Query(None, ge=1, description="Максимальное количество записей"),
+):
     """
-    Получить историю посещаемости.
+    Получить историю посещаемости в порядке возрастания времени.
+    
+    Ответ передается потоком: записи читаются из БД порциями, поэтому память
+    и время до первого байта не зависят от размера истории. Для постраничного
+    чтения передайте timestamp и id последней полученной записи в after_timestamp и after_id.
     """
-    try:
-        records = db.query(Attendance).order_by(Attendance.timestamp.asc()).all()
-        return [
-            {"timestamp": rec.timestamp.isoformat(), "count": rec.count}
-            for rec in records
-        ]
-    except Exception as e:
-        print(f"Ошибка при получении истории посещаемости: {str(e)}")
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Ошибка при получении данных из БД: {str(e)}")
+    def build_query(db):
+        query = db.query(Attendance.id, Attendance.timestamp, Attendance.count)
+        query = keyset_after(query, Attendance.timestamp, Attendance.id, after_timestamp, after_id)
+        query = query.order_by(Attendance.timestamp.asc(), Attendance.id.asc())
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+    
+    return stream_query(build_query, ["id", "timestamp", "count"], format)
+
+# Статистика для интервала без записей
+EMPTY_STATISTICS = {"average_count": 0, "max_count": 0, "total_records": 0}
 
 @router.get("/attendance-by-day", response_model=List[DayStatistics])
 async def attendance_by_day(db: Session = Depends(get_db)):
@@ -214,51 +493,26 @@ async def attendance_by_day(db: Session = Depends(get_db)):
     Получить статистику посещаемости по дням недели.
     """
     try:
-        # Получаем все записи
-        records = db.query(Attendance).all()
+        # Агрегаты поддерживаются при записи - читаем по строке на день недели;
+        # результат кэшируется до следующего сброса записей посещаемости
+        stats = await stats_cache.get_or_run(
+            ("attendance-by-day",), db_pool,
+            read_rollup_stats, db, AttendanceWeekdayRollup, AttendanceWeekdayRollup.weekday,
+            tags=["attendance"]
+        )
         
-        # Группируем по дням недели
-        days_data = defaultdict(list)
         days_order = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье"]
-        days_map = {
-            0: "Понедельник",
-            1: "Вторник",
-            2: "Среда",
-            3: "Четверг",
-            4: "Пятница",
-            5: "Суббота",
-            6: "Воскресенье"
-        }
-        
-        for record in records:
-            # Получаем день недели (0-6, где 0 - понедельник)
-            day_of_week = record.timestamp.weekday()
-            day_name = days_map[day_of_week]
-            days_data[day_name].append(record.count)
         
-        # Формируем результат
+        # Формируем результат (0 - понедельник)
         result = []
-        for day in days_order:
-            counts = days_data.get(day, [])
-            if counts:
-                result.append({
-                    "day": day,
-                    "average_count": round(sum(counts) / len(counts), 2),
-                    "max_count": max(counts),
-                    "total_records": len(counts)
-                })
-            else:
-                result.append({
-                    "day": day,
-                    "average_count": 0,
-                    "max_count": 0,
-                    "total_records": 0
-                })
+        for day_of_week, day in enumerate(days_order):
+            result.append({"day": day, **stats.get(day_of_week, EMPTY_STATISTICS)})
         
         return result
+    except OVERLOAD_ERRORS:
+        raise
     except Exception as e:
-        print(f"Ошибка при получении статистики по дням: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Ошибка при получении статистики по дням: %s", e)
         raise HTTPException(status_code=500, detail=f"Ошибка при получении данных из БД: {str(e)}")
 
 @router.get("/attendance-by-hour", response_model=List[HourStatistics])
@@ -267,38 +521,22 @@ async def attendance_by_hour(db: Session = Depends(get_db)):
     Получить статистику посещаемости по часам суток.
     """
     try:
-        # Получаем все записи
-        records = db.query(Attendance).all()
-        
-        # Группируем по часам
-        hours_data = defaultdict(list)
-        
-        for record in records:
-            # Получаем час (0-23)
-            hour = record.timestamp.hour
-            hours_data[hour].append(record.count)
+        # Агрегаты поддерживаются при записи - читаем по строке на час;
+        # результат кэшируется до следующего сброса записей посещаемости
+        stats = await stats_cache.get_or_run(
+            ("attendance-by-hour",), db_pool,
+            read_rollup_stats, db, AttendanceHourRollup, AttendanceHourRollup.hour,
+            tags=["attendance"]
+        )
         
         # Формируем результат
         result = []
         for hour in range(24):  # 24 часа
-            counts = hours_data.get(hour, [])
-            if counts:
-                result.append({
-                    "hour": hour,
-                    "average_count": round(sum(counts) / len(counts), 2),
-                    "max_count": max(counts),
-                    "total_records": len(counts)
-                })
-            else:
-                result.append({
-                    "hour": hour,
-                    "average_count": 0,
-                    "max_count": 0,
-                    "total_records": 0
-                })
+            result.append({"hour": hour, **stats.get(hour, EMPTY_STATISTICS)})
         
         return result
+    except OVERLOAD_ERRORS:
+        raise
     except Exception as e:
-        print(f"Ошибка при получении статистики по часам: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Ошибка при получении статистики по часам: %s", e)
         raise HTTPException(status_code=500, detail=f"Ошибка при получении данных из БД: {str(e)}")
\ No newline at end of file
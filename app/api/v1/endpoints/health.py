@@ -1,7 +1,18 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.ml import yolo_detector
 
 router = APIRouter()
 
 @router.get("/ping")
 def ping():
-    return {"message": "pong"}
\ No newline at end of file
+    return {"message": "pong"}
+
+@router.get("/ready")
+def ready():
+    """
+    Проверка готовности: 200, когда модель загружена и прогрета (или включен
+    демо-режим), 503 - пока модель загружается
+    """
+    status = yolo_detector.model_status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
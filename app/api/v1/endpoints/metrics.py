@@ -0,0 +1,99 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core import database, metrics
+from app.core.attendance_writer import attendance_writer
+from app.core.executors import get_executor_stats
+from app.core.metrics import render_family
+from app.ml.camera_scheduler import camera_scheduler
+from app.ml.yolo_detector import registry
+
+router = APIRouter()
+
+# Тип содержимого текстового формата Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def model_families():
+    """
+    Очереди инференса и запросы в обработке по моделям
+    """
+    models = {name: model for name, model in registry.status()["models"].items() if "queue" in model}
+    queue_depth, inflight, frames, batches = [], [], [], []
+    for name, model in models.items():
+        labels = {"model": name}
+        queue_depth.append((labels, model["queue"]["queue_depth"]))
+        inflight.append((labels, model["inflight"]))
+        frames.append((labels, model["queue"]["frames_processed"]))
+        batches.append((labels, model["queue"]["batches_processed"]))
+    return [
+        render_family("detector_inference_queue_depth", "gauge", "Кадров в очереди инференса модели", queue_depth),
+        render_family("detector_model_inflight_requests", "gauge", "Запросов, использующих модель", inflight),
+        render_family("detector_frames_total", "counter", "Кадров обработано моделью (текущая версия весов)", frames),
+        render_family("detector_batches_total", "counter", "Пакетов обработано моделью (текущая версия весов)", batches),
+    ]
+
+
+def executor_families():
+    pools = get_executor_stats()
+    return [
+        render_family("executor_pending_tasks", "gauge", "Задач в пуле потоков (выполняющихся и ожидающих)",
+                      [({"pool": name}, pool["pending"]) for name, pool in pools.items()]),
+        render_family("executor_capacity", "gauge", "Максимум задач в пуле потоков",
+                      [({"pool": name}, pool["max_workers"] + pool["max_queue"]) for name, pool in pools.items()]),
+    ]
+
+
+def camera_families():
+    """
+    Частота кадров камер, наблюдаемых в фоне
+    """
+    cameras = camera_scheduler.stats()["cameras"]
+    return [
+        render_family("camera_fps", "gauge", "Сглаженная частота обработанных кадров камеры",
+                      [({"camera": camera["camera_id"]}, camera["fps"]) for camera in cameras]),
+        render_family("camera_frames_total", "counter", "Обработано кадров камеры",
+                      [({"camera": camera["camera_id"]}, camera["frames"]) for camera in cameras]),
+        render_family("camera_errors_total", "counter", "Ошибок обработки кадров камеры",
+                      [({"camera": camera["camera_id"]}, camera["errors"]) for camera in cameras]),
+    ]
+
+
+def database_families():
+    """
+    Пул соединений SQLAlchemy и буфер отложенной записи посещаемости
+    """
+    families = []
+    pool = database.engine.pool
+    # Не у всех пулов есть размер и переполнение (например, у StaticPool для SQLite в памяти)
+    if hasattr(pool, "checkedout"):
+        families.append(render_family("db_pool_checked_out", "gauge", "Соединений БД выдано из пула",
+                                      [({}, pool.checkedout())]))
+    if hasattr(pool, "overflow"):
+        # QueuePool считает переполнение от -pool_size, пока пул не заполнен
+        families.append(render_family("db_pool_overflow", "gauge", "Соединений БД сверх размера пула",
+                                      [({}, max(0, pool.overflow()))]))
+    if hasattr(pool, "size"):
+        families.append(render_family("db_pool_size", "gauge", "Размер пула соединений БД", [({}, pool.size())]))
+
+    writer = attendance_writer.stats()
+    families.append(render_family("attendance_backlog_rows", "gauge", "Записей посещаемости, ожидающих сброса в БД",
+                                  [({}, writer["backlog"])]))
+    families.append(render_family("attendance_rows_written_total", "counter", "Записей посещаемости сохранено в БД",
+                                  [({}, writer["rows_written"])]))
+    families.append(render_family("attendance_rows_dropped_total", "counter", "Записей посещаемости отброшено",
+                                  [({}, writer["rows_dropped"])]))
+    return families
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """
+    Метрики в текстовом формате Prometheus: гистограммы времени этапов обработки кадра
+    и HTTP-запросов, очереди инференса, пулы потоков, частота кадров камер, пул соединений БД.
+
+    Значения очередей и пулов снимаются в момент запроса из уже имеющихся счетчиков,
+    поэтому запрос метрик не обращается к БД и к модели.
+    """
+    families = [*model_families(), *executor_families(), *camera_families(), *database_families()]
+    return PlainTextResponse(metrics.render(families), media_type=CONTENT_TYPE)
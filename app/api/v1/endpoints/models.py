@@ -0,0 +1,75 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import Optional
+from app.core.config import MODEL_ADMIN_TOKEN
+from app.ml.yolo_detector import registry
+from app.ml.model_registry import ModelNotFoundError
+
+router = APIRouter()
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """
+    Проверяет токен управления моделями (заголовок X-Admin-Token)
+    """
+    if MODEL_ADMIN_TOKEN is None:
+        raise HTTPException(status_code=403, detail="Управление моделями отключено: не задан MODEL_ADMIN_TOKEN")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, MODEL_ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Неверный токен управления моделями")
+
+# Управление моделями подключается только при MODEL_ADMIN_ENABLED (app/main.py)
+admin_router = APIRouter(dependencies=[Depends(require_admin_token)])
+
+class LoadModelRequest(BaseModel):
+    path: Optional[str] = None  # путь к новым весам (по умолчанию - из настроек MODELS)
+
+@router.get("/models")
+def list_models():
+    """
+    Список моделей детектора: состояние загрузки, версия, бэкенд и очередь инференса каждой
+    """
+    return registry.status()
+
+@admin_router.post("/models/{name}/load", status_code=202)
+def load_model(name: str, request: Optional[LoadModelRequest] = None):
+    """
+    Загрузить модель или заменить ее новыми весами без перезапуска сервера.
+
+    Загрузка выполняется в фоне; пока она идет, запросы обслуживает текущая
+    версия модели, после замены старая версия выгружается, завершив свои запросы.
+    С путем к весам можно добавить новую модель под любым названием; путь должен
+    быть указан в MODELS или лежать в одном из каталогов MODEL_WEIGHTS_DIRS.
+    """
+    path = request.path if request else None
+    if name not in registry.models and path is None:
+        raise HTTPException(status_code=404, detail=f"Неизвестная модель: {name}")
+    if path is not None and not registry.path_allowed(path):
+        raise HTTPException(status_code=403, detail=f"Загрузка весов из {path} не разрешена")
+    registry.load_async(name, path)
+    return {"name": name, "state": "loading"}
+
+@admin_router.post("/models/{name}/default")
+def set_default_model(name: str):
+    """
+    Сделать загруженную модель моделью по умолчанию (для запросов без model_name)
+    """
+    try:
+        registry.set_default(name)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"default_model": name}
+
+@admin_router.delete("/models/{name}")
+def unload_model(name: str):
+    """
+    Выгрузить модель (после завершения ее текущих запросов)
+    """
+    try:
+        registry.unload(name)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return JSONResponse(status_code=202, content={"name": name, "state": "unloading"})
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core.profiling import profile_store
+
+router = APIRouter()
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """
+    Получить список последних профилей запросов (новые - первыми).
+
+    Профиль снимается для запроса с заголовком X-Profile: 1 или параметром ?profile=1
+    (при PROFILING_ENABLED); его идентификатор возвращается в заголовке X-Profile-Id.
+    """
+    return {"profiles": profile_store.list()}
+
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(profile_id: str):
+    """
+    Скачать профиль запроса: стеки в свернутом формате ("корень;...;функция количество")
+    для flamegraph.pl или speedscope
+    """
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Профиль {profile_id} не найден")
+    return PlainTextResponse(
+        profile.folded(),
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'},
+    )
@@ -0,0 +1,289 @@
+import datetime
+import threading
+import time
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from app.core.cache import stats_cache, attendance_tags
+from app.core.config import (
+    ATTENDANCE_FLUSH_SIZE,
+    ATTENDANCE_FLUSH_INTERVAL,
+    ATTENDANCE_FLUSH_RETRIES,
+    ATTENDANCE_MAX_BACKLOG,
+)
+from app.core.database import SessionLocal
+from app.core.log import get_logger
+from app.core.metrics import observe_stage
+from app.core.rollups import apply_rollups
+from app.models.student import Attendance
+
+logger = get_logger(__name__)
+
+# Ошибки недоступности БД (соединение, блокировки): записи сохраняются для повтора без ограничения попыток
+UNAVAILABLE_ERRORS = (OperationalError, InterfaceError)
+
+
+class AttendanceWriter:
+    """
+    Отложенная (write-behind) запись посещаемости в БД.
+
+    Записи накапливаются в памяти и сбрасываются одной пакетной вставкой,
+    когда их набирается flush_size или проходит flush_interval секунд.
+    Обработчики запросов не ждут БД: add() только кладет запись в буфер.
+
+    Если БД недоступна, записи остаются в буфере (не больше max_backlog).
+    Если пакет не записывается по другой причине (например, ошибочное значение),
+    после max_retries попыток он записывается по одной строке: ошибочные строки
+    отбрасываются с записью в журнал и не блокируют остальные.
+    """
+
+    def __init__(self, session_factory, flush_size=100, flush_interval=5.0, max_backlog=10000, max_retries=3):
+        self.session_factory = session_factory
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_backlog = max_backlog
+        self.max_retries = max_retries
+
+        # Статистика сбросов
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.last_flush_time = None
+
+        self._buffer = []
+        # Неудачных попыток подряд записать пакет из-за ошибки в данных
+        self._failures = 0
+        self._lock = threading.Lock()
+        # Сбросы выполняются строго по одному, чтобы не перемешать порядок записей
+        # (RLock: write() сбрасывает буфер, удерживая блокировку)
+        self._flush_lock = threading.RLock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def backlog(self):
+        """
+        Количество записей, ожидающих сброса в БД
+        """
+        return len(self._buffer)
+
+    def add(self, count, timestamp=None, lesson_number=None):
+        """
+        Добавляет запись о посещаемости в буфер
+
+        Args:
+            count: Количество людей
+            timestamp: Время замера (по умолчанию - текущее)
+            lesson_number: Номер пары
+
+        Returns:
+            dict: Поля записи, которая будет сохранена
+        """
+        row = self._row(count, timestamp, lesson_number)
+        with self._lock:
+            self._buffer.append(row)
+            self._trim()
+            if len(self._buffer) >= self.flush_size:
+                self._wake_event.set()
+        return row
+
+    @staticmethod
+    def _row(count, timestamp=None, lesson_number=None):
+        if timestamp is None:
+            timestamp = datetime.datetime.now()
+        return {
+            "timestamp": timestamp,
+            "count": count,
+            "lesson_number": lesson_number,
+            "date": timestamp.date(),
+        }
+
+    def _trim(self):
+        """
+        Ограничивает размер буфера (вызывается под self._lock)
+        """
+        overflow = len(self._buffer) - self.max_backlog
+        if overflow > 0:
+            # БД недоступна слишком долго - отбрасываем самые старые записи, чтобы не исчерпать память
+            del self._buffer[:overflow]
+            self.rows_dropped += overflow
+            logger.error("Буфер посещаемости переполнен, отброшено записей: %d", overflow)
+
+    def _requeue(self, rows):
+        """
+        Возвращает записи в начало буфера, чтобы повторить при следующем сбросе
+        """
+        with self._lock:
+            self._buffer[:0] = rows
+            self._trim()
+
+    def _write(self, rows):
+        """
+        Вставляет записи и обновляет таблицы агрегатов в одной транзакции
+        """
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            db.execute(Attendance.__table__.insert(), rows)
+            apply_rollups(db, rows)
+            db.commit()
+            observe_stage("db_commit", time.perf_counter() - started)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _write_each(self, rows):
+        """
+        Записывает пакет по одной строке, отбрасывая строки, которые не удается сохранить
+
+        Returns:
+            list: Сохраненные записи
+        """
+        written = []
+        for i, row in enumerate(rows):
+            try:
+                self._write([row])
+            except UNAVAILABLE_ERRORS:
+                # БД стала недоступна - оставшиеся записи повторим позже
+                self._requeue(rows[i:])
+                break
+            except Exception as e:
+                self.rows_dropped += 1
+                logger.error("Запись посещаемости отброшена после %d неудачных сбросов: %s (%s)",
+                             self.max_retries, row, e)
+            else:
+                written.append(row)
+        return written
+
+    def flush(self):
+        """
+        Сбрасывает накопленные записи в БД одной пакетной вставкой
+        и обновляет таблицы агрегатов
+
+        Returns:
+            int: Количество записанных строк
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                self._write(rows)
+                self._failures = 0
+            except Exception as e:
+                self.failed_flushes += 1
+                logger.exception("Ошибка при сбросе %d записей посещаемости в БД: %s", len(rows), e)
+                if isinstance(e, UNAVAILABLE_ERRORS):
+                    self._requeue(rows)
+                    return 0
+                self._failures += 1
+                if self._failures < self.max_retries:
+                    self._requeue(rows)
+                    return 0
+                # Пакет не записывается из-за ошибки в данных - отделяем ошибочные строки
+                self._failures = 0
+                rows = self._write_each(rows)
+                if not rows:
+                    return 0
+
+            # Сбрасываем закэшированную статистику только для затронутых дат и пар
+            stats_cache.invalidate_tags(attendance_tags(rows))
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.rows_written += len(rows)
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.last_flush_time = datetime.datetime.now()
+            logger.debug("Сброшено записей посещаемости: %d за %.1f мс", len(rows), elapsed_ms)
+            return len(rows)
+
+    def write(self, count, timestamp=None, lesson_number=None):
+        """
+        Сразу сохраняет одну запись (для запросов, которым нужен ее id).
+        Накопленные записи сбрасываются перед ней, чтобы не нарушить порядок
+
+        Returns:
+            Attendance: Сохраненная запись
+        """
+        row = self._row(count, timestamp, lesson_number)
+        with self._flush_lock:
+            self.flush()
+            db = self.session_factory()
+            try:
+                record = Attendance(**row)
+                db.add(record)
+                db.flush()
+                apply_rollups(db, [row])
+                db.commit()
+                db.refresh(record)
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+            self.rows_written += 1
+        stats_cache.invalidate_tags(attendance_tags([row]))
+        return record
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake_event.wait(self.flush_interval)
+            self._wake_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # Поток не должен завершаться: иначе записи копятся в буфере до переполнения
+                logger.exception("Ошибка фонового сброса посещаемости: %s", e)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="attendance-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Останавливает фоновый поток и сбрасывает оставшиеся записи
+        """
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def stats(self):
+        return {
+            "backlog": self.backlog,
+            "flush_size": self.flush_size,
+            "flush_interval": self.flush_interval,
+            "max_backlog": self.max_backlog,
+            "max_retries": self.max_retries,
+            "rows_written": self.rows_written,
+            "rows_dropped": self.rows_dropped,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "last_flush_time": self.last_flush_time.isoformat() if self.last_flush_time else None,
+        }
+
+
+attendance_writer = AttendanceWriter(
+    SessionLocal,
+    flush_size=ATTENDANCE_FLUSH_SIZE,
+    flush_interval=ATTENDANCE_FLUSH_INTERVAL,
+    max_backlog=ATTENDANCE_MAX_BACKLOG,
+    max_retries=ATTENDANCE_FLUSH_RETRIES,
+)
@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.config import STATS_CACHE_SIZE, STATS_CACHE_TTL
+
+
+class TTLCache:
+    """
+    Потокобезопасный кэш в памяти с временем жизни записей и вытеснением LRU.
+
+    Записи можно пометить тегами и сбрасывать по тегу (invalidate_tags).
+    Если тег сброшен, пока значение вычислялось, оно не сохраняется -
+    так в кэш не попадает результат, прочитанный до новой записи в БД.
+    """
+
+    def __init__(self, name, max_entries=256, ttl=30.0):
+        """
+        Args:
+            name: Название кэша (для статистики)
+            max_entries: Максимальное количество записей
+            ttl: Время жизни записи в секундах
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        # Статистика обращений
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        # key -> (expires_at, value, tags)
+        self._entries = OrderedDict()
+        self._tag_keys = {}
+        self._tag_versions = {}
+        self._lock = threading.Lock()
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tag_keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_keys[tag]
+
+    def lookup(self, key):
+        """
+        Ищет значение в кэше
+
+        Returns:
+            tuple: (найдено ли значение, значение)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return False, None
+
+    def versions(self, tags):
+        """
+        Текущие версии тегов - передаются в store(), чтобы не сохранить устаревшее значение
+        """
+        with self._lock:
+            return tuple(self._tag_versions.get(tag, 0) for tag in tags)
+
+    def store(self, key, value, tags=(), versions=None):
+        """
+        Сохраняет значение с тегами
+
+        Args:
+            versions: Версии тегов на момент начала вычисления (результат versions())
+        """
+        tags = tuple(tags)
+        with self._lock:
+            if versions is not None and versions != tuple(self._tag_versions.get(tag, 0) for tag in tags):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tag_keys.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute, tags=()):
+        """
+        Возвращает значение из кэша или вычисляет и сохраняет его
+        """
+        found, value = self.lookup(key)
+        if found:
+            return value
+        versions = self.versions(tags)
+        value = compute()
+        self.store(key, value, tags, versions)
+        return value
+
+    async def get_or_run(self, key, pool, fn, *args, tags=()):
+        """
+        То же, что get_or_compute, но значение вычисляется в пуле потоков (BoundedExecutor).
+        При попадании в кэш пул не используется.
+        """
+        found, value = self.lookup(key)
+        if found:
+            return value
+        versions = self.versions(tags)
+        value = await pool.run(fn, *args)
+        self.store(key, value, tags, versions)
+        return value
+
+    def invalidate_tags(self, tags):
+        """
+        Удаляет все записи, помеченные любым из тегов
+
+        Returns:
+            int: Количество удаленных записей
+        """
+        removed = 0
+        with self._lock:
+            for tag in set(tags):
+                self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+                for key in list(self._tag_keys.get(tag, ())):
+                    if key in self._entries:
+                        self._remove(key)
+                        removed += 1
+            self.invalidations += removed
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tag_keys.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# Кэш ответов статистики посещаемости
+stats_cache = TTLCache("stats", STATS_CACHE_SIZE, STATS_CACHE_TTL)
+
+
+def attendance_tags(rows):
+    """
+    Теги кэша статистики, которые затрагивают новые записи посещаемости:
+    дата, дата и номер пары, а также общая статистика по часам и дням недели
+    """
+    tags = {"attendance"}
+    for row in rows:
+        tags.add(("date", row["date"]))
+        tags.add(("lesson", row["date"], row["lesson_number"]))
+    return tags
@@ -18,4 +18,162 @@ else:
     DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
 
 # Экспортируем URL для использования в других модулях
-settings = {"DATABASE_URL": DATABASE_URL}
\ No newline at end of file
+settings = {"DATABASE_URL": DATABASE_URL}
+
+# Минимальная уверенность детекции (низкий порог, чтобы максимизировать количество детекций)
+CONFIDENCE_THRESHOLD = 0.1
+
+# Настройки фоновых потоков захвата с камер
+CAMERA_OPEN_ATTEMPTS = 3  # количество попыток открыть камеру
+CAMERA_FRAME_TIMEOUT = 5.0  # сколько секунд ждать первый кадр после открытия камеры
+CAMERA_IDLE_TIMEOUT = 60.0  # через сколько секунд без запросов освобождать камеру
+CAMERA_MAX_READ_FAILURES = 30  # неудачных чтений подряд до переоткрытия камеры
+# Источники кадров вместо физических камер: индекс камеры -> описание источника
+#   "video:путь/к/файлу.mp4" - видеофайл по кругу (с частотой кадров файла или "@fps")
+#   "images:debug_frames@5" - изображения каталога по кругу, 5 кадров в секунду
+#   "synthetic:1280x720@15" - сгенерированные кадры с движущимися людьми
+# Остальные индексы открываются как устройства (cv2.VideoCapture)
+CAMERA_SOURCES = {}
+
+# Настройки пакетного инференса
+INFERENCE_BATCH_SIZE = 8  # максимальное количество кадров в одном пакете
+INFERENCE_BATCH_WAIT_MS = 15  # сколько миллисекунд ждать добора пакета
+INFERENCE_QUEUE_SIZE = 64  # максимальная длина очереди кадров на инференс
+INFERENCE_RESULT_TIMEOUT = 30.0  # сколько секунд поток пула ждет результат своего кадра
+
+# Пулы потоков для блокирующей работы (инференс, декодирование изображений, БД)
+# Пул инференса должен быть не меньше размера пакета, иначе пакеты не будут заполняться
+INFERENCE_POOL_SIZE = 2 * INFERENCE_BATCH_SIZE
+INFERENCE_POOL_QUEUE = 32  # задач в очереди сверх занятых потоков
+DECODE_POOL_SIZE = 4
+DECODE_POOL_QUEUE = 64
+DB_POOL_SIZE = 8  # не больше размера пула соединений SQLAlchemy
+DB_POOL_QUEUE = 64
+
+# Настройки логирования
+LOG_LEVEL = "INFO"  # общий уровень: DEBUG, INFO, WARNING, ERROR
+LOG_LEVELS = {}  # уровни отдельных модулей, например {"app.ml.yolo_detector": "DEBUG"}
+LOG_FORMAT = "text"  # "text" или "json"
+LOG_SAMPLE_INTERVAL = 10.0  # повторяющиеся сообщения на каждый кадр - не чаще раза в N секунд
+# Сохранять кадры детекции на диск для отладки (debug_frames/, debug_latest.jpg) -
+# кодирование JPEG и запись на диск в пути обработки кадра, поэтому по умолчанию выключено
+DEBUG_SAVE_FRAMES = False
+
+# Отложенная запись посещаемости в БД
+ATTENDANCE_FLUSH_SIZE = 100  # сбрасывать буфер, когда в нем набралось столько записей
+ATTENDANCE_FLUSH_INTERVAL = 5.0  # и не реже, чем раз в N секунд
+ATTENDANCE_MAX_BACKLOG = 10000  # максимум записей в памяти, если БД недоступна
+ATTENDANCE_FLUSH_RETRIES = 3  # неудачных сбросов пакета (не из-за недоступности БД), после которых он пишется по одной строке
+
+# Потоковая выгрузка истории посещаемости
+EXPORT_CHUNK_SIZE = 1000  # строк, читаемых из БД за одну порцию
+
+# Кэш ответов эндпоинтов статистики (сбрасывается при записи новых данных)
+STATS_CACHE_SIZE = 256  # максимум записей, самые давно использованные вытесняются
+STATS_CACHE_TTL = 30.0  # время жизни записи в секундах (страховка от записей других процессов)
+
+# Пропуск инференса для неизменившихся кадров (сравнение с последним обработанным кадром источника)
+MOTION_GATE_ENABLED = True
+MOTION_THUMB_SIZE = (64, 48)  # размер уменьшенного кадра для сравнения (ширина, высота)
+MOTION_PIXEL_THRESHOLD = 15  # изменение яркости пикселя (0-255), которое считается движением
+MOTION_CHANGE_THRESHOLD = 0.005  # доля изменившихся пикселей, начиная с которой кадр обрабатывается заново
+MOTION_MAX_REUSE_SECONDS = 10.0  # не переиспользовать результат дольше N секунд
+MOTION_MAX_SOURCES = 256  # максимум отслеживаемых источников кадров
+
+# Кэш результатов детекции для повторно присланных кадров (по хэшу закодированных байтов)
+FRAME_CACHE_SIZE = 512  # максимум запомненных кадров
+FRAME_CACHE_TTL = 300.0  # время жизни результата в секундах
+FRAME_CACHE_PERCEPTUAL = False  # искать также почти одинаковые кадры по перцептивному хэшу (dHash)
+FRAME_CACHE_PERCEPTUAL_DISTANCE = 4  # максимум различающихся бит из 64, при котором кадры считаются одинаковыми
+
+# Бэкенд детектора: "torch" (ultralytics/PyTorch), "onnx" (ONNX Runtime), "openvino" или "fake" (для тестов)
+# Для onnx/openvino модель экспортируется из .pt автоматически и кэшируется в MODEL_CACHE_DIR
+DETECTOR_BACKEND = "torch"
+DETECTOR_IMGSZ = 640  # размер входа модели для экспорта и предобработки
+DETECTOR_CONF_THRESHOLD = 0.25  # порог уверенности перед NMS (как у ultralytics по умолчанию)
+DETECTOR_IOU_THRESHOLD = 0.7  # порог IoU для подавления пересекающихся рамок (NMS)
+DETECTOR_MAX_DET = 300  # максимум рамок на изображение
+DETECTOR_THREADS = 0  # потоков инференса для ONNX Runtime/OpenVINO (0 - по числу ядер)
+MODEL_CACHE_DIR = "model_cache"  # каталог для экспортированных моделей
+FAKE_DETECTOR_COUNT = 3  # количество рамок, которое возвращает тестовый бэкенд
+
+# Загрузка модели в фоне после старта сервера
+MODEL_WARMUP_RUNS = 2  # прогревочных прогонов перед тем, как детектор считается готовым
+
+# Модели детектора: название -> возможные пути к весам (используется первый существующий).
+# Модель по умолчанию - первая из списка, которую удалось загрузить при старте
+MODELS = {
+    "headmodel": [
+        "runs/detect/lasttrain/weights/headmodel.pt",  # Текущий путь
+        "../runs/detect/lasttrain/weights/headmodel.pt",  # Относительный путь
+        os.path.abspath("../runs/detect/lasttrain/weights/headmodel.pt"),  # Абсолютный путь
+        "yolo_camera_project/runs/detect/lasttrain/weights/headmodel.pt",  # Альтернативный путь
+        "../yolo_camera_project/runs/detect/lasttrain/weights/headmodel.pt",  # Другой альтернативный путь
+    ],
+    "best": ["yolo_camera_project/runs/detect/train2/weights/best.pt"],
+    "yolov11": ["yolo_camera_project/runs/detect/train4/weights/yolov11.pt"],
+    "yolov8n": ["yolov8n.pt"],  # Стандартная модель YOLOv8n (будет загружена автоматически)
+}
+MODELS_PRELOAD = []  # дополнительные модели, загружаемые при старте (остальные - при первом запросе)
+MODEL_DRAIN_TIMEOUT = 30.0  # сколько секунд ждать завершения запросов к заменяемой модели
+# Управление моделями через API (загрузка и замена весов, модель по умолчанию, выгрузка).
+# Загрузка весов выполняет код из файла (torch.load), поэтому эндпоинты выключены по умолчанию,
+# требуют токен в заголовке X-Admin-Token и принимают только пути из MODELS или из каталогов MODEL_WEIGHTS_DIRS
+MODEL_ADMIN_ENABLED = False
+MODEL_ADMIN_TOKEN = None  # без токена запросы управления отклоняются
+MODEL_WEIGHTS_DIRS = ["runs/detect", "yolo_camera_project/runs/detect"]  # каталоги, из которых можно загружать новые веса
+
+# Профиль захвата кадров, который сервер сообщает клиентам (размер, качество JPEG, интервал)
+CAPTURE_MAX_SIDE = DETECTOR_IMGSZ  # длинная сторона кадра: больше размера входа модели отправлять незачем
+CAPTURE_MIN_SIDE = 320  # минимальная длинная сторона кадра при высокой нагрузке
+CAPTURE_JPEG_QUALITY = 0.8  # качество JPEG (0..1, как в canvas.toBlob)
+CAPTURE_MIN_JPEG_QUALITY = 0.5  # минимальное качество JPEG при высокой нагрузке
+CAPTURE_INTERVAL_MS = 500  # интервал между кадрами без нагрузки
+CAPTURE_MAX_INTERVAL_MS = 5000  # максимальный интервал между кадрами
+CAPTURE_TARGET_LATENCY_MS = 250  # целевое время обработки кадра на сервере
+CAPTURE_QUEUE_HIGH = 0.5  # заполненность очереди инференса, при которой клиенты начинают замедляться
+CAPTURE_LATENCY_ALPHA = 0.2  # коэффициент сглаживания измеренного времени обработки
+CAPTURE_MAX_SOURCES = 256  # сколько источников кадров отслеживать
+
+# Фоновая детекция по нескольким камерам (последний результат - GET /api/v1/cameras/latest)
+SCHEDULER_CAMERAS = []  # индексы камер для непрерывного наблюдения (пустой список - планировщик выключен)
+SCHEDULER_TARGET_FPS = 2.0  # кадров в секунду на камеру
+SCHEDULER_WORKERS = INFERENCE_BATCH_SIZE  # кадров камер в обработке одновременно (общие для всех камер)
+SCHEDULER_MODEL = None  # модель детектора для камер (None - модель по умолчанию)
+
+# Список камер: перечисляется один раз и обновляется в фоне
+CAMERA_INVENTORY_REFRESH = 60.0  # интервал полного обновления списка камер (секунд); в Windows только так находятся новые камеры
+CAMERA_INVENTORY_POLL = 2.0  # как часто проверять подключение/отключение камер в /dev (секунд, только Linux)
+CAMERA_PROBE_MAX = 10  # сколько индексов проверять, если /dev/video* недоступен (не Linux)
+
+# Метрики в формате Prometheus (GET /metrics)
+METRICS_ENABLED = True
+# Границы корзин гистограмм времени (секунд)
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Заголовок Server-Timing с временем этапов обработки в каждом ответе
+SERVER_TIMING_ENABLED = True
+
+# Профилирование отдельного запроса (заголовок X-Profile: 1 или параметр ?profile=1);
+# профиль скачивается через GET /api/v1/profiles/{id}
+PROFILING_ENABLED = False  # выключено - флаг запроса игнорируется
+PROFILING_TOKEN = None  # если задан, значение флага должно совпадать с ним (вместо "1")
+PROFILING_INTERVAL = 0.002  # интервал снятия стеков потоков (секунд)
+PROFILING_MAX_SECONDS = 30.0  # профиль одного запроса не дольше N секунд
+PROFILING_MAX_STORED = 20  # сколько последних профилей хранить в памяти
+
+# Сопровождение людей между кадрами источника (ByteTrack: фильтр Калмана и сопоставление рамок по IoU)
+TRACKER_ENABLED = True
+TRACKER_INFER_EVERY = 3  # полный проход модели на каждом N-м кадре источника, между ними - только сопровождение
+TRACKER_MAX_SKIP_SECONDS = 1.0  # не пропускать инференс, если с последнего прохода модели прошло больше N секунд
+TRACKER_HIGH_THRESHOLD = 0.3  # уверенность «надежной» детекции (первый этап сопоставления)
+TRACKER_NEW_TRACK_THRESHOLD = CONFIDENCE_THRESHOLD  # минимальная уверенность детекции, с которой начинается новый трек (как порог модели - сопровождение не меняет, кого считать)
+TRACKER_MATCH_IOU = 0.2  # минимальное IoU для сопоставления надежной детекции с треком
+TRACKER_LOW_MATCH_IOU = 0.5  # минимальное IoU для детекции с низкой уверенностью (второй этап)
+TRACKER_MIN_HITS = 3  # проходов модели с детекцией, после которых трек подтвержден и учитывается
+TRACKER_COUNT_GRACE = 2  # трек учитывается в количестве, пока пропущен не больше N проходов модели подряд
+TRACKER_MAX_AGE = 30  # проходов модели без детекции, после которых трек удаляется
+TRACKER_MAX_SOURCES = 256  # максимум отслеживаемых источников кадров
+
+# Поправка количества людей при записи в статистику для результатов без сопровождения
+# (ложные срабатывания на отдельных кадрах); количество подтвержденных треков записывается без поправки
+COUNT_ADJUSTMENT = 1
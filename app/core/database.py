@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, cast, func, Integer
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from app.core.config import DATABASE_URL, DB_TYPE
@@ -36,4 +36,23 @@ def init_db():
     """
     Инициализация базы данных - создание таблиц
     """
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+
+def sql_weekday(column):
+    """
+    SQL-выражение дня недели для столбца даты/времени (0 - понедельник, 6 - воскресенье),
+    одинаковое для SQLite и MySQL
+    """
+    if engine.dialect.name == "sqlite":
+        # strftime('%w') возвращает 0 для воскресенья - сдвигаем к нумерации Python
+        return (cast(func.strftime('%w', column), Integer) + 6) % 7
+    # MySQL: WEEKDAY() уже возвращает 0 для понедельника
+    return func.weekday(column)
+
+def sql_hour(column):
+    """
+    SQL-выражение часа (0-23) для столбца даты/времени, одинаковое для SQLite и MySQL
+    """
+    if engine.dialect.name == "sqlite":
+        return cast(func.strftime('%H', column), Integer)
+    return func.hour(column)
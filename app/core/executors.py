@@ -0,0 +1,125 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import (
+    INFERENCE_POOL_SIZE,
+    INFERENCE_POOL_QUEUE,
+    DECODE_POOL_SIZE,
+    DECODE_POOL_QUEUE,
+    DB_POOL_SIZE,
+    DB_POOL_QUEUE,
+    SCHEDULER_WORKERS,
+)
+from app.core.metrics import observe_stage, current_profile
+
+
+class PoolOverloadedError(RuntimeError):
+    """
+    Пул потоков переполнен - задача не может быть принята
+    """
+
+
+class BoundedExecutor:
+    """
+    Пул потоков с ограниченной очередью задач.
+
+    Блокирующая работа (инференс, OpenCV, синхронный SQLAlchemy) выполняется
+    в этих потоках, а цикл событий asyncio занимается только вводом-выводом.
+    Если в пуле уже max_workers + max_queue задач, новая задача отклоняется
+    с PoolOverloadedError вместо бесконечного роста очереди.
+    """
+
+    def __init__(self, name, max_workers, max_queue):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-pool")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        """
+        Количество задач в пуле (выполняющихся и ожидающих)
+        """
+        return self._pending
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            raise PoolOverloadedError(f"Пул '{self.name}' переполнен ({self.max_workers + self.max_queue} задач)")
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _call(self, submitted, fn, args, kwargs):
+        started = time.perf_counter()
+        # Ожидание свободного потока пула
+        observe_stage(f"{self.name}_queue", started - submitted)
+        profile = current_profile()
+        if profile is None:
+            result = fn(*args, **kwargs)
+        else:
+            with profile.thread():
+                result = fn(*args, **kwargs)
+        return result, time.perf_counter()
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Выполняет блокирующую функцию в пуле и ожидает результат, не блокируя цикл событий
+        """
+        # Переносим контекстные переменные запроса в поток пула
+        ctx = contextvars.copy_context()
+        result, finished = await asyncio.wrap_future(
+            self.submit(ctx.run, self._call, time.perf_counter(), fn, args, kwargs)
+        )
+        # Задержка между завершением задачи и возвратом в корутину - признак занятого цикла событий
+        observe_stage("event_loop", time.perf_counter() - finished)
+        return result
+
+    def stats(self):
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Отдельные пулы, чтобы медленный инференс не занимал потоки для работы с БД и наоборот
+inference_pool = BoundedExecutor("inference", INFERENCE_POOL_SIZE, INFERENCE_POOL_QUEUE)
+decode_pool = BoundedExecutor("decode", DECODE_POOL_SIZE, DECODE_POOL_QUEUE)
+db_pool = BoundedExecutor("db", DB_POOL_SIZE, DB_POOL_QUEUE)
+# Кадры фоновой детекции по камерам: без очереди - планировщик сам решает, чей кадр обработать следующим
+camera_pool = BoundedExecutor("camera", SCHEDULER_WORKERS, 0)
+
+
+def get_executor_stats():
+    """
+    Состояние всех пулов потоков
+    """
+    return {pool.name: pool.stats() for pool in (inference_pool, decode_pool, db_pool, camera_pool)}
+
+
+def shutdown_executors():
+    """
+    Останавливает все пулы потоков (при остановке приложения)
+    """
+    for pool in (inference_pool, decode_pool, db_pool, camera_pool):
+        pool.shutdown()
@@ -0,0 +1,129 @@
+import csv
+import datetime
+import io
+import json
+from typing import Literal
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_
+
+from app.core.config import EXPORT_CHUNK_SIZE
+from app.core.database import SessionLocal
+
+# Форматы потоковой выгрузки
+EXPORT_MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+ExportFormat = Literal["json", "ndjson", "csv"]
+
+
+def keyset_after(query, timestamp_column, id_column, after_timestamp=None, after_id=None):
+    """
+    Фильтр для постраничного вывода по ключу (timestamp, id) в порядке возрастания:
+    возвращает записи строго после указанной. В отличие от offset() стоимость
+    не растет с номером страницы - БД сразу переходит к нужному месту по индексу.
+    """
+    if after_timestamp is None:
+        return query
+    if after_id is None:
+        return query.filter(timestamp_column > after_timestamp)
+    return query.filter(or_(
+        timestamp_column > after_timestamp,
+        and_(timestamp_column == after_timestamp, id_column > after_id)
+    ))
+
+
+def keyset_before(query, timestamp_column, id_column, before_timestamp=None, before_id=None):
+    """
+    То же, что keyset_after, для порядка по убыванию: записи строго до указанной
+    """
+    if before_timestamp is None:
+        return query
+    if before_id is None:
+        return query.filter(timestamp_column < before_timestamp)
+    return query.filter(or_(
+        timestamp_column < before_timestamp,
+        and_(timestamp_column == before_timestamp, id_column < before_id)
+    ))
+
+
+def _to_json_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def _iter_chunks(build_query, fields, fmt, chunk_size):
+    """
+    Читает строки порциями по chunk_size и отдает их закодированными кусками
+    """
+    # Сессия живет столько же, сколько поток ответа, поэтому открываем ее здесь,
+    # а не через зависимость get_db, которая закрывается до окончания передачи
+    db = SessionLocal()
+    try:
+        rows = build_query(db).yield_per(chunk_size)
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(fields)
+        elif fmt == "json":
+            yield "["
+
+        first = True
+        chunk = []
+        for row in rows:
+            if fmt == "csv":
+                writer.writerow([_to_json_value(value) for value in row])
+            else:
+                item = json.dumps(dict(zip(fields, map(_to_json_value, row))), ensure_ascii=False)
+                if fmt == "json":
+                    chunk.append(item if first else "," + item)
+                else:
+                    chunk.append(item + "\n")
+            first = False
+
+            if fmt == "csv":
+                if buffer.tell() >= 64 * 1024:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            elif len(chunk) >= chunk_size:
+                yield "".join(chunk)
+                chunk = []
+
+        if fmt == "csv":
+            yield buffer.getvalue()
+        else:
+            if chunk:
+                yield "".join(chunk)
+            if fmt == "json":
+                yield "]"
+    finally:
+        db.close()
+
+
+def stream_query(build_query, fields, fmt="json", filename=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Потоковый ответ с результатами запроса в формате JSON-массива, NDJSON или CSV.
+
+    Память и время до первого байта не зависят от количества строк: строки
+    читаются из БД порциями (yield_per, на MySQL - серверный курсор) и сразу
+    отправляются клиенту.
+
+    Args:
+        build_query: Функция, принимающая сессию и возвращающая запрос по столбцам fields
+        fields: Названия полей в порядке столбцов запроса
+        fmt: "json", "ndjson" или "csv"
+        filename: Имя файла для скачивания (заголовок Content-Disposition)
+    """
+    headers = {}
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return StreamingResponse(
+        _iter_chunks(build_query, fields, fmt, chunk_size),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers=headers,
+    )
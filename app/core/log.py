@@ -0,0 +1,130 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+from app.core.config import LOG_LEVEL, LOG_LEVELS, LOG_FORMAT, LOG_SAMPLE_INTERVAL
+
+# Стандартные атрибуты LogRecord - все остальные поля считаются структурными (extra=...)
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Форматирует запись как текст или JSON, добавляя поля из extra={...}
+    """
+
+    def __init__(self, fmt_type="text"):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+        self.fmt_type = fmt_type
+
+    def format(self, record):
+        fields = {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+        if self.fmt_type == "json":
+            data = {
+                "time": self.formatTime(record),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage(),
+                **fields,
+            }
+            if record.exc_info:
+                data["exc_info"] = self.formatException(record.exc_info)
+            return json.dumps(data, ensure_ascii=False, default=str)
+
+        text = super().format(record)
+        if fields:
+            text += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return text
+
+
+class RawQueueHandler(logging.handlers.QueueHandler):
+    """
+    Кладет в очередь исходную запись, не форматируя ее.
+
+    Стандартный QueueHandler.prepare() форматирует сообщение (подстановка
+    аргументов, время, трассировка исключения) в вызывающем потоке; здесь
+    запись передается как есть, с исходными msg и args, и все форматирование
+    выполняет поток QueueListener. Поэтому аргументы сообщений не должны
+    изменяться после вызова логгера.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logging():
+    """
+    Настраивает логирование приложения.
+
+    Записи из всех потоков кладутся в очередь без форматирования (RawQueueHandler),
+    а форматирование и вывод выполняет отдельный поток (QueueListener), поэтому
+    запись в stdout не тормозит обработку запросов.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(StructuredFormatter(LOG_FORMAT))
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(LOG_LEVEL)
+    app_logger.addHandler(RawQueueHandler(log_queue))
+    app_logger.propagate = False
+
+    # Отдельные уровни для модулей, например {"app.ml.yolo_detector": "DEBUG"}
+    for name, level in LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level)
+
+
+def get_logger(name):
+    """
+    Возвращает логгер модуля (вызывается как get_logger(__name__))
+    """
+    return logging.getLogger(name)
+
+
+class SampledLogger:
+    """
+    Ограничивает частоту повторяющихся сообщений (например, на каждый кадр).
+
+    Сообщение с данным ключом выводится не чаще раза в interval секунд,
+    к нему добавляется число подавленных за это время сообщений.
+    """
+
+    def __init__(self, logger, interval=LOG_SAMPLE_INTERVAL):
+        self.logger = logger
+        self.interval = interval
+        self._last_emit = {}
+        self._suppressed = {}
+        self._lock = threading.Lock()
+
+    def log(self, level, key, msg, *args, **kwargs):
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_emit.get(key, float("-inf")) < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return
+            self._last_emit[key] = now
+            suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            msg = f"{msg} (еще {suppressed} похожих сообщений за {self.interval:g} с)"
+        self.logger.log(level, msg, *args, **kwargs)
+
+    def info(self, key, msg, *args, **kwargs):
+        self.log(logging.INFO, key, msg, *args, **kwargs)
+
+    def warning(self, key, msg, *args, **kwargs):
+        self.log(logging.WARNING, key, msg, *args, **kwargs)
@@ -0,0 +1,321 @@
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from app.core.config import METRICS_ENABLED, METRICS_BUCKETS, SERVER_TIMING_ENABLED, SCHEDULER_CAMERAS, CAMERA_SOURCES
+from app.core.profiling import RequestProfile, profile_requested, profile_store
+
+# Метки текущего запроса (эндпоинт и камера). BoundedExecutor.run копирует контекст
+# в поток пула, поэтому этапы, выполняемые в пулах, получают метки своего запроса
+_request_labels = contextvars.ContextVar("metric_labels", default=None)
+
+
+class RequestLabels:
+    """
+    Метки запроса для метрик: эндпоинт (шаблон пути маршрута) и камера,
+    а также суммарное время этапов запроса (для заголовка Server-Timing)
+    и профиль запроса, если он снимается
+    """
+
+    __slots__ = ("scope", "name", "camera", "timings", "profile")
+
+    def __init__(self, scope=None, name=None, camera=""):
+        self.scope = scope
+        self.name = name
+        self.camera = camera
+        self.timings = {}
+        self.profile = None
+
+    @property
+    def endpoint(self):
+        if self.name is not None:
+            return self.name
+        # Маршрут становится известен только после маршрутизации, поэтому берем его при обращении;
+        # шаблон пути (/cameras/{camera_id}/latest), а не сам путь - иначе меток будет неограниченно много
+        template = getattr(self.scope.get("route"), "path_format", None)
+        if template is None:
+            return "unmatched"
+        # У маршрутов вложенного роутера шаблон может быть без префикса (/api/v1) -
+        # берем префикс из начала фактического пути
+        segments = self.scope["path"].split("/")
+        return "/".join(segments[:len(segments) - template.count("/")]) + template
+
+
+def current_profile():
+    """
+    Профиль текущего запроса (None - запрос не профилируется)
+    """
+    labels = _request_labels.get()
+    return labels.profile if labels is not None else None
+
+
+# Камеры, для которых ведутся отдельные серии метрик: из настроек и из списка камер системы.
+# camera_id приходит от клиента - остальные значения сводятся в метку "other",
+# иначе число серий не ограничено
+_configured_cameras = frozenset(str(camera_id) for camera_id in [*SCHEDULER_CAMERAS, *CAMERA_SOURCES])
+_known_cameras = _configured_cameras
+
+
+def set_known_cameras(camera_ids):
+    """
+    Обновляет список камер с собственной меткой (вызывается при перечислении камер)
+    """
+    global _known_cameras
+    _known_cameras = _configured_cameras | {str(camera_id) for camera_id in camera_ids}
+
+
+def camera_label(camera_id):
+    """
+    Значение метки camera: индекс известной камеры или "other"
+    """
+    camera = str(camera_id)
+    if camera == "" or camera in _known_cameras:
+        return camera
+    return "other"
+
+
+def set_camera(camera_id):
+    """
+    Отмечает, что текущий запрос обрабатывает кадр камеры
+    """
+    labels = _request_labels.get()
+    if labels is not None:
+        labels.camera = camera_label(camera_id)
+
+
+@contextmanager
+def task_labels(name, camera=""):
+    """
+    Метки для фоновой задачи (например, кадра планировщика камер)
+    """
+    token = _request_labels.set(RequestLabels(name=name, camera=camera_label(camera)))
+    try:
+        yield
+    finally:
+        _request_labels.reset(token)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Гистограмма в формате Prometheus.
+
+    Наблюдение - поиск корзины и увеличение счетчика под блокировкой,
+    накопленные суммы по корзинам считаются только при выдаче метрик,
+    поэтому гистограммы можно держать включенными постоянно.
+    """
+
+    def __init__(self, name, description, labelnames=(), buckets=METRICS_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # значения меток -> [счетчики корзин (последняя - +Inf), сумма]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        """
+        Args:
+            value: Наблюдаемое значение (для времени - секунды)
+            labels: Значения меток в порядке labelnames
+        """
+        if not METRICS_ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for labels, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, labels, ('le', format_value(float(bound))))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def render_family(name, metric_type, description, samples):
+    """
+    Метрика, значения которой снимаются в момент запроса (gauge или counter)
+
+    Args:
+        samples: Список пар (словарь меток, значение)
+    """
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        lines.append(f"{name}{format_labels(labels.keys(), labels.values())} {format_value(value)}")
+    return lines
+
+
+# Время этапов обработки кадра: decode_base64, decode, inference (с ожиданием в очереди модели),
+# postprocess, db_commit
+stage_seconds = Histogram(
+    "detector_stage_seconds", "Время этапа обработки кадра", ("stage", "endpoint", "camera")
+)
+# Время пакетного вызова модели (без ожидания в очереди) и размер пакета
+inference_batch_seconds = Histogram(
+    "detector_inference_batch_seconds", "Время вызова модели на пакет кадров", ("model",)
+)
+inference_batch_size = Histogram(
+    "detector_inference_batch_size", "Количество кадров в пакете инференса", ("model",),
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+# Полное время обработки HTTP-запроса
+request_seconds = Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса", ("method", "endpoint", "camera", "status")
+)
+
+HISTOGRAMS = [stage_seconds, inference_batch_seconds, inference_batch_size, request_seconds]
+
+# Количество HTTP-запросов в обработке (меняется только в цикле событий)
+requests_in_flight = 0
+
+
+def observe_stage(stage, seconds):
+    labels = _request_labels.get()
+    if labels is None:
+        stage_seconds.observe(seconds, (stage, "background", ""))
+        return
+    labels.timings[stage] = labels.timings.get(stage, 0.0) + seconds
+    stage_seconds.observe(seconds, (stage, labels.endpoint, labels.camera))
+
+
+@contextmanager
+def time_stage(stage):
+    """
+    Замеряет время блока как этап обработки текущего запроса
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def timed_stage(stage):
+    """
+    Декоратор: время каждого вызова функции учитывается как этап обработки
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with time_stage(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing(timings, total):
+    """
+    Значение заголовка Server-Timing: время этапов и общее время в миллисекундах
+    """
+    parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: время и статус HTTP-запросов, количество запросов в обработке,
+    метки запроса для этапов обработки кадра, заголовок Server-Timing
+    и профилирование запроса по флагу (PROFILING_ENABLED)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        labels = RequestLabels(scope)
+        token = _request_labels.set(labels)
+        if scope["type"] == "websocket":
+            # Соединение живет долго - учитываем только этапы обработки кадров
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                _request_labels.reset(token)
+
+        global requests_in_flight
+        status = 500
+        started = time.perf_counter()
+
+        profile = None
+        if profile_requested(scope):
+            profile = labels.profile = RequestProfile(scope["method"], scope["path"])
+            profile.start(loop_thread=threading.get_ident())
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                if SERVER_TIMING_ENABLED:
+                    # Этапы, завершившиеся до начала ответа (у потоковых ответов - без выгрузки данных)
+                    value = server_timing(labels.timings, time.perf_counter() - started)
+                    headers.append((b"server-timing", value.encode("latin-1")))
+                if profile is not None:
+                    headers.append((b"x-profile-id", profile.id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        requests_in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            requests_in_flight -= 1
+            request_seconds.observe(time.perf_counter() - started,
+                                    (scope["method"], labels.endpoint, labels.camera, str(status)))
+            _request_labels.reset(token)
+            if profile is not None:
+                profile.stop()
+                profile_store.add(profile)
+
+
+def render(families=()):
+    """
+    Текст всех метрик в формате Prometheus (text exposition format 0.0.4)
+
+    Args:
+        families: Дополнительные метрики - списки строк render_family
+    """
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    lines.extend(render_family("http_requests_in_flight", "gauge", "HTTP-запросов в обработке",
+                               [({}, requests_in_flight)]))
+    for family in families:
+        lines.extend(family)
+    return "\n".join(lines) + "\n"
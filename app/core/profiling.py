@@ -0,0 +1,186 @@
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from urllib.parse import parse_qs
+
+from app.core.config import (
+    PROFILING_ENABLED,
+    PROFILING_TOKEN,
+    PROFILING_INTERVAL,
+    PROFILING_MAX_SECONDS,
+    PROFILING_MAX_STORED,
+)
+from app.core.log import get_logger
+
+logger = get_logger(__name__)
+
+# Корень проекта - пути файлов в стеках показываем относительно него
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def profile_requested(scope):
+    """
+    Запрошено ли профилирование: заголовок X-Profile или параметр profile.
+    Учитывается только при PROFILING_ENABLED; при заданном PROFILING_TOKEN
+    значение флага должно совпадать с ним
+    """
+    if not PROFILING_ENABLED:
+        return False
+    value = None
+    for name, header in scope["headers"]:
+        if name == b"x-profile":
+            value = header.decode("latin-1")
+            break
+    if value is None and b"profile=" in scope["query_string"]:
+        value = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [None])[0]
+    if value is None:
+        return False
+    if PROFILING_TOKEN is not None:
+        return secrets.compare_digest(value, PROFILING_TOKEN)
+    return value.lower() in ("1", "true", "yes")
+
+
+def frame_name(frame):
+    code = frame.f_code
+    path = code.co_filename
+    if path.startswith(_ROOT):
+        path = os.path.relpath(path, _ROOT)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ":")
+
+
+class RequestProfile:
+    """
+    Профиль одного запроса, снятый выборкой стеков.
+
+    Отдельный поток раз в PROFILING_INTERVAL снимает стеки потоков, которые
+    сейчас работают на запрос: потока цикла событий (в нем видно и блокирование
+    цикла другими задачами) и потоков пулов, пока они выполняют задачи запроса.
+    В отличие от cProfile, профиль охватывает все эти потоки, а код, который
+    не профилируется, не замедляется.
+
+    Результат - стеки в свернутом формате ("корень;...;функция количество"),
+    который понимают flamegraph.pl и speedscope.
+    """
+
+    def __init__(self, method, path, interval=PROFILING_INTERVAL, max_seconds=PROFILING_MAX_SECONDS):
+        self.id = secrets.token_hex(8)
+        self.method = method
+        self.path = path
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.started_at = time.time()
+        self.duration = None
+        self.samples = 0
+        self.stacks = Counter()
+
+        # Потоки, работающие на запрос: идентификатор -> количество вложенных входов
+        self._threads = Counter()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @contextmanager
+    def thread(self):
+        """
+        Отмечает текущий поток как работающий на запрос
+        """
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._threads[ident] -= 1
+                if self._threads[ident] <= 0:
+                    del self._threads[ident]
+
+    def start(self, loop_thread=None):
+        if loop_thread is not None:
+            self._threads[loop_thread] += 1
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.id}", daemon=True)
+        self._thread.start()
+
+    def _sample(self):
+        own = threading.get_ident()
+        with self._lock:
+            threads = [ident for ident in self._threads if ident != own]
+        frames = sys._current_frames()
+        for ident in threads:
+            frame = frames.get(ident)
+            stack = []
+            while frame is not None:
+                stack.append(frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def _run(self):
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop_event.wait(self.interval):
+            self._sample()
+            if time.monotonic() > deadline:
+                logger.warning("Профиль %s %s остановлен через %.0f с", self.method, self.path, self.max_seconds)
+                break
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.time() - self.started_at
+
+    def folded(self):
+        """
+        Стеки в свернутом формате (по строке на стек, самые частые - первыми)
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def info(self):
+        leaf = Counter()
+        for stack, count in self.stacks.items():
+            leaf[stack.rsplit(";", 1)[-1]] += count
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 1) if self.duration is not None else None,
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            # Функции, в которых чаще всего застает выборка
+            "top": [{"function": name, "samples": count} for name, count in leaf.most_common(10)],
+        }
+
+
+class ProfileStore:
+    """
+    Последние профили запросов в памяти
+    """
+
+    def __init__(self, max_stored=PROFILING_MAX_STORED):
+        self.max_stored = max_stored
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > self.max_stored:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id):
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self):
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [profile.info() for profile in reversed(profiles)]
+
+
+profile_store = ProfileStore()
@@ -0,0 +1,199 @@
+from sqlalchemy import case, func, or_, select
+
+from app.core.database import sql_weekday, sql_hour
+from app.core.log import get_logger
+from app.models.student import (
+    Attendance,
+    AttendanceLessonRollup,
+    AttendanceHourRollup,
+    AttendanceWeekdayRollup,
+)
+
+logger = get_logger(__name__)
+
+ROLLUP_MODELS = (AttendanceLessonRollup, AttendanceHourRollup, AttendanceWeekdayRollup)
+
+
+def _new_bucket():
+    return {"sum_count": 0, "max_count": 0, "total_records": 0}
+
+
+def _add_to_bucket(bucket, count):
+    bucket["total_records"] += 1
+    if count is not None:
+        bucket["sum_count"] += count
+        bucket["max_count"] = max(bucket["max_count"], count)
+
+
+def bucket_rows(rows):
+    """
+    Сворачивает пакет записей посещаемости в приращения агрегатов
+
+    Args:
+        rows: Список словарей с полями timestamp, count, lesson_number, date
+
+    Returns:
+        tuple: Списки значений для таблиц по парам, по часам и по дням недели
+    """
+    lessons, hours, weekdays = {}, {}, {}
+    for row in rows:
+        timestamp, count = row["timestamp"], row["count"]
+
+        if row["date"] is not None and row["lesson_number"] is not None:
+            key = (row["date"], row["lesson_number"])
+            bucket = lessons.setdefault(key, {**_new_bucket(), "last_timestamp": None, "last_count": None})
+            _add_to_bucket(bucket, count)
+            if bucket["last_timestamp"] is None or timestamp >= bucket["last_timestamp"]:
+                bucket["last_timestamp"] = timestamp
+                bucket["last_count"] = count
+
+        _add_to_bucket(hours.setdefault(timestamp.hour, _new_bucket()), count)
+        _add_to_bucket(weekdays.setdefault(timestamp.weekday(), _new_bucket()), count)
+
+    return (
+        [{"date": date, "lesson_number": lesson, **bucket} for (date, lesson), bucket in lessons.items()],
+        [{"hour": hour, **bucket} for hour, bucket in hours.items()],
+        [{"weekday": weekday, **bucket} for weekday, bucket in weekdays.items()],
+    )
+
+
+def _upsert(db, model, values):
+    """
+    Прибавляет приращения к строкам агрегатов одной командой INSERT ... ON CONFLICT/ON DUPLICATE KEY.
+
+    Обновление выполняет сама БД, поэтому несколько процессов приложения
+    могут сбрасывать записи одновременно без потери приращений.
+    """
+    if not values:
+        return
+    table = model.__table__
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(values)
+        new = stmt.inserted
+        greatest = func.greatest
+    elif dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(values)
+        new = stmt.excluded
+        # В SQLite max() с несколькими аргументами - скалярная функция
+        greatest = func.max if dialect == "sqlite" else func.greatest
+    else:
+        raise ValueError(f"Агрегаты посещаемости не поддерживают БД {dialect}")
+
+    updates = [
+        ("sum_count", table.c.sum_count + new.sum_count),
+        ("max_count", greatest(table.c.max_count, new.max_count)),
+        ("total_records", table.c.total_records + new.total_records),
+    ]
+    if "last_timestamp" in table.c:
+        newer = or_(table.c.last_timestamp.is_(None), new.last_timestamp >= table.c.last_timestamp)
+        # MySQL применяет присваивания по порядку: last_timestamp меняем последним
+        updates += [
+            ("last_count", case((newer, new.last_count), else_=table.c.last_count)),
+            ("last_timestamp", case((newer, new.last_timestamp), else_=table.c.last_timestamp)),
+        ]
+
+    if dialect == "mysql":
+        stmt = stmt.on_duplicate_key_update(updates)
+    else:
+        stmt = stmt.on_conflict_do_update(index_elements=[c.name for c in table.primary_key], set_=dict(updates))
+    db.execute(stmt)
+
+
+def apply_rollups(db, rows):
+    """
+    Обновляет таблицы агрегатов по пакету новых записей.
+
+    Вызывается в той же транзакции, что и вставка самих записей, поэтому
+    агрегаты и сырые данные не расходятся при ошибке сброса.
+    """
+    lessons, hours, weekdays = bucket_rows(rows)
+    _upsert(db, AttendanceLessonRollup, lessons)
+    _upsert(db, AttendanceHourRollup, hours)
+    _upsert(db, AttendanceWeekdayRollup, weekdays)
+
+
+def rebuild_rollups(db):
+    """
+    Пересчитывает все агрегаты по таблице attendance (разовое заполнение истории).
+
+    Запускать при остановленном приложении: записи, сброшенные во время
+    пересчета, могут быть учтены дважды.
+    """
+    for model in ROLLUP_MODELS:
+        db.query(model).delete(synchronize_session=False)
+
+    attendance = Attendance.__table__
+    aggregates = [
+        func.coalesce(func.sum(attendance.c.count), 0),
+        func.coalesce(func.max(attendance.c.count), 0),
+        func.count(attendance.c.id),
+    ]
+
+    # Количество в последнем замере пары - из соседней строки по индексу (date, lesson_number, timestamp)
+    latest = attendance.alias("latest")
+    last_count = select(latest.c.count).where(
+        latest.c.date == attendance.c.date,
+        latest.c.lesson_number == attendance.c.lesson_number
+    ).order_by(latest.c.timestamp.desc(), latest.c.id.desc()).limit(1).scalar_subquery()
+
+    lesson_select = select(
+        attendance.c.date,
+        attendance.c.lesson_number,
+        *aggregates,
+        func.max(attendance.c.timestamp),
+        last_count,
+    ).where(
+        attendance.c.date.isnot(None),
+        attendance.c.lesson_number.isnot(None)
+    ).group_by(attendance.c.date, attendance.c.lesson_number)
+    db.execute(AttendanceLessonRollup.__table__.insert().from_select(
+        ["date", "lesson_number", "sum_count", "max_count", "total_records", "last_timestamp", "last_count"],
+        lesson_select
+    ))
+
+    for model, key, bucket in (
+        (AttendanceHourRollup, "hour", sql_hour(attendance.c.timestamp)),
+        (AttendanceWeekdayRollup, "weekday", sql_weekday(attendance.c.timestamp)),
+    ):
+        bucket = bucket.label(key)
+        bucket_select = select(bucket, *aggregates).where(
+            attendance.c.timestamp.isnot(None)
+        ).group_by(bucket)
+        db.execute(model.__table__.insert().from_select(
+            [key, "sum_count", "max_count", "total_records"],
+            bucket_select
+        ))
+
+    db.commit()
+    logger.info("Агрегаты посещаемости пересчитаны")
+
+
+def read_rollup_stats(db, model, key_column):
+    """
+    Читает статистику из таблицы агрегатов
+
+    Args:
+        db: Сессия БД
+        model: Модель агрегатов (по часам или по дням недели)
+        key_column: Столбец интервала
+
+    Returns:
+        dict: Среднее, максимум и количество записей по значению интервала
+    """
+    rows = db.query(key_column, model.sum_count, model.max_count, model.total_records).all()
+    return {
+        int(key): {
+            "average_count": round(int(sum_count) / total_records, 2),
+            "max_count": max_count,
+            "total_records": total_records
+        }
+        for key, sum_count, max_count, total_records in rows
+        if total_records
+    }
@@ -1,9 +1,28 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from app.api.v1.endpoints import detect, health
+from app.core.log import setup_logging, get_logger, SampledLogger
+
+# Логирование настраиваем до импорта модулей, которые пишут в лог при загрузке
+setup_logging()
+
+from app.api.v1.endpoints import detect, health, models, metrics, profiles
 from app.api.v1.endpoints import attendance_routes      # <-- добавь это!
+from app.core.attendance_writer import attendance_writer
+from app.core.config import METRICS_ENABLED, SERVER_TIMING_ENABLED, PROFILING_ENABLED, MODEL_ADMIN_ENABLED
 from app.core.database import init_db
+from app.core.executors import PoolOverloadedError, shutdown_executors
+from app.core.metrics import MetricsMiddleware
+from app.ml import yolo_detector
+from app.ml.camera_worker import stop_camera_workers
+from app.ml.camera_scheduler import camera_scheduler
+from app.ml.camera_inventory import camera_inventory
+from app.ml.inference_batcher import QueueFullError
+from app.ml.model_registry import ModelNotReadyError, ModelNotFoundError
+
+logger = get_logger(__name__)
+sampled_logger = SampledLogger(logger)
 
 app = FastAPI()
 
@@ -13,12 +32,59 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Время этапов и идентификатор профиля доступны коду фронтенда
+    expose_headers=["Server-Timing", "X-Profile-Id"],
 )
 
+if METRICS_ENABLED or SERVER_TIMING_ENABLED or PROFILING_ENABLED:
+    # Время и статус запросов для GET /metrics, заголовок Server-Timing, профилирование по флагу
+    app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(PoolOverloadedError)
+@app.exception_handler(QueueFullError)
+@app.exception_handler(ModelNotReadyError)
+async def overload_handler(request: Request, exc: Exception):
+    # Сервер перегружен или модель еще загружается - клиент может повторить запрос позже
+    sampled_logger.warning(request.url.path, "Запрос %s отклонен: %s", request.url.path, exc)
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(ModelNotFoundError)
+async def model_not_found_handler(request: Request, exc: ModelNotFoundError):
+    # Запрошена неизвестная модель или ее веса не удалось загрузить
+    return JSONResponse(status_code=404, content={"detail": str(exc)})
+
 @app.on_event("startup")
 def startup_event():
     init_db()
+    attendance_writer.start()
+    # Модель загружается и прогревается в фоне - сервер начинает отвечать сразу,
+    # готовность детектора показывает /api/v1/ready
+    yolo_detector.start_model_loading()
+    # Фоновая детекция по камерам из SCHEDULER_CAMERAS (начинается после загрузки модели)
+    camera_scheduler.start()
+    # Список камер перечисляется в фоне и обновляется при подключении камер
+    camera_inventory.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    # Освобождаем камеры, удерживаемые фоновыми потоками захвата
+    camera_scheduler.stop()
+    camera_inventory.stop()
+    stop_camera_workers()
+    yolo_detector.stop_model()
+    # Сбрасываем в БД записи, оставшиеся в буфере
+    attendance_writer.stop()
+    shutdown_executors()
 
 app.include_router(health.router, prefix="/api/v1")
 app.include_router(detect.router, prefix="/api/v1")
-app.include_router(attendance_routes.router, prefix="/api/v1")  # <-- добавь это!
\ No newline at end of file
+app.include_router(models.router, prefix="/api/v1")
+# Загрузка, замена и выгрузка моделей - только при явном включении (и с токеном)
+if MODEL_ADMIN_ENABLED:
+    app.include_router(models.admin_router, prefix="/api/v1")
+app.include_router(attendance_routes.router, prefix="/api/v1")  # <-- добавь это!
+# Метрики - по стандартному для Prometheus пути /metrics
+if METRICS_ENABLED:
+    app.include_router(metrics.router)
+if PROFILING_ENABLED:
+    app.include_router(profiles.router, prefix="/api/v1")
\ No newline at end of file
@@ -0,0 +1,198 @@
+import glob
+import os
+import re
+import threading
+import time
+
+import cv2
+
+from app.core.config import CAMERA_INVENTORY_REFRESH, CAMERA_INVENTORY_POLL, CAMERA_PROBE_MAX, CAMERA_SOURCES
+from app.core.log import get_logger
+from app.core.metrics import set_known_cameras
+from app.ml.camera_worker import active_camera_ids
+
+logger = get_logger(__name__)
+
+# Каталог описаний устройств video4linux
+V4L_SYSFS = "/sys/class/video4linux"
+
+
+def _read_sysfs(device, name):
+    try:
+        with open(os.path.join(V4L_SYSFS, device, name), encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def list_video_devices():
+    """
+    Камеры из /dev/video* (Linux) без открытия устройств.
+
+    Одна USB-камера создает несколько узлов /dev/videoN; узлы метаданных
+    (index в sysfs не 0) пропускаются.
+
+    Returns:
+        list или None: Словари с индексом, названием и путем устройства; None, если /dev/video* недоступен
+    """
+    paths = glob.glob("/dev/video*")
+    if not paths and not os.path.isdir(V4L_SYSFS):
+        return None
+
+    cameras = []
+    for path in paths:
+        match = re.fullmatch(r"/dev/video(\d+)", path)
+        if match is None:
+            continue
+        device = os.path.basename(path)
+        if _read_sysfs(device, "index") not in (None, "0"):
+            continue
+        camera_id = int(match.group(1))
+        cameras.append({
+            "id": camera_id,
+            "name": _read_sysfs(device, "name") or f"Камера {camera_id}",
+            "device": path,
+        })
+    return sorted(cameras, key=lambda camera: camera["id"])
+
+
+def configured_sources():
+    """
+    Источники кадров из CAMERA_SOURCES (видеофайлы, изображения, сгенерированные кадры)
+    """
+    return [
+        {"id": camera_id, "name": f"Источник {spec}", "device": str(spec)}
+        for camera_id, spec in sorted(CAMERA_SOURCES.items())
+    ]
+
+
+def probe_cameras(max_cameras=10, skip=()):
+    """
+    Проверяет камеры открытием cv2.VideoCapture (если /dev/video* недоступен).
+    Медленно: каждый отсутствующий индекс открывается с ожиданием.
+
+    Args:
+        max_cameras: Максимальное количество камер для проверки
+        skip: Индексы камер, которые не нужно открывать (уже заняты рабочими потоками)
+    """
+    cameras = []
+    for i in range(max_cameras):
+        if i in skip:
+            cameras.append({"id": i, "name": f"Камера {i}", "device": None})
+            continue
+        cap = cv2.VideoCapture(i)
+        if cap.isOpened():
+            cameras.append({"id": i, "name": f"Камера {i}", "device": None})
+        cap.release()
+    return cameras
+
+
+class CameraInventory:
+    """
+    Список камер системы.
+
+    Камеры перечисляются один раз и хранятся в памяти; фоновый поток
+    обновляет список раз в CAMERA_INVENTORY_REFRESH секунд и сразу при
+    появлении или исчезновении узлов /dev/video* (подключение камеры).
+    Камеры, которые удерживают рабочие потоки захвата, не открываются
+    повторно, а отмечаются как занятые.
+
+    В Windows и macOS узлов /dev/video* нет, и подключение камеры не отслеживается:
+    список обновляется только полным перебором индексов (probe_cameras) раз в
+    CAMERA_INVENTORY_REFRESH секунд.
+    """
+
+    def __init__(self, refresh_interval=60.0, poll_interval=2.0, probe_max=10):
+        self.refresh_interval = refresh_interval
+        self.poll_interval = poll_interval
+        self.probe_max = probe_max
+        self.refreshed_at = None
+        self.refreshes = 0
+
+        self._cameras = None
+        self._signature = None
+        self._lock = threading.Lock()
+        # Перечисление может быть медленным - одновременно выполняется только одно
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _device_signature():
+        """
+        Набор узлов /dev/video* - меняется при подключении и отключении камер
+        """
+        return frozenset(glob.glob("/dev/video*"))
+
+    def refresh(self):
+        """
+        Перечисляет камеры заново
+        """
+        with self._refresh_lock:
+            started = time.perf_counter()
+            signature = self._device_signature()
+            cameras = list_video_devices()
+            if cameras is None:
+                cameras = probe_cameras(self.probe_max, skip=active_camera_ids() | set(CAMERA_SOURCES))
+            # Индексы, занятые источниками кадров, открываются как источники, а не как устройства
+            cameras = sorted([camera for camera in cameras if camera["id"] not in CAMERA_SOURCES] + configured_sources(),
+                             key=lambda camera: camera["id"])
+            with self._lock:
+                self._cameras = cameras
+                self._signature = signature
+                self.refreshed_at = time.time()
+                self.refreshes += 1
+            # Метрики ведутся отдельно только по существующим камерам
+            set_known_cameras(camera["id"] for camera in cameras)
+        logger.info("Список камер обновлен за %.3f с: %s", time.perf_counter() - started,
+                    [camera["id"] for camera in cameras])
+        return cameras
+
+    def cameras(self):
+        """
+        Список камер из памяти (при первом вызове - перечисление)
+
+        Returns:
+            list: Словари с индексом, названием, путем устройства и признаком busy
+                (камера открыта рабочим потоком захвата)
+        """
+        with self._lock:
+            cameras = self._cameras
+        if cameras is None:
+            with self._refresh_lock:
+                cameras = self._cameras
+            if cameras is None:
+                cameras = self.refresh()
+        busy = active_camera_ids()
+        return [{**camera, "busy": camera["id"] in busy} for camera in cameras]
+
+    def _run(self):
+        # Первое перечисление - сразу; при ошибке оно повторяется на следующей проверке
+        next_refresh = time.monotonic() if self._cameras is None else time.monotonic() + self.refresh_interval
+        while True:
+            try:
+                if time.monotonic() >= next_refresh or self._device_signature() != self._signature:
+                    self.refresh()
+                    next_refresh = time.monotonic() + self.refresh_interval
+            except Exception as e:
+                logger.exception("Ошибка обновления списка камер: %s", e)
+            if self._stop_event.wait(self.poll_interval):
+                break
+
+    def start(self):
+        """
+        Перечисляет камеры и запускает фоновое обновление списка
+        """
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="camera-inventory", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+
+# Общий список камер приложения
+camera_inventory = CameraInventory(CAMERA_INVENTORY_REFRESH, CAMERA_INVENTORY_POLL, CAMERA_PROBE_MAX)
@@ -0,0 +1,231 @@
+import threading
+import time
+
+from app.core.config import SCHEDULER_CAMERAS, SCHEDULER_TARGET_FPS, SCHEDULER_WORKERS, SCHEDULER_MODEL
+from app.core.executors import camera_pool
+from app.core.log import get_logger, SampledLogger
+from app.core.metrics import task_labels
+from app.ml.camera_worker import get_camera_worker
+from app.ml.model_registry import ModelNotReadyError
+from app.ml import yolo_detector
+
+logger = get_logger(__name__)
+sampled_logger = SampledLogger(logger)
+
+
+class CameraState:
+    """
+    Состояние камеры в планировщике: последний результат и счетчики
+    """
+
+    def __init__(self, camera_id):
+        self.camera_id = camera_id
+        self.result = None
+        self.result_time = None
+        self.error = None
+        self.frames = 0
+        self.errors = 0
+        # Сглаженные интервал между кадрами и частота обработанных кадров
+        self.interval = None
+        self.fps = 0.0
+        self.latency_ms = None
+        # Время, когда камере положен следующий кадр
+        self.next_due = time.monotonic()
+        self.inflight = False
+
+    def info(self):
+        return {
+            "camera_id": self.camera_id,
+            "frames": self.frames,
+            "errors": self.errors,
+            "fps": round(self.fps, 2),
+            "latency_ms": round(self.latency_ms, 1) if self.latency_ms is not None else None,
+            "last_result_age": round(time.time() - self.result_time, 2) if self.result_time else None,
+            "error": self.error,
+        }
+
+
+class CameraScheduler:
+    """
+    Фоновая детекция по нескольким камерам.
+
+    Один поток планировщика раздает кадры камер в общий пул camera_pool
+    (SCHEDULER_WORKERS потоков). Каждой камере положен кадр раз в 1 / SCHEDULER_TARGET_FPS
+    секунд; когда поток пула освобождается, его получает камера, которая дольше всех
+    ждет своей очереди, и у камеры не бывает больше одного кадра в обработке -
+    поэтому медленная камера не отнимает пул у остальных. Кадры разных камер
+    попадают в общую очередь модели и обрабатываются пакетами.
+
+    Последний результат каждой камеры хранится в памяти и отдается сразу, без инференса.
+    """
+
+    def __init__(self, camera_ids=(), target_fps=2.0, workers=8, model_name=None):
+        self.target_fps = target_fps
+        self.workers = workers
+        self.model_name = model_name
+        self.cameras = {camera_id: CameraState(camera_id) for camera_id in camera_ids}
+
+        self._slots = threading.Semaphore(workers)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        Запускает планировщик (ничего не делает, если камеры не заданы или он уже запущен)
+        """
+        if not self.cameras or self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="camera-scheduler", daemon=True)
+        self._thread.start()
+        logger.info("Планировщик камер запущен: камеры %s, %.1f кадр/с на камеру, %d потоков",
+                    list(self.cameras), self.target_fps, self.workers)
+
+    def stop(self, timeout=2.0):
+        """
+        Останавливает планировщик и ждет завершения кадров в обработке
+        """
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._thread is None:
+            return
+        self._thread.join(timeout)
+        # Кадр в обработке держит поток пула - забираем все потоки, чтобы дождаться их
+        deadline = time.monotonic() + timeout
+        acquired = 0
+        while acquired < self.workers and self._slots.acquire(timeout=max(0, deadline - time.monotonic())):
+            acquired += 1
+        for _ in range(acquired):
+            self._slots.release()
+
+    def _next_camera(self):
+        """
+        Камера, которая дольше всех ждет кадра, и сколько до ее очереди (секунд)
+        """
+        with self._lock:
+            waiting = [state for state in self.cameras.values() if not state.inflight]
+            if not waiting:
+                return None, None
+            state = min(waiting, key=lambda s: s.next_due)
+            return state, state.next_due - time.monotonic()
+
+    def _run(self):
+        # До загрузки модели кадры обрабатывать нечем
+        while not yolo_detector.wait_until_ready(1.0):
+            if self._stop_event.is_set():
+                return
+
+        period = 1.0 / self.target_fps
+        while not self._stop_event.is_set():
+            state, delay = self._next_camera()
+            if state is None or delay > 0:
+                # Ждем очереди ближайшей камеры или завершения кадра в обработке
+                self._wakeup.wait(period if delay is None else delay)
+                self._wakeup.clear()
+                continue
+
+            # Ждем свободный поток пула; после ожидания выбираем камеру заново
+            if not self._slots.acquire(timeout=period):
+                continue
+            with self._lock:
+                state.inflight = True
+                # Следующий кадр - через период после положенного времени, но не раньше, чем сейчас:
+                # отставшая камера не получает серию кадров подряд
+                state.next_due = max(state.next_due + period, time.monotonic())
+            try:
+                future = camera_pool.submit(self._process, state)
+            except Exception as e:
+                self._finish(state, None, error=str(e))
+                continue
+            future.add_done_callback(lambda _f, state=state: self._finish(state))
+
+    def _process(self, state):
+        """
+        Детекция на свежем кадре камеры (выполняется в пуле camera_pool)
+        """
+        started = time.perf_counter()
+        try:
+            # Этапы обработки кадра попадают в метрики с меткой камеры
+            with task_labels("scheduler", state.camera_id):
+                frame = get_camera_worker(state.camera_id).get_frame()
+                if frame is None:
+                    raise RuntimeError(f"Не удалось получить кадр с камеры {state.camera_id}")
+                result = yolo_detector.detect_people_from_image(frame, source=f"camera:{state.camera_id}",
+                                                                model_name=self.model_name)
+            result["camera_id"] = state.camera_id
+            result["timestamp"] = time.time()
+            self._store(state, result, time.perf_counter() - started)
+        except ModelNotReadyError as e:
+            state.error = str(e)
+        except Exception as e:
+            state.errors += 1
+            state.error = str(e)
+            sampled_logger.warning(f"scheduler-camera-{state.camera_id}", "Камера %d: %s", state.camera_id, e,
+                                   extra={"camera_id": state.camera_id})
+
+    def _store(self, state, result, seconds):
+        with self._lock:
+            now = time.time()
+            if state.result_time is not None:
+                # Сглаживаем интервал между кадрами, а не мгновенную частоту - она завышает среднее
+                interval = now - state.result_time
+                state.interval = interval if state.interval is None else state.interval + 0.2 * (interval - state.interval)
+                state.fps = 1.0 / state.interval if state.interval > 0 else 0.0
+            latency_ms = seconds * 1000
+            state.latency_ms = latency_ms if state.latency_ms is None else state.latency_ms + 0.2 * (latency_ms - state.latency_ms)
+            state.result = result
+            state.result_time = now
+            state.frames += 1
+            state.error = None
+
+    def _finish(self, state, _future=None, error=None):
+        with self._lock:
+            state.inflight = False
+            if error is not None:
+                state.errors += 1
+                state.error = error
+        self._slots.release()
+        self._wakeup.set()
+
+    def latest(self, camera_id=None):
+        """
+        Последние результаты камер
+
+        Args:
+            camera_id: Индекс камеры (None - все камеры)
+
+        Returns:
+            dict: Результат камеры (или словарь индекс камеры -> результат); None, если камера не наблюдается
+        """
+        with self._lock:
+            if camera_id is not None:
+                state = self.cameras.get(camera_id)
+                return self._latest_result(state) if state is not None else None
+            return {camera_id: self._latest_result(state) for camera_id, state in self.cameras.items()}
+
+    @staticmethod
+    def _latest_result(state):
+        if state.result is None:
+            return {"count": 0, "boxes": [], "camera_id": state.camera_id, "error": state.error or "Нет результатов"}
+        return {**state.result, "age": round(time.time() - state.result_time, 2)}
+
+    def stats(self):
+        with self._lock:
+            cameras = [state.info() for state in self.cameras.values()]
+        return {
+            "running": self.running,
+            "target_fps": self.target_fps,
+            "workers": self.workers,
+            "model": self.model_name,
+            "cameras": cameras,
+        }
+
+
+# Планировщик камер из настроек SCHEDULER_CAMERAS
+camera_scheduler = CameraScheduler(SCHEDULER_CAMERAS, SCHEDULER_TARGET_FPS, SCHEDULER_WORKERS, SCHEDULER_MODEL)
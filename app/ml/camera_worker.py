@@ -0,0 +1,164 @@
+import cv2
+import threading
+import time
+
+from app.core.config import CAMERA_OPEN_ATTEMPTS, CAMERA_FRAME_TIMEOUT, CAMERA_IDLE_TIMEOUT, CAMERA_MAX_READ_FAILURES, CAMERA_SOURCES
+from app.core.log import get_logger
+from app.ml.frame_sources import create_frame_source
+
+logger = get_logger(__name__)
+
+class CameraWorker(threading.Thread):
+    """
+    Фоновый поток, который держит камеру открытой и непрерывно вычитывает кадры.
+    Вместо камеры может читать источник из CAMERA_SOURCES (видеофайл, каталог
+    изображений, сгенерированные кадры) - для нагрузочных тестов без камер.
+
+    Хранится только самый свежий кадр: буфер драйвера постоянно опустошается,
+    поэтому детектор никогда не получает устаревший кадр. Кадр передается
+    детектору по ссылке (без копирования) - после чтения поток его не изменяет.
+    """
+
+    def __init__(self, camera_id):
+        super().__init__(name=f"camera-worker-{camera_id}", daemon=True)
+        self.camera_id = camera_id
+        self.error = None
+        self.width = 0
+        self.height = 0
+        self.fps = 0
+        self.last_access = time.time()
+
+        self._cap = None
+        self._frame = None
+        self._frame_time = 0
+        self._frame_ready = threading.Condition()
+        self._stop_event = threading.Event()
+
+    def _open(self):
+        """
+        Открывает камеру (или источник кадров из CAMERA_SOURCES), делая несколько попыток
+        """
+        spec = CAMERA_SOURCES.get(self.camera_id, self.camera_id)
+        for attempt in range(CAMERA_OPEN_ATTEMPTS):
+            try:
+                cap = create_frame_source(spec, seed=self.camera_id)
+            except Exception as e:
+                # Ошибка в описании источника - повторные попытки не помогут
+                logger.error("Камера %d: не удалось создать источник кадров %r: %s", self.camera_id, spec, e)
+                return None
+            if cap.isOpened():
+                self.width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+                self.height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+                self.fps = cap.get(cv2.CAP_PROP_FPS)
+                logger.info("Камера %d открыта (%s, попытка %d): разрешение %sx%s, FPS: %s",
+                            self.camera_id, cap.name, attempt + 1, self.width, self.height, self.fps)
+                return cap
+            logger.warning("Не удалось открыть камеру %d (попытка %d)", self.camera_id, attempt + 1)
+            cap.release()
+            if self._stop_event.wait(0.5):
+                return None
+        return None
+
+    def run(self):
+        try:
+            self._cap = self._open()
+            if self._cap is None:
+                self.error = f"Не удалось открыть камеру {self.camera_id}"
+                return
+
+            failures = 0
+            while not self._stop_event.is_set():
+                # Освобождаем камеру, если ей давно никто не пользовался
+                if time.time() - self.last_access > CAMERA_IDLE_TIMEOUT:
+                    logger.info("Камера %d простаивает, освобождаем устройство", self.camera_id)
+                    break
+
+                success, frame = self._cap.read()
+                if not success:
+                    failures += 1
+                    if failures >= CAMERA_MAX_READ_FAILURES:
+                        # Переоткрываем устройство после серии неудачных чтений
+                        logger.warning("Камера %d перестала отдавать кадры, переоткрываем", self.camera_id)
+                        self._cap.release()
+                        self._cap = self._open()
+                        if self._cap is None:
+                            self.error = f"Не удалось получить кадр с камеры {self.camera_id}"
+                            break
+                        failures = 0
+                    continue
+
+                failures = 0
+                with self._frame_ready:
+                    self._frame = frame
+                    self._frame_time = time.time()
+                    self._frame_ready.notify_all()
+        except Exception as e:
+            self.error = str(e)
+            logger.exception("Ошибка в потоке камеры %d: %s", self.camera_id, e)
+        finally:
+            if self._cap is not None:
+                self._cap.release()
+                self._cap = None
+            with self._frame_ready:
+                self._frame_ready.notify_all()
+
+    def get_frame(self, timeout=CAMERA_FRAME_TIMEOUT):
+        """
+        Возвращает самый свежий кадр камеры
+
+        Args:
+            timeout: Сколько секунд ждать первый кадр после открытия камеры
+
+        Returns:
+            numpy array (BGR) или None, если кадр получить не удалось
+            (в том числе если поток камеры уже завершился - последний кадр устарел)
+        """
+        self.last_access = time.time()
+        deadline = time.time() + timeout
+        with self._frame_ready:
+            while self._frame is None and self.is_alive():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._frame_ready.wait(remaining)
+            if not self.is_alive():
+                return None
+            return self._frame
+
+    def stop(self):
+        self._stop_event.set()
+
+# Рабочие потоки камер по их индексам
+_workers = {}
+_workers_lock = threading.Lock()
+
+def get_camera_worker(camera_id):
+    """
+    Возвращает рабочий поток камеры, запуская его при первом обращении
+    """
+    with _workers_lock:
+        worker = _workers.get(camera_id)
+        if worker is None or not worker.is_alive():
+            worker = CameraWorker(camera_id)
+            worker.start()
+            _workers[camera_id] = worker
+        return worker
+
+def active_camera_ids():
+    """
+    Индексы камер, которые сейчас удерживают рабочие потоки
+    """
+    with _workers_lock:
+        return {camera_id for camera_id, worker in _workers.items() if worker.is_alive()}
+
+def stop_camera_workers():
+    """
+    Останавливает все рабочие потоки камер и освобождает устройства
+    """
+    with _workers_lock:
+        workers = list(_workers.values())
+        _workers.clear()
+    for worker in workers:
+        worker.stop()
+    for worker in workers:
+        worker.join(timeout=2)
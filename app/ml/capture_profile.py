@@ -0,0 +1,115 @@
+import math
+import threading
+from collections import OrderedDict
+
+from app.core.config import (
+    CAPTURE_MAX_SIDE,
+    CAPTURE_MIN_SIDE,
+    CAPTURE_JPEG_QUALITY,
+    CAPTURE_MIN_JPEG_QUALITY,
+    CAPTURE_INTERVAL_MS,
+    CAPTURE_MAX_INTERVAL_MS,
+    CAPTURE_TARGET_LATENCY_MS,
+    CAPTURE_QUEUE_HIGH,
+    CAPTURE_LATENCY_ALPHA,
+    CAPTURE_MAX_SOURCES,
+)
+from app.core.executors import inference_pool
+from app.ml.yolo_detector import registry
+
+
+class CaptureProfiler:
+    """
+    Профили захвата кадров для клиентов и камер.
+
+    Сервер измеряет время обработки кадров каждого источника и заполненность
+    очередей инференса и по ним подбирает, какие кадры источнику присылать:
+    без нагрузки - кадры размером со вход модели раз в CAPTURE_INTERVAL_MS,
+    при нагрузке - реже, с меньшим качеством JPEG, а при сильной перегрузке
+    и меньшего размера.
+    """
+
+    def __init__(self, max_sources=256, alpha=0.2):
+        """
+        Args:
+            max_sources: Сколько источников отслеживать (давно не присылавшие кадры вытесняются)
+            alpha: Коэффициент сглаживания времени обработки (экспоненциальное среднее)
+        """
+        self.max_sources = max_sources
+        self.alpha = alpha
+        # source -> сглаженное время обработки кадра, мс
+        self._latency = OrderedDict()
+        self._overall_latency = None
+        self._lock = threading.Lock()
+
+    def _smooth(self, previous, value):
+        return value if previous is None else previous + self.alpha * (value - previous)
+
+    def record(self, source, seconds):
+        """
+        Учитывает время обработки кадра источника
+        """
+        latency_ms = seconds * 1000
+        with self._lock:
+            self._overall_latency = self._smooth(self._overall_latency, latency_ms)
+            self._latency[source] = self._smooth(self._latency.get(source), latency_ms)
+            self._latency.move_to_end(source)
+            while len(self._latency) > self.max_sources:
+                self._latency.popitem(last=False)
+
+    def latency(self, source):
+        """
+        Сглаженное время обработки кадра источника (или общее, если источник еще не присылал кадров)
+        """
+        with self._lock:
+            latency = self._latency.get(source)
+            return latency if latency is not None else self._overall_latency
+
+    @staticmethod
+    def queue_fill():
+        """
+        Заполненность очередей инференса: наибольшая из очереди пула и очереди модели по умолчанию (0..1)
+        """
+        fill = inference_pool.pending / (inference_pool.max_workers + inference_pool.max_queue)
+        slot = registry.default_slot()
+        if slot is not None:
+            fill = max(fill, slot.batcher.queue_depth / slot.batcher.max_queue_size)
+        return fill
+
+    def profile(self, source):
+        """
+        Профиль захвата для источника
+
+        Returns:
+            dict: Длинная сторона кадра (max_side), качество JPEG (0..1), интервал между кадрами (мс)
+                и показатели нагрузки, по которым профиль выбран
+        """
+        latency = self.latency(source)
+        queue_fill = self.queue_fill()
+        # Нагрузка 1 - граница: ниже нее клиент получает лучший профиль
+        pressure = max(queue_fill / CAPTURE_QUEUE_HIGH, (latency or 0) / CAPTURE_TARGET_LATENCY_MS)
+
+        max_side = CAPTURE_MAX_SIDE
+        quality = CAPTURE_JPEG_QUALITY
+        interval = CAPTURE_INTERVAL_MS
+        if pressure > 1:
+            # Сначала реже присылаем кадры и снижаем качество JPEG, размер уменьшаем только при двукратной перегрузке
+            interval = min(CAPTURE_MAX_INTERVAL_MS, CAPTURE_INTERVAL_MS * pressure)
+            quality = max(CAPTURE_MIN_JPEG_QUALITY, CAPTURE_JPEG_QUALITY - 0.1 * (pressure - 1))
+            if pressure > 2:
+                # Сторона кратна 32, как вход YOLO
+                max_side = max(CAPTURE_MIN_SIDE, int(CAPTURE_MAX_SIDE * math.sqrt(2 / pressure)) // 32 * 32)
+
+        return {
+            "source": source,
+            "max_side": max_side,
+            "jpeg_quality": round(quality, 2),
+            "interval_ms": int(interval),
+            "pressure": round(pressure, 2),
+            "latency_ms": round(latency, 1) if latency is not None else None,
+            "queue_fill": round(queue_fill, 3),
+        }
+
+
+# Общий профилировщик приложения
+capture_profiler = CaptureProfiler(CAPTURE_MAX_SOURCES, CAPTURE_LATENCY_ALPHA)
@@ -0,0 +1,302 @@
+import ast
+import glob
+import hashlib
+import os
+import shutil
+
+import cv2
+import numpy as np
+
+from app.core.config import (
+    DETECTOR_IMGSZ,
+    DETECTOR_CONF_THRESHOLD,
+    DETECTOR_IOU_THRESHOLD,
+    DETECTOR_MAX_DET,
+    DETECTOR_THREADS,
+    MODEL_CACHE_DIR,
+    FAKE_DETECTOR_COUNT,
+)
+from app.core.log import get_logger
+from app.ml.detector_base import Detections, DetectorBase
+
+logger = get_logger(__name__)
+
+
+class TorchDetector(DetectorBase):
+    """
+    Модель ultralytics YOLO на PyTorch (исходный вариант)
+    """
+
+    backend = "torch"
+
+    def __init__(self, weights_path, imgsz=None):
+        super().__init__(weights_path)
+        # Размер входа модели (None - размер, с которым модель обучалась)
+        self.imgsz = imgsz
+        # Импорт здесь: torch и ultralytics не нужны, если выбран другой бэкенд
+        from ultralytics import YOLO
+        self.model = YOLO(weights_path)
+        self.names = dict(self.model.names)
+
+    def predict(self, images):
+        if self.imgsz is not None:
+            results = self.model(images, imgsz=self.imgsz, verbose=False)
+        else:
+            results = self.model(images, verbose=False)
+        return [
+            Detections(
+                result.boxes.xyxy.cpu().numpy(),
+                result.boxes.conf.cpu().numpy(),
+                result.boxes.cls.cpu().numpy().astype(np.int64),
+            )
+            for result in results
+        ]
+
+
+def letterbox(img, size):
+    """
+    Масштабирует изображение с сохранением пропорций и дополняет до квадрата size x size
+
+    Returns:
+        tuple: (изображение, коэффициент масштаба, смещение (left, top))
+    """
+    height, width = img.shape[:2]
+    ratio = min(size / height, size / width)
+    new_width, new_height = round(width * ratio), round(height * ratio)
+    if (new_width, new_height) != (width, height):
+        img = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    left, top = (size - new_width) // 2, (size - new_height) // 2
+    img = cv2.copyMakeBorder(
+        img, top, size - new_height - top, left, size - new_width - left,
+        cv2.BORDER_CONSTANT, value=(114, 114, 114)
+    )
+    return img, ratio, (left, top)
+
+
+def postprocess(prediction, ratio, pad, shape, conf_threshold, iou_threshold, max_det):
+    """
+    Разбирает выход YOLOv8/YOLO11 формы (4 + число классов, N) для одного изображения:
+    порог уверенности, NMS по классам и перевод рамок в координаты исходного изображения
+
+    Args:
+        prediction: Выход модели для одного изображения
+        ratio, pad: Параметры letterbox
+        shape: Размер исходного изображения (высота, ширина)
+    """
+    prediction = prediction.T
+    scores = prediction[:, 4:]
+    cls = scores.argmax(axis=1)
+    conf = scores[np.arange(len(scores)), cls]
+    keep = conf > conf_threshold
+    if not keep.any():
+        return Detections.empty()
+
+    boxes, conf, cls = prediction[keep, :4], conf[keep], cls[keep]
+    # (cx, cy, w, h) -> (x, y, w, h) для NMS; рамки разных классов разносим смещением,
+    # чтобы одно подавление работало независимо по каждому классу
+    xywh = boxes.copy()
+    xywh[:, :2] -= xywh[:, 2:] / 2
+    offset = (cls * 4096)[:, None].astype(np.float32)
+    nms_boxes = np.hstack([xywh[:, :2] + offset, xywh[:, 2:]])
+    indices = cv2.dnn.NMSBoxes(nms_boxes.tolist(), conf.tolist(), conf_threshold, iou_threshold)
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1)[:max_det]
+
+    xyxy = np.hstack([xywh[indices, :2], xywh[indices, :2] + xywh[indices, 2:]])
+    xyxy -= np.array([pad[0], pad[1], pad[0], pad[1]], dtype=np.float32)
+    xyxy /= ratio
+    height, width = shape
+    xyxy[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, width)
+    xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, height)
+    return Detections(xyxy.astype(np.float32), conf[indices].astype(np.float32), cls[indices].astype(np.int64))
+
+
+class ExportedDetector(DetectorBase):
+    """
+    Общая часть бэкендов с экспортированной моделью: предобработка letterbox
+    на numpy/OpenCV и разбор выхода с NMS, как в ultralytics
+    """
+
+    def __init__(self, weights_path, imgsz=640):
+        super().__init__(weights_path)
+        self.imgsz = imgsz
+
+    def run(self, blob):
+        """
+        Выполняет модель на пакете формы (B, 3, imgsz, imgsz) и возвращает выход (B, 4 + nc, N)
+        """
+        raise NotImplementedError
+
+    def predict(self, images):
+        if not images:
+            return []
+        prepared = [letterbox(img, self.imgsz) for img in images]
+        # BGR -> RGB, HWC -> NCHW, 0..1 за один вызов
+        blob = cv2.dnn.blobFromImages([img for img, _, _ in prepared], 1 / 255.0, swapRB=True)
+        output = self.run(blob)
+        return [
+            postprocess(output[i], ratio, pad, img.shape[:2],
+                        DETECTOR_CONF_THRESHOLD, DETECTOR_IOU_THRESHOLD, DETECTOR_MAX_DET)
+            for i, (img, (_, ratio, pad)) in enumerate(zip(images, prepared))
+        ]
+
+    def warmup(self, imgsz=None):
+        super().warmup(imgsz or self.imgsz)
+
+
+class OnnxDetector(ExportedDetector):
+    """
+    Модель, экспортированная в ONNX, на ONNX Runtime (CPU)
+    """
+
+    backend = "onnx"
+
+    def __init__(self, weights_path, imgsz=640):
+        super().__init__(weights_path, imgsz)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if DETECTOR_THREADS:
+            options.intra_op_num_threads = DETECTOR_THREADS
+        self.session = ort.InferenceSession(weights_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+        # ultralytics сохраняет названия классов в метаданных модели
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if "names" in metadata:
+            self.names = ast.literal_eval(metadata["names"])
+
+    def run(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoDetector(ExportedDetector):
+    """
+    Модель, экспортированная в формат OpenVINO (CPU)
+    """
+
+    backend = "openvino"
+
+    def __init__(self, weights_path, imgsz=640):
+        super().__init__(weights_path, imgsz)
+        import openvino as ov
+
+        xml_path = weights_path
+        if os.path.isdir(weights_path):
+            xml_path = glob.glob(os.path.join(weights_path, "*.xml"))[0]
+        config = {"PERFORMANCE_HINT": "THROUGHPUT"}
+        if DETECTOR_THREADS:
+            config["INFERENCE_NUM_THREADS"] = DETECTOR_THREADS
+        core = ov.Core()
+        self.model = core.compile_model(core.read_model(xml_path), "CPU", config)
+        self.output = self.model.output(0)
+
+        metadata_path = os.path.join(os.path.dirname(xml_path), "metadata.yaml")
+        if os.path.exists(metadata_path):
+            try:
+                import yaml
+                with open(metadata_path, encoding="utf-8") as f:
+                    self.names = {int(k): v for k, v in yaml.safe_load(f).get("names", {}).items()}
+            except Exception as e:
+                logger.warning("Не удалось прочитать названия классов из %s: %s", metadata_path, e)
+
+    def run(self, blob):
+        return self.model(blob)[self.output]
+
+
+class FakeDetector(DetectorBase):
+    """
+    Тестовый бэкенд без модели: возвращает FAKE_DETECTOR_COUNT фиксированных рамок
+    """
+
+    backend = "fake"
+
+    def __init__(self, weights_path=None, count=3):
+        super().__init__(weights_path)
+        self.count = count
+        self.names = {0: "person"}
+
+    def predict(self, images):
+        result = []
+        for img in images:
+            height, width = img.shape[:2]
+            step = width / (self.count + 1)
+            xyxy = np.array(
+                [[step * i, height * 0.25, step * i + step / 2, height * 0.75] for i in range(1, self.count + 1)],
+                dtype=np.float32
+            ).reshape(-1, 4)
+            result.append(Detections(xyxy, np.full(self.count, 0.9, np.float32), np.zeros(self.count, np.int64)))
+        return result
+
+
+# Формат экспорта ultralytics для каждого бэкенда
+EXPORT_FORMATS = {"onnx": "onnx", "openvino": "openvino"}
+
+
+def export_path(weights_path, backend, imgsz=640):
+    """
+    Путь к экспортированной модели в MODEL_CACHE_DIR.
+
+    Ключ кэша - хэш абсолютного пути, размера и времени изменения файла весов:
+    веса с одинаковым именем из разных каталогов (best.pt разных обучений)
+    не подменяют друг друга, а после замены файла весов путь меняется и модель
+    экспортируется заново.
+    """
+    path = os.path.realpath(weights_path)
+    # Стандартные веса без локального файла ultralytics скачивает сам - ключ только по пути
+    stat = os.stat(path) if os.path.exists(path) else None
+    key = f"{path}|{stat.st_size}|{stat.st_mtime_ns}" if stat else path
+    digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+    stem = os.path.splitext(os.path.basename(weights_path))[0]
+    suffix = ".onnx" if backend == "onnx" else "_openvino_model"
+    return os.path.join(MODEL_CACHE_DIR, f"{stem}_{digest}_{imgsz}{suffix}")
+
+
+def export_model(weights_path, backend, imgsz=640):
+    """
+    Экспортирует модель .pt в формат бэкенда и кэширует результат в MODEL_CACHE_DIR
+    (повторно - только для других или измененных весов, см. export_path)
+
+    Returns:
+        str: Путь к экспортированной модели (файл .onnx или каталог OpenVINO)
+    """
+    target = export_path(weights_path, backend, imgsz)
+    if os.path.exists(target):
+        logger.info("Используем экспортированную модель %s", target)
+        return target
+
+    logger.info("Экспорт модели %s в формат %s (imgsz=%d)...", weights_path, backend, imgsz)
+    from ultralytics import YOLO
+    exported = YOLO(weights_path).export(format=EXPORT_FORMATS[backend], imgsz=imgsz, dynamic=True, half=False)
+
+    os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
+    shutil.move(str(exported), target)
+    logger.info("Модель экспортирована: %s", target)
+    return target
+
+
+def create_detector(backend, weights_path):
+    """
+    Создает детектор выбранного бэкенда
+
+    Args:
+        backend: "torch", "onnx", "openvino" или "fake"
+        weights_path: Путь к весам .pt (или уже экспортированной модели .onnx / каталогу OpenVINO)
+
+    Returns:
+        DetectorBase: Готовый к работе детектор
+    """
+    # Все бэкенды работают с одним размером входа - результаты и замеры сравнимы
+    if backend == "torch":
+        return TorchDetector(weights_path, DETECTOR_IMGSZ)
+    if backend == "fake":
+        return FakeDetector(weights_path, FAKE_DETECTOR_COUNT)
+    if backend not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный бэкенд детектора: {backend}")
+
+    model_path = weights_path
+    if weights_path.endswith(".pt"):
+        model_path = export_model(weights_path, backend, DETECTOR_IMGSZ)
+    if backend == "onnx":
+        return OnnxDetector(model_path, DETECTOR_IMGSZ)
+    return OpenVinoDetector(model_path, DETECTOR_IMGSZ)
@@ -0,0 +1,71 @@
+import numpy as np
+
+
+class Detections:
+    """
+    Результат детекции одного изображения в виде массивов numpy
+    """
+
+    def __init__(self, xyxy, conf, cls):
+        """
+        Args:
+            xyxy: Координаты рамок float32 формы (N, 4) в пикселях исходного изображения
+            conf: Уверенности float32 формы (N,)
+            cls: Индексы классов формы (N,)
+        """
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    def __len__(self):
+        return len(self.conf)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64))
+
+
+class DetectorBase:
+    """
+    Общий интерфейс детекторов: модель принимает список изображений BGR
+    и возвращает по объекту Detections на каждое изображение.
+
+    Реализации (PyTorch, ONNX Runtime, OpenVINO, тестовая) находятся
+    в app.ml.detector_backends и выбираются настройкой DETECTOR_BACKEND.
+    """
+
+    # Название бэкенда (для логов и статистики)
+    backend = "base"
+
+    def __init__(self, weights_path):
+        self.weights_path = weights_path
+        # Названия классов: индекс -> имя
+        self.names = {}
+
+    def predict(self, images):
+        """
+        Детекция на пакете изображений
+
+        Args:
+            images: Список изображений (numpy array, BGR)
+
+        Returns:
+            list: Объекты Detections в том же порядке
+        """
+        raise NotImplementedError
+
+    def __call__(self, images):
+        return self.predict(images)
+
+    def warmup(self, imgsz=640):
+        """
+        Прогоняет пустой кадр, чтобы первый настоящий запрос не ждал инициализации
+        """
+        self.predict([np.zeros((imgsz, imgsz, 3), np.uint8)])
+
+    def info(self):
+        return {
+            "backend": self.backend,
+            "weights": self.weights_path,
+            "classes": len(self.names),
+        }
@@ -0,0 +1,133 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from app.core.cache import TTLCache
+from app.core.config import FRAME_CACHE_SIZE, FRAME_CACHE_TTL, FRAME_CACHE_PERCEPTUAL, FRAME_CACHE_PERCEPTUAL_DISTANCE
+
+# Детекции модели по содержимому присланного кадра (до сопровождения - трекер у каждого источника свой)
+frame_cache = TTLCache("frames", FRAME_CACHE_SIZE, FRAME_CACHE_TTL)
+
+# Счетчики по видам совпадений
+exact_hits = 0
+perceptual_hits = 0
+misses = 0
+_counters_lock = threading.Lock()
+
+# Перцептивные хэши запомненных кадров для поиска ближайшего по расстоянию Хэмминга
+_perceptual_index = OrderedDict()
+
+
+def content_hash(image_bytes):
+    """
+    Быстрый хэш закодированного изображения (без декодирования)
+    """
+    return hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+
+
+def perceptual_hash(image_bytes):
+    """
+    Разностный хэш (dHash) изображения: почти одинаковые кадры (повторное
+    сжатие JPEG, шум) дают хэши, отличающиеся в нескольких битах.
+
+    Декодирование выполняется сразу в 1/8 размера (для JPEG это почти
+    бесплатно), поэтому хэш намного дешевле полного декодирования.
+
+    Returns:
+        int или None: 64-битный хэш или None, если изображение не декодируется
+    """
+    small = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if small is None:
+        return None
+    thumb = cv2.resize(small, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (thumb[:, 1:] > thumb[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def _nearest_perceptual(phash, variant):
+    """
+    Ближайший запомненный хэш в пределах FRAME_CACHE_PERCEPTUAL_DISTANCE бит
+    """
+    best, best_distance = None, FRAME_CACHE_PERCEPTUAL_DISTANCE + 1
+    with _counters_lock:
+        candidates = list(_perceptual_index)
+    for candidate, candidate_variant in candidates:
+        if candidate_variant != variant:
+            continue
+        distance = bin(candidate ^ phash).count("1")
+        if distance < best_distance:
+            best, best_distance = candidate, distance
+    return best
+
+
+def _count(counter):
+    global exact_hits, perceptual_hits, misses
+    with _counters_lock:
+        if counter == "exact":
+            exact_hits += 1
+        elif counter == "perceptual":
+            perceptual_hits += 1
+        else:
+            misses += 1
+
+
+def lookup_frame(image_bytes, variant=False):
+    """
+    Ищет детекции присланного кадра до его декодирования
+
+    Args:
+        image_bytes: Закодированное изображение
+        variant: Параметры, от которых зависят детекции (версия модели)
+
+    Returns:
+        tuple: (сохраненное значение или None, ключи для сохранения через store_frame)
+    """
+    keys = [("blake2b", content_hash(image_bytes), variant)]
+    found, result = frame_cache.lookup(keys[0])
+    if found:
+        _count("exact")
+        return result, keys
+
+    if FRAME_CACHE_PERCEPTUAL:
+        phash = perceptual_hash(image_bytes)
+        if phash is not None:
+            keys.append(("dhash", phash, variant))
+            nearest = _nearest_perceptual(phash, variant)
+            found, result = frame_cache.lookup(("dhash", nearest, variant)) if nearest is not None else (False, None)
+            if found:
+                # Запоминаем и точный хэш, чтобы следующий такой же кадр нашелся без декодирования
+                frame_cache.store(keys[0], result)
+                _count("perceptual")
+                return result, keys
+
+    _count("miss")
+    return None, keys
+
+
+def store_frame(keys, result):
+    """
+    Сохраняет детекции кадра под всеми его ключами
+    """
+    for key in keys:
+        frame_cache.store(key, result)
+        if key[0] == "dhash":
+            with _counters_lock:
+                _perceptual_index[key[1:]] = None
+                _perceptual_index.move_to_end(key[1:])
+                while len(_perceptual_index) > FRAME_CACHE_SIZE:
+                    _perceptual_index.popitem(last=False)
+
+
+def frame_cache_stats():
+    total = exact_hits + perceptual_hits + misses
+    return {
+        **frame_cache.stats(),
+        "perceptual": FRAME_CACHE_PERCEPTUAL,
+        "exact_hits": exact_hits,
+        "perceptual_hits": perceptual_hits,
+        "frame_misses": misses,
+        "frame_hit_rate": round((exact_hits + perceptual_hits) / total, 3) if total else 0,
+    }
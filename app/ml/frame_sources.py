@@ -0,0 +1,244 @@
+import glob
+import os
+import re
+import time
+
+import cv2
+import numpy as np
+
+from app.core.log import get_logger
+
+logger = get_logger(__name__)
+
+# Расширения изображений для источника из каталога
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class FrameSource:
+    """
+    Источник кадров для потока камеры (CameraWorker).
+
+    Интерфейс повторяет cv2.VideoCapture (isOpened, read, get, release), поэтому
+    поток камеры одинаково читает физическую камеру, видеофайл, каталог изображений
+    и сгенерированные кадры. Нефизические источники отдают кадры с заданной
+    частотой: read() ждет очереди следующего кадра, как драйвер камеры.
+    """
+
+    name = "source"
+
+    def __init__(self, fps=None):
+        self.fps = fps
+        self.width = 0
+        self.height = 0
+        self._next_frame = None
+
+    def isOpened(self):
+        return True
+
+    def _wait_next_frame(self):
+        """
+        Выдерживает частоту кадров источника
+        """
+        if not self.fps:
+            return
+        now = time.monotonic()
+        if self._next_frame is None or self._next_frame < now - 1.0:
+            # Первый кадр или чтение надолго прерывалось - не выдаем накопившиеся кадры пачкой
+            self._next_frame = now
+        elif self._next_frame > now:
+            time.sleep(self._next_frame - now)
+        self._next_frame += 1.0 / self.fps
+
+    def _read_frame(self):
+        raise NotImplementedError
+
+    def read(self):
+        """
+        Returns:
+            tuple: (успех, кадр BGR)
+        """
+        self._wait_next_frame()
+        frame = self._read_frame()
+        return frame is not None, frame
+
+    def set(self, prop, value):
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps or 0
+        return 0
+
+    def release(self):
+        pass
+
+
+class VideoFileSource(FrameSource):
+    """
+    Видеофайл, воспроизводимый по кругу с частотой кадров файла (или заданной)
+    """
+
+    name = "video"
+
+    def __init__(self, path, fps=None):
+        self.path = path
+        self._cap = cv2.VideoCapture(path)
+        file_fps = self._cap.get(cv2.CAP_PROP_FPS) if self._cap.isOpened() else 0
+        super().__init__(fps or file_fps or 25.0)
+        self.width = self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+        self.height = self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def _read_frame(self):
+        success, frame = self._cap.read()
+        if not success:
+            # Конец файла - начинаем сначала
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, frame = self._cap.read()
+        return frame if success else None
+
+    def release(self):
+        self._cap.release()
+
+
+class ImageFolderSource(FrameSource):
+    """
+    Изображения каталога (по имени файла), показываемые по кругу
+    """
+
+    name = "images"
+
+    def __init__(self, path, fps=5.0):
+        super().__init__(fps)
+        self.path = path
+        files = sorted(
+            file for file in glob.glob(os.path.join(path, "*"))
+            if file.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        # Изображения декодируются один раз - чтение кадра не нагружает диск и процессор
+        self.frames = [frame for frame in (cv2.imread(file) for file in files) if frame is not None]
+        self._index = 0
+        if self.frames:
+            self.height, self.width = self.frames[0].shape[:2]
+
+    def isOpened(self):
+        return bool(self.frames)
+
+    def _read_frame(self):
+        if not self.frames:
+            return None
+        frame = self.frames[self._index]
+        self._index = (self._index + 1) % len(self.frames)
+        return frame
+
+
+class SyntheticSource(FrameSource):
+    """
+    Сгенерированные кадры аудитории: шумный фон и несколько «людей»,
+    которые медленно перемещаются (кадры меняются, поэтому пропуск
+    неизменившихся кадров не отменяет инференс)
+    """
+
+    name = "synthetic"
+
+    def __init__(self, width=1280, height=720, fps=15.0, people=6, seed=0):
+        super().__init__(fps)
+        self.width = width
+        self.height = height
+        self._rng = np.random.default_rng(seed)
+        gradient = np.linspace(70, 190, width, dtype=np.uint8)
+        self._background = np.repeat(np.tile(gradient, (height, 1))[:, :, None], 3, axis=2)
+        self._positions = self._rng.uniform((0, height * 0.3), (width - 60, height - 120), (people, 2))
+        self._velocity = self._rng.normal(0, 3, (people, 2))
+        self._colors = [tuple(int(c) for c in self._rng.integers(20, 230, 3)) for _ in range(people)]
+
+    def _read_frame(self):
+        frame = self._background.copy()
+        self._positions += self._velocity
+        # Люди отражаются от краев кадра
+        limits = np.array([self.width - 60, self.height - 120])
+        outside = (self._positions < 0) | (self._positions > limits)
+        self._velocity[outside] *= -1
+        self._positions = np.clip(self._positions, 0, limits)
+        for (x, y), color in zip(self._positions.astype(int), self._colors):
+            cv2.circle(frame, (x + 30, y + 20), 18, color, -1)
+            cv2.rectangle(frame, (x + 5, y + 40), (x + 55, y + 120), color, -1)
+        return frame
+
+
+class DeviceSource(FrameSource):
+    """
+    Физическая камера (cv2.VideoCapture по индексу) - частоту кадров задает драйвер
+    """
+
+    name = "device"
+
+    def __init__(self, index):
+        super().__init__()
+        self._cap = cv2.VideoCapture(index)
+        if self._cap.isOpened():
+            # Минимальный буфер драйвера - нам нужен только последний кадр
+            self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def read(self):
+        return self._cap.read()
+
+    def get(self, prop):
+        return self._cap.get(prop)
+
+    def release(self):
+        self._cap.release()
+
+
+def parse_source(spec):
+    """
+    Разбирает описание источника ("synthetic:1280x720@15", "images:debug_frames@5")
+
+    Returns:
+        tuple: (вид источника, аргумент или None, частота кадров или None)
+    """
+    kind, _, rest = spec.partition(":")
+    fps = None
+    match = re.fullmatch(r"(.*)@(\d+(?:\.\d+)?)", rest)
+    if match is not None:
+        rest, fps = match.group(1), float(match.group(2))
+    return kind, rest or None, fps
+
+
+def create_frame_source(spec, seed=0):
+    """
+    Создает источник кадров по описанию из CAMERA_SOURCES
+
+    Args:
+        spec: Индекс устройства (int) или строка "вид:аргумент@fps"
+        seed: Начальное значение генератора для сгенерированных кадров
+            (у разных камер - разные кадры)
+
+    Returns:
+        FrameSource: Источник кадров (проверять isOpened())
+    """
+    if isinstance(spec, int):
+        return DeviceSource(spec)
+
+    kind, argument, fps = parse_source(spec)
+    if kind == "video":
+        return VideoFileSource(argument, fps)
+    if kind == "images":
+        return ImageFolderSource(argument, fps or 5.0)
+    if kind == "synthetic":
+        width, height = 1280, 720
+        if argument:
+            width, height = (int(value) for value in argument.lower().split("x"))
+        return SyntheticSource(width, height, fps or 15.0, seed=seed)
+    if kind == "device":
+        return DeviceSource(int(argument))
+    raise ValueError(f"Неизвестный источник кадров: {spec}")
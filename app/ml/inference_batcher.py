@@ -0,0 +1,160 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from app.core.config import INFERENCE_RESULT_TIMEOUT
+from app.core.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    """
+    Очередь инференса переполнена - запрос не может быть принят
+    """
+
+
+class InferenceBatcher:
+    """
+    Планировщик, который собирает одиночные кадры в пакеты для модели.
+
+    Запросы накапливаются в течение окна ожидания (или пока не наберется
+    max_batch_size кадров), после чего модель вызывается один раз на весь пакет,
+    а каждый вызывающий получает свой собственный результат.
+    """
+
+    def __init__(self, infer_fn, max_batch_size=8, max_wait_ms=15, max_queue_size=64, name="inference-batcher"):
+        """
+        Args:
+            infer_fn: Функция, принимающая список изображений и возвращающая список результатов
+            max_batch_size: Максимальное количество кадров в одном пакете
+            max_wait_ms: Сколько миллисекунд ждать добора пакета после первого кадра
+            max_queue_size: Максимальная длина очереди ожидающих кадров
+        """
+        self.infer_fn = infer_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+
+        # Статистика работы планировщика
+        self.batches_processed = 0
+        self.frames_processed = 0
+        self.last_batch_size = 0
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def submit(self, img):
+        """
+        Ставит изображение в очередь на инференс
+
+        Returns:
+            Future: Будущий результат детекции для этого изображения
+        """
+        if self._stop_event.is_set():
+            raise RuntimeError("Планировщик инференса остановлен")
+        future = Future()
+        try:
+            self._queue.put_nowait((img, future))
+        except queue.Full:
+            raise QueueFullError(f"Очередь инференса переполнена ({self.max_queue_size} кадров)")
+        return future
+
+    def infer(self, img, timeout=INFERENCE_RESULT_TIMEOUT):
+        """
+        Синхронно выполняет детекцию одного изображения через общий пакет.
+        Блокирует вызывающий поток - только для потоков пулов, не для цикла событий
+
+        Raises:
+            TimeoutError: Результат не получен за timeout секунд (кадр снимается с очереди)
+        """
+        future = self.submit(img)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def _collect_batch(self):
+        """
+        Ждет первый кадр и добирает пакет в пределах окна ожидания
+        """
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            # Пропускаем запросы, которые уже отменены вызывающей стороной
+            batch = [(img, future) for img, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                results = self.infer_fn([img for img, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"Модель вернула {len(results)} результатов на пакет из {len(batch)} кадров")
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.exception("Ошибка пакетного инференса (%d кадров): %s", len(batch), e)
+                # Результаты, уже переданные вызывающим, не трогаем - ошибку получают только остальные
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            self.batches_processed += 1
+            self.frames_processed += len(batch)
+            self.last_batch_size = len(batch)
+
+    def stats(self):
+        """
+        Текущие настройки и состояние очереди
+        """
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_queue_size": self.max_queue_size,
+            "queue_depth": self.queue_depth,
+            "batches_processed": self.batches_processed,
+            "frames_processed": self.frames_processed,
+            "last_batch_size": self.last_batch_size,
+            "average_batch_size": round(self.frames_processed / self.batches_processed, 2) if self.batches_processed else 0,
+        }
+
+    def stop(self):
+        """
+        Останавливает поток планировщика; ожидающие запросы получают ошибку
+        """
+        self._stop_event.set()
+        self._thread.join(timeout=2)
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("Планировщик инференса остановлен"))
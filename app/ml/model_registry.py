@@ -0,0 +1,415 @@
+import os
+import threading
+import time
+
+from app.core.config import (
+    DETECTOR_BACKEND,
+    INFERENCE_BATCH_SIZE,
+    INFERENCE_BATCH_WAIT_MS,
+    INFERENCE_QUEUE_SIZE,
+    MODEL_WARMUP_RUNS,
+    MODEL_DRAIN_TIMEOUT,
+    MODEL_WEIGHTS_DIRS,
+)
+from app.core.log import get_logger
+from app.core.metrics import inference_batch_seconds, inference_batch_size
+from app.ml.detector_backends import create_detector
+from app.ml.inference_batcher import InferenceBatcher
+
+logger = get_logger(__name__)
+
+
+class ModelNotReadyError(RuntimeError):
+    """
+    Модель еще загружается или прогревается - запрос нельзя обработать сейчас
+    """
+
+
+class ModelNotFoundError(LookupError):
+    """
+    Запрошенная модель неизвестна или не может быть загружена
+    """
+
+
+def load_detector(path):
+    """
+    Загружает модель выбранным бэкендом (DETECTOR_BACKEND); если бэкенд
+    недоступен (не установлен onnxruntime/openvino, ошибка экспорта) - через PyTorch
+    """
+    try:
+        return create_detector(DETECTOR_BACKEND, path)
+    except Exception as e:
+        if DETECTOR_BACKEND in ("torch", "fake"):
+            raise
+        logger.error("Бэкенд %s недоступен для %s: %s. Используем torch", DETECTOR_BACKEND, path, e)
+        return create_detector("torch", path)
+
+
+class ModelSlot:
+    """
+    Загруженная модель со своей очередью пакетного инференса.
+
+    Запросы берут слот через ModelRegistry.acquire() и возвращают release();
+    при замене модели старый слот дожидается завершения своих запросов (drain)
+    и только после этого останавливает очередь.
+    """
+
+    def __init__(self, name, path, detector, version):
+        self.name = name
+        self.path = path
+        self.detector = detector
+        self.version = version
+        self.loaded_at = time.time()
+        self.inflight = 0
+        self.requests = 0
+        self._cond = threading.Condition()
+        self.batcher = InferenceBatcher(
+            self.predict,
+            max_batch_size=INFERENCE_BATCH_SIZE,
+            max_wait_ms=INFERENCE_BATCH_WAIT_MS,
+            max_queue_size=INFERENCE_QUEUE_SIZE,
+            name=f"inference-{name}-v{version}",
+        )
+
+    @property
+    def key(self):
+        """
+        Идентификатор версии модели (для кэшей результатов)
+        """
+        return f"{self.name}:{self.version}"
+
+    def predict(self, images):
+        """
+        Инференс пакета изображений с учетом времени и размера пакета в метриках
+        """
+        started = time.perf_counter()
+        results = self.detector.predict(images)
+        inference_batch_seconds.observe(time.perf_counter() - started, (self.name,))
+        inference_batch_size.observe(len(images), (self.name,))
+        return results
+
+    def acquire(self):
+        with self._cond:
+            self.inflight += 1
+            self.requests += 1
+
+    def release(self):
+        with self._cond:
+            self.inflight -= 1
+            self._cond.notify_all()
+
+    def drain(self, timeout=MODEL_DRAIN_TIMEOUT):
+        """
+        Ждет завершения запросов, взявших этот слот, и останавливает очередь инференса
+        """
+        with self._cond:
+            drained = self._cond.wait_for(lambda: self.inflight == 0, timeout)
+        if not drained:
+            logger.warning("Модель %s: не дождались %d запросов, останавливаем очередь", self.key, self.inflight)
+        self.batcher.stop()
+        logger.info("Модель %s выгружена", self.key)
+
+    def info(self):
+        return {
+            **self.detector.info(),
+            "name": self.name,
+            "version": self.version,
+            "path": self.path,
+            "loaded_at": self.loaded_at,
+            "inflight": self.inflight,
+            "requests": self.requests,
+            "queue": self.batcher.stats(),
+        }
+
+
+class ModelRegistry:
+    """
+    Реестр моделей детектора: несколько моделей загружены одновременно,
+    запрос направляется в модель по имени, модель можно заменить новыми
+    весами без перезапуска сервера.
+
+    Замена незаметна для клиентов: новая модель загружается и прогревается
+    в фоне, затем атомарно подменяет старую, а старая обслуживает уже
+    принятые запросы и выгружается после их завершения.
+    """
+
+    def __init__(self, models, preload=()):
+        """
+        Args:
+            models: Словарь название -> список возможных путей к весам
+            preload: Названия моделей, загружаемых при старте помимо модели по умолчанию
+        """
+        self.models = {name: list(paths) for name, paths in models.items()}
+        self.preload = list(preload)
+        self.default_name = None
+
+        # Состояние загрузки модели по умолчанию: "idle", "loading", "ready", "demo" (модель не найдена)
+        self.state = "idle"
+        self.load_seconds = None
+
+        self._slots = {}
+        self._loading = set()
+        self._errors = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._ready_event = threading.Event()
+        self._thread = None
+
+    def resolve_path(self, name):
+        """
+        Первый существующий файл весов модели
+        """
+        for path in self.models[name]:
+            exists = os.path.exists(path)
+            logger.debug("Проверка пути %s: %s", path, "Существует" if exists else "Не существует")
+            # Стандартные веса без каталога ultralytics скачивает сам; тестовому бэкенду файл не нужен
+            if exists or not os.path.dirname(path) or DETECTOR_BACKEND == "fake":
+                return path
+        return None
+
+    def path_allowed(self, path):
+        """
+        Можно ли загрузить веса из этого пути: путь указан в настройках MODELS
+        или файл лежит в одном из каталогов MODEL_WEIGHTS_DIRS (с учетом ссылок и "..")
+        """
+        real = os.path.realpath(path)
+        with self._lock:
+            configured = [known for paths in self.models.values() for known in paths]
+        if real in {os.path.realpath(known) for known in configured}:
+            return True
+        for directory in MODEL_WEIGHTS_DIRS:
+            root = os.path.realpath(directory)
+            if os.path.commonpath([root, real]) == root and real != root:
+                return True
+        return False
+
+    def _build_slot(self, name, path=None):
+        path = path or self.resolve_path(name)
+        if path is None:
+            raise FileNotFoundError(f"Не найден файл весов модели {name}")
+
+        started = time.perf_counter()
+        logger.info("Загружаем модель %s из %s (бэкенд %s)", name, path, DETECTOR_BACKEND)
+        detector = load_detector(path)
+        logger.info("Доступные классы в модели %s: %s", name, detector.names)
+        if 'person' in detector.names.values():
+            logger.info("Класс 'person' имеет индекс: %s", list(detector.names.keys())[list(detector.names.values()).index('person')])
+
+        # Первые прогоны медленные (инициализация потоков, выделение памяти) - выполняем их до первого запроса
+        for _ in range(MODEL_WARMUP_RUNS):
+            detector.warmup()
+
+        with self._lock:
+            version = self._versions.get(name, 0) + 1
+            self._versions[name] = version
+        logger.info("Модель %s (версия %d, бэкенд %s) готова за %.2f с",
+                    name, version, detector.backend, time.perf_counter() - started)
+        return ModelSlot(name, path, detector, version)
+
+    def load(self, name, path=None):
+        """
+        Загружает модель (или заменяет уже загруженную) и прогревает ее.
+        Старая версия выгружается в фоне после завершения своих запросов.
+
+        Args:
+            name: Название модели
+            path: Путь к новым весам (по умолчанию - из настроек MODELS)
+
+        Returns:
+            ModelSlot: Загруженная модель
+        """
+        if path is not None and not self.path_allowed(path):
+            raise PermissionError(f"Загрузка весов из {path} не разрешена (MODEL_WEIGHTS_DIRS)")
+        with self._lock:
+            if path is not None and name not in self.models:
+                self.models[name] = [path]
+            if name not in self.models:
+                raise ModelNotFoundError(f"Неизвестная модель: {name}")
+            self._loading.add(name)
+
+        try:
+            slot = self._build_slot(name, path)
+        except Exception as e:
+            with self._lock:
+                self._loading.discard(name)
+                self._errors[name] = str(e)
+            raise
+
+        with self._lock:
+            old = self._slots.get(name)
+            self._slots[name] = slot
+            self._loading.discard(name)
+            self._errors.pop(name, None)
+
+        if old is not None:
+            threading.Thread(target=old.drain, name=f"drain-{old.key}", daemon=True).start()
+        return slot
+
+    def load_async(self, name, path=None):
+        """
+        Загружает модель в фоновом потоке
+        """
+        def run():
+            try:
+                self.load(name, path)
+            except Exception as e:
+                logger.error("Ошибка загрузки модели %s: %s", name, e)
+
+        with self._lock:
+            self._loading.add(name)
+        threading.Thread(target=run, name=f"model-loader-{name}", daemon=True).start()
+
+    def unload(self, name):
+        """
+        Выгружает модель после завершения ее запросов (модель по умолчанию выгрузить нельзя)
+        """
+        with self._lock:
+            if name == self.default_name:
+                raise ValueError("Нельзя выгрузить модель по умолчанию")
+            slot = self._slots.pop(name, None)
+        if slot is None:
+            raise ModelNotFoundError(f"Модель {name} не загружена")
+        threading.Thread(target=slot.drain, name=f"drain-{slot.key}", daemon=True).start()
+
+    def set_default(self, name):
+        """
+        Делает загруженную модель моделью по умолчанию (для запросов без model_name)
+        """
+        with self._lock:
+            if name not in self._slots:
+                raise ModelNotFoundError(f"Модель {name} не загружена")
+            self.default_name = name
+
+    def _startup(self):
+        started = time.perf_counter()
+        self.state = "loading"
+        # Модель по умолчанию - первая, которую удалось загрузить
+        for name in self.models:
+            try:
+                self.load(name)
+                self.default_name = name
+                break
+            except Exception as e:
+                logger.error("Ошибка загрузки модели %s: %s", name, e)
+
+        self.load_seconds = round(time.perf_counter() - started, 2)
+        if self.default_name is None:
+            logger.warning("ВНИМАНИЕ: Ни одна модель не найдена. Используется демо-режим.")
+            self.state = "demo"
+        else:
+            self.state = "ready"
+        logger.info("Загрузка модели завершена за %.2f с, состояние: %s", self.load_seconds, self.state)
+        self._ready_event.set()
+
+        # Дополнительные модели загружаем уже после того, как сервер готов отвечать
+        for name in self.preload:
+            if name not in self._slots:
+                try:
+                    self.load(name)
+                except Exception as e:
+                    logger.error("Ошибка загрузки модели %s: %s", name, e)
+
+    def start(self):
+        """
+        Запускает загрузку моделей в фоновом потоке (повторные вызовы ничего не делают)
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._startup, name="model-loader", daemon=True)
+        self._thread.start()
+
+    def wait_until_ready(self, timeout=None):
+        self.start()
+        return self._ready_event.wait(timeout)
+
+    def acquire(self, name=None):
+        """
+        Берет модель для обработки запроса; после обработки нужно вызвать slot.release()
+
+        Args:
+            name: Название модели (None - модель по умолчанию)
+
+        Returns:
+            ModelSlot или None: Модель или None в демо-режиме
+
+        Raises:
+            ModelNotReadyError: Модель еще загружается (загрузка запускается при первом запросе)
+            ModelNotFoundError: Модель неизвестна или ее не удалось загрузить
+        """
+        self.start()
+        if not self._ready_event.is_set():
+            raise ModelNotReadyError(f"Модель еще не готова (состояние: {self.state})")
+
+        with self._lock:
+            name = name or self.default_name
+            if name is None:
+                return None
+            slot = self._slots.get(name)
+            if slot is not None:
+                slot.acquire()
+                return slot
+            if name not in self.models:
+                raise ModelNotFoundError(f"Неизвестная модель: {name}")
+            if name in self._errors:
+                raise ModelNotFoundError(f"Модель {name} недоступна: {self._errors[name]}")
+            loading = name in self._loading
+
+        if not loading:
+            self.load_async(name)
+        raise ModelNotReadyError(f"Модель {name} загружается")
+
+    def model_key(self, name=None):
+        """
+        Идентификатор текущей версии модели ("demo" в демо-режиме) - для ключей кэшей
+        """
+        slot = self.acquire(name)
+        if slot is None:
+            return "demo"
+        slot.release()
+        return slot.key
+
+    def default_slot(self):
+        with self._lock:
+            return self._slots.get(self.default_name)
+
+    def status(self):
+        """
+        Состояние загрузки и список моделей
+        """
+        with self._lock:
+            slots = dict(self._slots)
+            loading = set(self._loading)
+            errors = dict(self._errors)
+            names = list(self.models)
+        default = slots.get(self.default_name)
+
+        models = {}
+        for name in names:
+            if name in slots:
+                models[name] = {"state": "loading" if name in loading else "ready", **slots[name].info()}
+            elif name in loading:
+                models[name] = {"state": "loading"}
+            elif name in errors:
+                models[name] = {"state": "failed", "error": errors[name]}
+            else:
+                models[name] = {"state": "not_loaded"}
+
+        return {
+            "state": self.state,
+            "ready": self._ready_event.is_set(),
+            "default_model": self.default_name,
+            "backend": default.detector.backend if default is not None else None,
+            "weights": default.path if default is not None else None,
+            "load_seconds": self.load_seconds,
+            "models": models,
+        }
+
+    def stop(self):
+        """
+        Останавливает очереди инференса всех моделей (при остановке приложения)
+        """
+        with self._lock:
+            slots = list(self._slots.values())
+        for slot in slots:
+            slot.batcher.stop()
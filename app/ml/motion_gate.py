@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from app.core.config import (
+    MOTION_THUMB_SIZE,
+    MOTION_PIXEL_THRESHOLD,
+    MOTION_CHANGE_THRESHOLD,
+    MOTION_MAX_REUSE_SECONDS,
+    MOTION_MAX_SOURCES,
+)
+
+
+class MotionGate:
+    """
+    Детектор изменений кадра для одного источника (камеры или клиента).
+
+    Каждый новый кадр уменьшается до маленького полутонового изображения и
+    сравнивается с последним кадром, на котором выполнялся инференс. Если доля
+    изменившихся пикселей меньше порога, можно вернуть предыдущий результат
+    детекции вместо нового прохода модели.
+    """
+
+    def __init__(self, source, thumb_size=(64, 48), pixel_threshold=15, change_threshold=0.005, max_reuse_seconds=10.0):
+        """
+        Args:
+            source: Идентификатор источника кадров
+            thumb_size: Размер уменьшенного кадра (ширина, высота)
+            pixel_threshold: Изменение яркости пикселя, которое считается движением
+            change_threshold: Доля изменившихся пикселей, при которой нужен новый инференс
+            max_reuse_seconds: Максимальный возраст переиспользуемого результата
+        """
+        self.source = source
+        self.thumb_size = thumb_size
+        self.pixel_threshold = pixel_threshold
+        self.change_threshold = change_threshold
+        self.max_reuse_seconds = max_reuse_seconds
+
+        self.last_change = 0.0
+
+        self._thumb = None
+        self._detections = None
+        self._inferred_at = 0.0
+        self._lock = threading.Lock()
+
+    def thumbnail(self, img):
+        """
+        Уменьшенный размытый полутоновый кадр для сравнения (размытие гасит шум матрицы)
+        """
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        thumb = cv2.resize(gray, self.thumb_size, interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(thumb, (3, 3), 0)
+
+    def reuse(self, thumb):
+        """
+        Возвращает детекции последнего обработанного кадра, если сцена не изменилась
+
+        Returns:
+            tuple или None: (xyxy, conf) предыдущего инференса или None, если нужен новый
+        """
+        with self._lock:
+            if self._thumb is None or time.monotonic() - self._inferred_at > self.max_reuse_seconds:
+                return None
+            diff = cv2.absdiff(thumb, self._thumb)
+            self.last_change = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+            if self.last_change >= self.change_threshold:
+                return None
+            return self._detections
+
+    def update(self, thumb, detections):
+        """
+        Запоминает кадр, на котором выполнен инференс, и его детекции
+        """
+        with self._lock:
+            self._thumb = thumb
+            self._detections = detections
+            self._inferred_at = time.monotonic()
+
+
+# Счетчики для всех источников
+frames_inferred = 0
+frames_reused = 0
+
+_gates = OrderedDict()
+_gates_lock = threading.Lock()
+
+
+def get_motion_gate(source):
+    """
+    Возвращает детектор изменений источника; давно не использованные источники вытесняются
+    """
+    with _gates_lock:
+        gate = _gates.get(source)
+        if gate is None:
+            gate = MotionGate(
+                source,
+                thumb_size=MOTION_THUMB_SIZE,
+                pixel_threshold=MOTION_PIXEL_THRESHOLD,
+                change_threshold=MOTION_CHANGE_THRESHOLD,
+                max_reuse_seconds=MOTION_MAX_REUSE_SECONDS,
+            )
+            _gates[source] = gate
+            while len(_gates) > MOTION_MAX_SOURCES:
+                _gates.popitem(last=False)
+        else:
+            _gates.move_to_end(source)
+        return gate
+
+
+def record_frame(inferred):
+    """
+    Учитывает кадр в статистике: обработан моделью или результат переиспользован
+    """
+    global frames_inferred, frames_reused
+    with _gates_lock:
+        if inferred:
+            frames_inferred += 1
+        else:
+            frames_reused += 1
+
+
+def motion_gate_stats():
+    total = frames_inferred + frames_reused
+    return {
+        "sources": len(_gates),
+        "frames_inferred": frames_inferred,
+        "frames_reused": frames_reused,
+        "reuse_rate": round(frames_reused / total, 3) if total else 0,
+    }
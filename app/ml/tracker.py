@@ -0,0 +1,303 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from app.core.config import (
+    TRACKER_INFER_EVERY,
+    TRACKER_MAX_SKIP_SECONDS,
+    TRACKER_HIGH_THRESHOLD,
+    TRACKER_NEW_TRACK_THRESHOLD,
+    TRACKER_MATCH_IOU,
+    TRACKER_LOW_MATCH_IOU,
+    TRACKER_MIN_HITS,
+    TRACKER_COUNT_GRACE,
+    TRACKER_MAX_AGE,
+    TRACKER_MAX_SOURCES,
+)
+
+# Шум фильтра Калмана относительно высоты рамки (как в ByteTrack)
+STD_POSITION = 1.0 / 20
+STD_VELOCITY = 1.0 / 160
+
+
+def iou_matrix(a, b):
+    """
+    Попарное IoU рамок xyxy формы (N, 4) и (M, 4)
+
+    Returns:
+        numpy array: Матрица IoU формы (N, M)
+    """
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), np.float32)
+    a = a[:, None, :]
+    b = b[None, :, :]
+    w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = w * h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+
+def greedy_match(iou, threshold):
+    """
+    Сопоставление по убыванию IoU: каждая строка и столбец используются не больше одного раза
+
+    Returns:
+        list: Пары (строка, столбец) с IoU не меньше threshold
+    """
+    if iou.size == 0:
+        return []
+    rows, cols = np.nonzero(iou >= threshold)
+    order = np.argsort(-iou[rows, cols], kind="stable")
+    used_rows, used_cols, matches = set(), set(), []
+    for row, col in zip(rows[order].tolist(), cols[order].tolist()):
+        if row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        matches.append((row, col))
+    return matches
+
+
+class KalmanBoxFilter:
+    """
+    Фильтр Калмана для рамки: состояние - центр, ширина, высота и их скорости
+    (модель постоянной скорости, шаг - один кадр источника)
+    """
+
+    _F = np.eye(8)
+    _F[:4, 4:] = np.eye(4)
+    _H = np.eye(4, 8)
+
+    def __init__(self, box):
+        self.mean = np.concatenate([self._measurement(box), np.zeros(4)])
+        h = self.mean[3]
+        std = np.array([2 * STD_POSITION * h] * 4 + [10 * STD_VELOCITY * h] * 4)
+        self.covariance = np.diag(std ** 2)
+
+    @staticmethod
+    def _measurement(box):
+        x1, y1, x2, y2 = box
+        return np.array([(x1 + x2) / 2, (y1 + y2) / 2, max(x2 - x1, 1.0), max(y2 - y1, 1.0)])
+
+    def predict(self):
+        h = self.mean[3]
+        std = np.array([STD_POSITION * h] * 4 + [STD_VELOCITY * h] * 4)
+        self.mean = self._F @ self.mean
+        self.mean[2:4] = np.maximum(self.mean[2:4], 1.0)
+        self.covariance = self._F @ self.covariance @ self._F.T + np.diag(std ** 2)
+
+    def update(self, box):
+        measurement = self._measurement(box)
+        std = STD_POSITION * measurement[3]
+        projected_cov = self._H @ self.covariance @ self._H.T + np.eye(4) * std ** 2
+        gain = np.linalg.solve(projected_cov, self._H @ self.covariance).T
+        self.mean = self.mean + gain @ (measurement - self._H @ self.mean)
+        self.covariance = self.covariance - gain @ self._H @ self.covariance
+
+    def box(self):
+        cx, cy, w, h = self.mean[:4]
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+
+class Track:
+    """
+    Сопровождаемый человек: рамка, уверенность последней детекции и счетчики сопоставлений
+    """
+
+    def __init__(self, track_id, box, conf, confirmed=False):
+        self.id = track_id
+        self.filter = KalmanBoxFilter(box)
+        self.conf = float(conf)
+        self.hits = 1
+        # Проходов модели подряд без сопоставленной детекции
+        self.misses = 0
+        self.confirmed = confirmed
+
+    def update(self, box, conf):
+        self.filter.update(box)
+        self.conf = float(conf)
+        self.hits += 1
+        self.misses = 0
+        if self.hits >= TRACKER_MIN_HITS:
+            self.confirmed = True
+
+
+class ByteTracker:
+    """
+    Сопровождение людей на кадрах одного источника (в стиле ByteTrack).
+
+    На кадрах с проходом модели детекции сопоставляются с треками в два этапа:
+    сначала надежные (уверенность не ниже TRACKER_HIGH_THRESHOLD), затем
+    оставшимся трекам - детекции с низкой уверенностью (частично закрытые люди,
+    далекие и мелкие фигуры) со строгим порогом IoU.
+    Количество людей - число подтвержденных треков, поэтому единичный пропуск
+    или ложная детекция на одном кадре его не меняет.
+
+    Правило подсчета: человек учитывается, если его детекция (уверенность не ниже
+    TRACKER_NEW_TRACK_THRESHOLD, по умолчанию равного CONFIDENCE_THRESHOLD модели)
+    найдена на TRACKER_MIN_HITS проходах модели подряд; на первом кадре источника -
+    сразу, как без сопровождения. Учтенный человек остается в количестве, пока
+    пропущен не больше TRACKER_COUNT_GRACE проходов подряд.
+
+    Между проходами модели (каждый TRACKER_INFER_EVERY-й кадр) рамки треков
+    продвигаются фильтром Калмана без инференса.
+    """
+
+    def __init__(self, source, infer_every=TRACKER_INFER_EVERY, max_skip_seconds=TRACKER_MAX_SKIP_SECONDS):
+        self.source = source
+        self.infer_every = infer_every
+        self.max_skip_seconds = max_skip_seconds
+        self.tracks = []
+
+        self._ids = itertools.count(1)
+        self._frames_since_inference = 0
+        self._inferred_at = 0.0
+        self._lock = threading.Lock()
+
+    def needs_inference(self):
+        """
+        Нужен ли проход модели на следующем кадре
+        """
+        with self._lock:
+            if self._frames_since_inference + 1 >= self.infer_every:
+                return True
+            if time.monotonic() - self._inferred_at > self.max_skip_seconds:
+                return True
+            # Новые треки подтверждаются только проходами модели - не откладываем их
+            return any(not track.confirmed for track in self.tracks)
+
+    def _output(self):
+        """
+        Подтвержденные треки, которые учитываются в количестве
+
+        Returns:
+            tuple: (рамки int32 формы (N, 4), уверенности float32, идентификаторы треков)
+        """
+        counted = [track for track in self.tracks if track.confirmed and track.misses <= TRACKER_COUNT_GRACE]
+        if not counted:
+            return np.zeros((0, 4), np.int32), np.zeros(0, np.float32), []
+        xyxy = np.array([track.filter.box() for track in counted]).round().astype(np.int32)
+        conf = np.array([track.conf for track in counted], np.float32)
+        return xyxy, conf, [track.id for track in counted]
+
+    def predict(self):
+        """
+        Кадр без прохода модели: продвигает треки на один кадр
+
+        Returns:
+            tuple: Рамки, уверенности и идентификаторы учитываемых треков
+        """
+        with self._lock:
+            self._frames_since_inference += 1
+            for track in self.tracks:
+                track.filter.predict()
+            return self._output()
+
+    def update(self, xyxy, conf):
+        """
+        Кадр с проходом модели: сопоставляет детекции с треками
+
+        Args:
+            xyxy: Рамки детекций формы (N, 4)
+            conf: Уверенности детекций формы (N,)
+
+        Returns:
+            tuple: Рамки, уверенности и идентификаторы учитываемых треков
+        """
+        with self._lock:
+            # На первом кадре источника треки подтверждаются сразу - количество не начинается с нуля
+            first_frame = self._inferred_at == 0.0
+            self._frames_since_inference = 0
+            self._inferred_at = time.monotonic()
+            for track in self.tracks:
+                track.filter.predict()
+
+            xyxy = np.asarray(xyxy, np.float64).reshape(-1, 4)
+            conf = np.asarray(conf, np.float32)
+            high = np.nonzero(conf >= TRACKER_HIGH_THRESHOLD)[0]
+            low = np.nonzero(conf < TRACKER_HIGH_THRESHOLD)[0]
+            track_boxes = np.array([track.filter.box() for track in self.tracks]).reshape(-1, 4)
+
+            # Этап 1: надежные детекции со всеми треками
+            matched_tracks, matched_high = set(), set()
+            for row, col in greedy_match(iou_matrix(track_boxes, xyxy[high]), TRACKER_MATCH_IOU):
+                self.tracks[row].update(xyxy[high[col]], conf[high[col]])
+                matched_tracks.add(row)
+                matched_high.add(col)
+
+            # Этап 2: детекции с низкой уверенностью с оставшимися треками (со строгим порогом IoU;
+            # неподтвержденные участвуют, чтобы трек, начатый такой детекцией, мог подтвердиться)
+            matched_low = set()
+            remaining = [i for i in range(len(self.tracks)) if i not in matched_tracks]
+            if remaining and len(low):
+                iou = iou_matrix(track_boxes[remaining], xyxy[low])
+                for row, col in greedy_match(iou, TRACKER_LOW_MATCH_IOU):
+                    self.tracks[remaining[row]].update(xyxy[low[col]], conf[low[col]])
+                    matched_tracks.add(remaining[row])
+                    matched_low.add(col)
+
+            # Несопоставленные треки: неподтвержденные удаляются сразу, остальные - после TRACKER_MAX_AGE пропусков
+            tracks = []
+            for i, track in enumerate(self.tracks):
+                if i not in matched_tracks:
+                    track.misses += 1
+                    if not track.confirmed or track.misses > TRACKER_MAX_AGE:
+                        continue
+                tracks.append(track)
+
+            # Новые треки из всех несопоставленных детекций не ниже TRACKER_NEW_TRACK_THRESHOLD
+            # (в том числе с низкой уверенностью - их отсеивает подтверждение TRACKER_MIN_HITS проходами)
+            unmatched = [index for col, index in enumerate(high.tolist()) if col not in matched_high]
+            unmatched += [index for col, index in enumerate(low.tolist()) if col not in matched_low]
+            for index in sorted(unmatched):
+                if conf[index] >= TRACKER_NEW_TRACK_THRESHOLD:
+                    tracks.append(Track(next(self._ids), xyxy[index], conf[index], confirmed=first_frame))
+            self.tracks = tracks
+            return self._output()
+
+
+# Счетчики для всех источников
+frames_tracked = 0
+
+_trackers = OrderedDict()
+_trackers_lock = threading.Lock()
+
+
+def get_tracker(source):
+    """
+    Возвращает трекер источника; давно не использованные источники вытесняются
+    """
+    with _trackers_lock:
+        tracker = _trackers.get(source)
+        if tracker is None:
+            tracker = _trackers[source] = ByteTracker(source)
+            while len(_trackers) > TRACKER_MAX_SOURCES:
+                _trackers.popitem(last=False)
+        else:
+            _trackers.move_to_end(source)
+        return tracker
+
+
+def record_tracked_frame():
+    """
+    Учитывает кадр, обработанный только сопровождением (без прохода модели)
+    """
+    global frames_tracked
+    with _trackers_lock:
+        frames_tracked += 1
+
+
+def tracker_stats():
+    with _trackers_lock:
+        trackers = list(_trackers.values())
+    return {
+        "sources": len(trackers),
+        "infer_every": TRACKER_INFER_EVERY,
+        "frames_tracked": frames_tracked,
+        "tracks": sum(len(tracker.tracks) for tracker in trackers),
+    }
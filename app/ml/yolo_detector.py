@@ -1,89 +1,63 @@
-from ultralytics import YOLO
 import cv2
+import logging
 import numpy as np
 import os
 import time
 import random
-import traceback
 
-print("Текущая директория:", os.getcwd())
+from app.core.config import CONFIDENCE_THRESHOLD, DEBUG_SAVE_FRAMES, MOTION_GATE_ENABLED, TRACKER_ENABLED, MODELS, MODELS_PRELOAD
+from app.ml.camera_worker import get_camera_worker
+from app.core.log import get_logger, SampledLogger
+from app.core.metrics import time_stage
+from app.ml.inference_batcher import QueueFullError
+from app.ml.model_registry import ModelRegistry
+from app.ml.motion_gate import get_motion_gate, record_frame
+from app.ml.tracker import get_tracker, record_tracked_frame
 
-# Проверяем наличие файла модели
-model_paths = [
-    "runs/detect/lasttrain/weights/headmodel.pt",  # Текущий путь
-    "../runs/detect/lasttrain/weights/headmodel.pt",  # Относительный путь
-    os.path.abspath("../runs/detect/lasttrain/weights/headmodel.pt"),  # Абсолютный путь
-    "yolo_camera_project/runs/detect/lasttrain/weights/headmodel.pt",  # Альтернативный путь
-    "../yolo_camera_project/runs/detect/lasttrain/weights/headmodel.pt",  # Другой альтернативный путь
-    "yolo_camera_project/runs/detect/train2/weights/best.pt",  # Другая модель
-    "yolo_camera_project/runs/detect/train4/weights/yolov11.pt",  # Еще одна модель
-    "yolov8n.pt"  # Стандартная модель YOLOv8n (будет загружена автоматически)
-]
+logger = get_logger(__name__)
+# Сообщения на каждый кадр выводим с ограничением частоты
+sampled_logger = SampledLogger(logger)
 
-# Проверяем все пути
-for path in model_paths:
-    print(f"Проверка пути {path}: {'Существует' if os.path.exists(path) else 'Не существует'}")
+# Модели создаются в фоне (start_model_loading), а не при импорте:
+# импорт модуля не загружает torch/ultralytics и не читает веса
+registry = ModelRegistry(MODELS, MODELS_PRELOAD)
 
-# Ищем первый доступный файл модели
-model = None
-for path in model_paths:
-    if path == "yolov8n.pt" or os.path.exists(path):
-        try:
-            print(f"Загружаем модель из {path}")
-            model = YOLO(path)
-            print(f"Модель успешно загружена из {path}")
-            
-            # Выводим информацию о классах модели
-            print("Доступные классы в модели:", model.names)
-            if path == "yolov8n.pt":
-                print("Используется стандартная модель YOLOv8n")
-                if 'person' in model.names.values():
-                    print("Класс 'person' имеет индекс:", list(model.names.keys())[list(model.names.values()).index('person')])
-            else:
-                print("Используется специализированная модель")
-            
-            break
-        except Exception as e:
-            print(f"Ошибка загрузки модели {path}: {str(e)}")
+def start_model_loading():
+    """
+    Запускает загрузку моделей в фоновом потоке (повторные вызовы ничего не делают)
+    """
+    registry.start()
 
-if model is None:
-    print("ВНИМАНИЕ: Ни одна модель не найдена. Используется демо-режим.")
+def wait_until_ready(timeout=None):
+    """
+    Запускает загрузку, если она еще не начата, и ждет загрузки модели по умолчанию
+    
+    Returns:
+        bool: True, если загрузка завершена (модель готова или включен демо-режим)
+    """
+    return registry.wait_until_ready(timeout)
 
-# Отключаем кэширование для более точных результатов
-CACHE_ENABLED = False
-last_result = None
-last_detection_time = 0
-CACHE_TIMEOUT = 0.1  # Уменьшаем кэширование до 100 мс
+def model_status():
+    """
+    Состояние загрузки моделей для проверки готовности
+    """
+    return registry.status()
+
+def stop_model():
+    """
+    Останавливает очереди инференса (при остановке приложения)
+    """
+    registry.stop()
+
+# Порядок координат рамки в ответе
+BOX_KEYS = ("xmin", "ymin", "xmax", "ymax")
 
 # Переменные для демо-режима
 demo_last_update = 0
 demo_update_interval = 2  # Обновляем демо-данные каждые 2 секунды
 demo_count = 2
 
-# Функция для получения списка доступных камер
-def get_available_cameras(max_cameras=10):
-    """
-    Проверяет доступные камеры в системе
-    
-    Args:
-        max_cameras: Максимальное количество камер для проверки
-        
-    Returns:
-        list: Список доступных индексов камер
-    """
-    available_cameras = []
-    for i in range(max_cameras):
-        cap = cv2.VideoCapture(i)
-        if cap.isOpened():
-            available_cameras.append(i)
-            cap.release()
-        else:
-            cap.release()
-    
-    print(f"Доступные камеры: {available_cameras}")
-    return available_cameras
-
-def get_demo_data():
+def get_demo_data(compact=False):
     """
     Генерирует демо-данные с случайными вариациями
     """
@@ -98,215 +72,291 @@ def get_demo_data():
         demo_count = max(1, min(10, demo_count + change))  # Ограничиваем от 1 до 10
         demo_last_update = current_time
         
-        print(f"Демо-режим: обновление количества людей до {demo_count}")
+        logger.debug("Демо-режим: обновление количества людей до %d", demo_count)
     
     # Генерируем случайные боксы
-    boxes = []
-    for i in range(demo_count):
-        x1 = random.randint(50, 400)
-        y1 = random.randint(50, 300)
-        width = random.randint(50, 100)
-        height = random.randint(100, 200)
-        boxes.append({"xmin": x1, "ymin": y1, "xmax": x1 + width, "ymax": y1 + height})
+    x1 = np.random.randint(50, 401, demo_count)
+    y1 = np.random.randint(50, 301, demo_count)
+    width = np.random.randint(50, 101, demo_count)
+    height = np.random.randint(100, 201, demo_count)
+    xyxy = np.stack([x1, y1, x1 + width, y1 + height], axis=1)
+    
+    return format_detections(xyxy, np.ones(demo_count, dtype=np.float32), compact)
+
+def extract_detections(result, conf_threshold=CONFIDENCE_THRESHOLD):
+    """
+    Фильтрует рамки по уверенности и переводит координаты в целые числа
+    за одну операцию над массивами xyxy/conf, без цикла по отдельным рамкам
+    
+    Args:
+        result: Результат детектора для одного изображения (Detections)
+        conf_threshold: Минимальная уверенность детекции
+        
+    Returns:
+        tuple: (координаты рамок int32 формы (N, 4), уверенности float32 формы (N,))
+    """
+    conf = result.conf
+    keep = conf > conf_threshold
+    xyxy = result.xyxy[keep].astype(np.int32)
+    
+    # Трассировка отдельных рамок - только при уровне DEBUG, иначе цикл не выполняется вовсе
+    if logger.isEnabledFor(logging.DEBUG):
+        for i in range(len(conf)):
+            if keep[i]:
+                logger.debug("Добавлен объект: класс=%d, уверенность=%.2f, координаты=%s",
+                             result.cls[i], conf[i], result.xyxy[i].astype(int).tolist())
+            else:
+                logger.debug("Объект отклонен из-за низкой уверенности: %.2f <= %s", conf[i], conf_threshold)
+    
+    return xyxy, conf[keep]
+
+def format_detections(xyxy, conf, compact=False, ids=None):
+    """
+    Формирует ответ детектора из массивов рамок
+    
+    Args:
+        xyxy: Координаты рамок формы (N, 4)
+        conf: Уверенности формы (N,)
+        compact: Вместо списка словарей вернуть плоский массив координат
+            [x1, y1, x2, y2, x1, y1, ...] и массив уверенностей
+        ids: Идентификаторы треков рамок (None - без сопровождения)
+            
+    Returns:
+        dict: Словарь с количеством обнаруженных объектов и координатами рамок
+    """
+    if compact:
+        result = {
+            "count": len(xyxy),
+            "boxes": [],
+            "xyxy": xyxy.ravel().tolist(),
+            "conf": np.round(conf.astype(np.float64), 3).tolist(),
+        }
+        if ids is not None:
+            result["ids"] = list(ids)
+        return result
+    boxes = [dict(zip(BOX_KEYS, row)) for row in xyxy.tolist()]
+    if ids is not None:
+        for box, track_id in zip(boxes, ids):
+            box["id"] = track_id
+    return {
+        "count": len(xyxy),
+        "boxes": boxes,
+    }
+
+def detect_gated(img, infer, source=None, compact=False, on_detections=None):
+    """
+    Детекция с пропуском неизменившихся кадров и сопровождением людей: если кадр
+    источника почти не отличается от последнего обработанного, модель не вызывается,
+    а возвращаются предыдущие рамки. Между полными проходами модели (каждый
+    TRACKER_INFER_EVERY-й кадр источника) рамки продвигает трекер, а количество
+    людей - число подтвержденных треков
+    
+    Args:
+        img: Изображение (BGR)
+        infer: Функция, выполняющая инференс одного изображения
+        source: Идентификатор источника кадров (None - без сравнения кадров и сопровождения)
+        compact: Вернуть рамки в компактном виде
+        on_detections: Функция, которая получает детекции модели (xyxy, conf) до сопровождения
+            (вызывается, только если модель запускалась) - например, для кэша кадров
+        
+    Returns:
+        dict: Результат детекции с полями inferred (False - модель не вызывалась)
+            и tracked (рамки получены сопровождением)
+    """
+    gate = None
+    if MOTION_GATE_ENABLED and source is not None:
+        gate = get_motion_gate(source)
+        thumb = gate.thumbnail(img)
+        detections = gate.reuse(thumb)
+        if detections is not None:
+            record_frame(False)
+            logger.debug("Источник %s: сцена не изменилась (%.4f), используем предыдущий результат", source, gate.last_change)
+            xyxy, conf, ids = detections
+            result = format_detections(xyxy, conf, compact, ids)
+            result["inferred"] = False
+            if ids is not None:
+                result["tracked"] = True
+            return result
+    
+    tracker = get_tracker(source) if TRACKER_ENABLED and source is not None else None
+    if tracker is not None and not tracker.needs_inference():
+        # Кадр между проходами модели: рамки продвигает фильтр Калмана
+        with time_stage("track"):
+            xyxy, conf, ids = tracker.predict()
+            record_tracked_frame()
+            result = format_detections(xyxy, conf, compact, ids)
+        result["inferred"] = False
+        result["tracked"] = True
+        return result
     
-    return {"count": demo_count, "boxes": boxes}
+    # Время инференса включает ожидание в очереди модели
+    with time_stage("inference"):
+        detection = infer(img)
+    
+    # Для отладки выводим все обнаруженные объекты
+    logger.debug("Всего обнаружено объектов: %d", len(detection))
+    
+    with time_stage("postprocess"):
+        # Фильтруем и преобразуем все рамки сразу
+        xyxy, conf = extract_detections(detection)
+        if on_detections is not None:
+            on_detections((xyxy, conf))
+        ids = None
+        if tracker is not None:
+            xyxy, conf, ids = tracker.update(xyxy, conf)
+        if gate is not None:
+            gate.update(thumb, (xyxy, conf, ids))
+        record_frame(True)
+        
+        result = format_detections(xyxy, conf, compact, ids)
+    result["inferred"] = True
+    if tracker is not None:
+        result["tracked"] = True
+    return result
 
-def detect_people_from_camera(camera_id=0):
+def detect_people_from_camera(camera_id=0, compact=False, model_name=None):
     """
     Обнаружение людей с камеры в реальном времени
     
     Args:
         camera_id: Индекс камеры (0 - встроенная камера, 1+ - внешние камеры)
+        compact: Вернуть рамки в компактном виде (плоский массив координат)
+        model_name: Название модели (None - модель по умолчанию)
         
     Returns:
         dict: Словарь с количеством обнаруженных людей и координатами рамок
     """
+    # Если модель не найдена, возвращаем демо-данные с вариациями;
+    # незагруженную или неизвестную модель обрабатывает вызывающая сторона (ответ 503/404)
+    slot = registry.acquire(model_name)
+    if slot is None:
+        sampled_logger.warning("demo-camera", "Модель не загружена, используем демо-данные для камеры")
+        return get_demo_data(compact)
+    
     try:
-        # Если модель не загружена, возвращаем демо-данные с вариациями
-        if model is None:
-            print("Модель не загружена, используем демо-данные для камеры")
-            return get_demo_data()
-        
-        print(f"Пытаемся открыть камеру с индексом {camera_id}")
-        
-        # Пробуем несколько раз открыть камеру для большей надежности
-        max_attempts = 3
-        cap = None
-        
-        for attempt in range(max_attempts):
-            try:
-                cap = cv2.VideoCapture(camera_id)
-                if cap.isOpened():
-                    print(f"Камера {camera_id} успешно открыта (попытка {attempt+1})")
-                    break
-                else:
-                    print(f"Не удалось открыть камеру {camera_id} (попытка {attempt+1})")
-                    if cap:
-                        cap.release()
-                    time.sleep(0.5)  # Небольшая пауза перед следующей попыткой
-            except Exception as e:
-                print(f"Ошибка при попытке открыть камеру {camera_id}: {str(e)}")
-                if cap:
-                    cap.release()
-                time.sleep(0.5)
-        
-        # Если не удалось открыть камеру после всех попыток
-        if cap is None or not cap.isOpened():
-            print(f"Ошибка: Не удалось открыть камеру с индексом {camera_id} после {max_attempts} попыток")
-            # Пробуем открыть камеру с индексом 0 в качестве запасного варианта
-            if camera_id != 0:
-                print("Пробуем открыть камеру с индексом 0")
-                cap = cv2.VideoCapture(0)
-                if not cap.isOpened():
-                    print("Ошибка: Не удалось открыть камеру с индексом 0")
+        # Берем самый свежий кадр у фонового потока камеры - камера остается открытой между запросами
+        worker = get_camera_worker(camera_id)
+        frame = worker.get_frame()
+        frame_camera_id = camera_id
+
+        # Если не удалось получить кадр с камеры
+        if frame is None:
+            logger.error("Ошибка: %s", worker.error or f"Не удалось получить кадр с камеры {camera_id}")
+            # Пробуем камеру с индексом 0 в качестве запасного варианта
+            if camera_id != 0 and worker.error:
+                logger.info("Пробуем получить кадр с камеры 0")
+                frame = get_camera_worker(0).get_frame()
+                frame_camera_id = 0
+                if frame is None:
+                    logger.error("Ошибка: Не удалось получить кадр с камеры 0")
                     return {"count": 0, "boxes": [], "error": f"Не удалось открыть камеру {camera_id}", "camera_id": camera_id}
-            else:
+            elif worker.error:
                 return {"count": 0, "boxes": [], "error": "Не удалось открыть камеру", "camera_id": camera_id}
-        
-        # Получаем информацию о камере
-        width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-        height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        print(f"Камера {camera_id}: разрешение {width}x{height}, FPS: {fps}")
-        
-        # Читаем кадр
-        success, frame = cap.read()
-        cap.release()
-
-        if not success:
-            print(f"Ошибка: Не удалось получить кадр с камеры {camera_id}")
-            return {"count": 0, "boxes": [], "error": f"Не удалось получить кадр с камеры {camera_id}", "camera_id": camera_id}
+            else:
+                return {"count": 0, "boxes": [], "error": f"Не удалось получить кадр с камеры {camera_id}", "camera_id": camera_id}
 
-        print(f"Запуск детекции на кадре с камеры {camera_id} размером {frame.shape}")
+        logger.debug("Запуск детекции на кадре с камеры %d размером %s", camera_id, frame.shape)
         
         # Для отладки сохраняем кадр
-        debug_path = f"debug_frames/camera_{camera_id}_frame.jpg"
-        os.makedirs("debug_frames", exist_ok=True)
-        cv2.imwrite(debug_path, frame)
-        print(f"Сохранено отладочное изображение: {debug_path}")
+        if DEBUG_SAVE_FRAMES:
+            debug_path = f"debug_frames/camera_{camera_id}_frame.jpg"
+            os.makedirs("debug_frames", exist_ok=True)
+            cv2.imwrite(debug_path, frame)
+            logger.debug("Сохранено отладочное изображение: %s", debug_path)
 
-        results = model(frame)
-        
-        # Получаем информацию о модели
-        model_type = str(model.ckpt_path)
-        print(f"Используемая модель для камеры: {model_type}")
-        
-        # Для отладки выводим все обнаруженные объекты
-        all_boxes = results[0].boxes
-        print(f"Всего обнаружено объектов на кадре: {len(all_boxes)}")
-        
-        count = 0
-        boxes = []
-        
-        # Принимаем ВСЕ обнаруженные объекты с минимальным порогом уверенности
-        for box in results[0].boxes:
-            # Получаем класс объекта и уверенность
-            cls_id = int(box.cls[0])
-            conf = float(box.conf[0])
-            
-            # Выводим информацию о каждом объекте
-            print(f"Обнаружен объект на кадре: класс={cls_id}, уверенность={conf:.2f}")
-            
-            # Используем крайне низкий порог уверенности для всех классов
-            if conf > 0.1:  # Критически снижаем порог до 0.1, чтобы максимизировать количество детекций
-                count += 1
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                boxes.append({"xmin": x1, "ymin": y1, "xmax": x2, "ymax": y2})
-                print(f"  - Добавлен объект: класс={cls_id}, координаты={x1},{y1} - {x2},{y2}")
-            else:
-                print(f"  - Объект отклонен из-за низкой уверенности: {conf:.2f} < 0.1")
+        # Неизменившиеся кадры камеры не прогоняем через модель повторно
+        # (у каждой модели свое сравнение кадров - рамки разных моделей не смешиваются);
+        # кадр идет через очередь модели, как и загруженные изображения: модель
+        # вызывается только из потока очереди, а длина очереди ограничена
+        result = detect_gated(frame, slot.batcher.infer, f"camera:{frame_camera_id}|{slot.key}", compact)
         
-        print(f"Итого обнаружено объектов на кадре: {count}")
-        return {"count": count, "boxes": boxes, "camera_id": camera_id}
+        sampled_logger.info(f"camera-{camera_id}", "Камера %d: обнаружено объектов на кадре: %d",
+                            camera_id, result["count"], extra={"camera_id": camera_id, "count": result["count"]})
+        result["camera_id"] = camera_id
+        result["model"] = slot.name
+        return result
+    except QueueFullError:
+        # Перегрузку обрабатывает вызывающая сторона (ответ 503)
+        raise
     except Exception as e:
-        print(f"Ошибка при обнаружении объектов с камеры {camera_id}: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Ошибка при обнаружении объектов с камеры %d: %s", camera_id, e)
         return {"count": 0, "boxes": [], "error": str(e), "camera_id": camera_id}
+    finally:
+        slot.release()
+
+def track_detections(detections, source=None, model_key=None, compact=False):
+    """
+    Результат для кадра, детекции которого уже известны (кэш кадров): детекции
+    проходят через трекер источника, как после прохода модели, поэтому идентификаторы
+    треков и количество людей относятся к этому источнику, а не к тому, чей кадр
+    попал в кэш
+    
+    Args:
+        detections: Детекции модели (xyxy, conf)
+        source: Идентификатор источника кадров (None - без сопровождения)
+        model_key: Версия модели, выполнившей детекцию (registry.model_key)
+        compact: Вернуть рамки в компактном виде
+        
+    Returns:
+        dict: Результат детекции (поле tracked - при сопровождении)
+    """
+    xyxy, conf = detections
+    tracker = get_tracker(f"{source}|{model_key}") if TRACKER_ENABLED and source is not None else None
+    if tracker is None:
+        return format_detections(xyxy, conf, compact)
+    xyxy, conf, ids = tracker.update(xyxy, conf)
+    result = format_detections(xyxy, conf, compact, ids)
+    result["tracked"] = True
+    return result
 
-def detect_people_from_image(img):
+def detect_people_from_image(img, compact=False, source=None, model_name=None, on_detections=None):
     """
     Обнаружение объектов на загруженном изображении
     
     Args:
         img: Изображение в формате numpy array (BGR)
+        compact: Вернуть рамки в компактном виде (плоский массив координат)
+        source: Идентификатор потока кадров, явно переданный клиентом; кадры одного источника
+            сравниваются между собой, и для неизменившихся инференс пропускается
+            (None - без сравнения кадров и сопровождения)
+        model_name: Название модели (None - модель по умолчанию)
+        on_detections: Функция, которая получает детекции модели (см. detect_gated)
         
     Returns:
         dict: Словарь с количеством обнаруженных объектов и координатами рамок
     """
-    global last_result, last_detection_time
+    if img is None:
+        logger.warning("Изображение пустое")
+        return {"count": 0, "boxes": []}
+    
+    # Если модель не найдена, возвращаем демо-данные с вариациями;
+    # незагруженную или неизвестную модель обрабатывает вызывающая сторона
+    slot = registry.acquire(model_name)
+    if slot is None:
+        sampled_logger.warning("demo-image", "Модель не загружена, используем демо-данные")
+        return get_demo_data(compact)
     
     try:
-        current_time = time.time()
-        
-        # Используем кэшированный результат только если включено кэширование
-        if CACHE_ENABLED and last_result and (current_time - last_detection_time) < CACHE_TIMEOUT:
-            return last_result
-            
-        if img is None:
-            print("Изображение пустое")
-            return {"count": 0, "boxes": []}
-            
-        # Если модель не загружена, возвращаем демо-данные с вариациями
-        if model is None:
-            print("Модель не загружена, используем демо-данные")
-            result = get_demo_data()
-            
-            # Кэшируем результат
-            if CACHE_ENABLED:
-                last_result = result
-                last_detection_time = current_time
-                
-            return result
-        
         # Для отладки сохраняем последнее изображение (раз в 10 секунд)
-        if current_time % 10 < 0.5:
+        if DEBUG_SAVE_FRAMES and time.time() % 10 < 0.5:
             debug_path = "debug_latest.jpg"
             cv2.imwrite(debug_path, img)
-            print(f"Сохранено отладочное изображение: {debug_path}, размер: {img.shape}")
+            logger.debug("Сохранено отладочное изображение: %s, размер: %s", debug_path, img.shape)
             
         # Запускаем детекцию с оптимизированными параметрами
-        print(f"Запуск детекции на изображении размером {img.shape}")
-        results = model(img, verbose=False)
-        
-        # Получаем информацию о модели
-        model_type = str(model.ckpt_path)
-        print(f"Используемая модель: {model_type}")
-        
-        # Для отладки выводим все обнаруженные объекты
-        all_boxes = results[0].boxes
-        print(f"Всего обнаружено объектов: {len(all_boxes)}")
-        
-        count = 0
-        boxes = []
-        
-        # Принимаем ВСЕ обнаруженные объекты с минимальным порогом уверенности
-        for box in results[0].boxes:
-            # Получаем класс объекта и уверенность
-            cls_id = int(box.cls[0])
-            conf = float(box.conf[0])
-            
-            # Выводим информацию о каждом объекте
-            print(f"Обнаружен объект: класс={cls_id}, уверенность={conf:.2f}")
-            
-            # Используем крайне низкий порог уверенности для всех классов
-            if conf > 0.1:  # Критически снижаем порог до 0.1, чтобы максимизировать количество детекций
-                count += 1
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                boxes.append({"xmin": x1, "ymin": y1, "xmax": x2, "ymax": y2})
-                print(f"  - Добавлен объект: класс={cls_id}, координаты={x1},{y1} - {x2},{y2}")
-            else:
-                print(f"  - Объект отклонен из-за низкой уверенности: {conf:.2f} < 0.1")
-        
-        print(f"Итого обнаружено объектов: {count}")
-        result = {"count": count, "boxes": boxes}
-        
-        # Кэшируем результат только если включено кэширование
-        if CACHE_ENABLED:
-            last_result = result
-            last_detection_time = current_time
+        logger.debug("Запуск детекции на изображении размером %s (модель %s)", img.shape, slot.key)
+        # Кадр уходит в очередь модели и обрабатывается в пакете с кадрами других запросов
+        gate_source = f"{source}|{slot.key}" if source is not None else None
+        result = detect_gated(img, slot.batcher.infer, gate_source, compact, on_detections)
+        result["model"] = slot.name
         
+        sampled_logger.info("image", "Обнаружено объектов на изображении: %d", result["count"], extra={"count": result["count"]})
         return result
+    except QueueFullError:
+        # Перегрузку обрабатывает вызывающая сторона
+        raise
     except Exception as e:
-        print(f"Ошибка при обнаружении объектов на изображении: {str(e)}")
-        traceback.print_exc()
-        return {"count": 0, "boxes": []}
\ No newline at end of file
+        logger.exception("Ошибка при обнаружении объектов на изображении: %s", e)
+        return {"count": 0, "boxes": []}
+    finally:
+        slot.release()
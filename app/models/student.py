@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, Date
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, func, Date, Index
 from datetime import datetime
 from app.core.database import Base
 
@@ -13,8 +13,12 @@ class Attendance(Base):
     Модель для хранения данных о посещаемости аудитории
     """
     __tablename__ = "attendance"
+    __table_args__ = (
+        # Статистика по парам: фильтр по дате и номеру пары, сортировка по времени
+        Index("ix_attendance_date_lesson_timestamp", "date", "lesson_number", "timestamp"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    timestamp = Column(DateTime, default=datetime.now)
+    timestamp = Column(DateTime, default=datetime.now, index=True)
     count = Column(Integer)
     lesson_number = Column(Integer, nullable=True)  # Номер пары
     date = Column(Date, default=datetime.now().date)  # Дата записи
@@ -29,4 +33,43 @@ class Attendance(Base):
             "count": self.count,
             "lesson_number": self.lesson_number,
             "date": self.date.isoformat() if self.date else None
-        }
\ No newline at end of file
+        }
+
+
+class AttendanceLessonRollup(Base):
+    """
+    Агрегаты посещаемости по дате и номеру пары.
+
+    Обновляются при каждом сбросе записей в БД (app.core.rollups), поэтому
+    статистика по парам читает одну строку на пару, а не все замеры.
+    """
+    __tablename__ = "attendance_lesson_rollup"
+    date = Column(Date, primary_key=True)
+    lesson_number = Column(Integer, primary_key=True, autoincrement=False)
+    sum_count = Column(BigInteger, nullable=False, default=0)
+    max_count = Column(Integer, nullable=False, default=0)
+    total_records = Column(Integer, nullable=False, default=0)
+    last_timestamp = Column(DateTime, nullable=True)  # Время последнего замера
+    last_count = Column(Integer, nullable=True)  # Количество людей в последнем замере
+
+
+class AttendanceHourRollup(Base):
+    """
+    Агрегаты посещаемости по часу суток (0-23)
+    """
+    __tablename__ = "attendance_hour_rollup"
+    hour = Column(Integer, primary_key=True, autoincrement=False)
+    sum_count = Column(BigInteger, nullable=False, default=0)
+    max_count = Column(Integer, nullable=False, default=0)
+    total_records = Column(Integer, nullable=False, default=0)
+
+
+class AttendanceWeekdayRollup(Base):
+    """
+    Агрегаты посещаемости по дню недели (0 - понедельник, 6 - воскресенье)
+    """
+    __tablename__ = "attendance_weekday_rollup"
+    weekday = Column(Integer, primary_key=True, autoincrement=False)
+    sum_count = Column(BigInteger, nullable=False, default=0)
+    max_count = Column(Integer, nullable=False, default=0)
+    total_records = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,143 @@
+"""
+Синтетические базы посещаемости для замеров: 10 тыс., 1 млн, 10 млн записей.
+
+Записи идут как у работающего приложения: по 8 пар в день, замер каждые
+10 секунд пары. База создается один раз и переиспользуется, если в ней
+уже нужное количество записей.
+"""
+import datetime
+import os
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.engine import make_url
+
+from app.core import database
+from app.core.database import Base, SessionLocal
+from app.core.rollups import rebuild_rollups, ROLLUP_MODELS
+from app.models.student import Attendance
+
+# Начало пар (час, минута) - как в расписании статистики
+LESSON_STARTS = [(8, 30), (10, 15), (12, 0), (14, 15), (16, 0), (17, 40), (19, 15), (20, 50)]
+LESSON_MINUTES = 90
+MEASURE_INTERVAL = 10  # секунд между замерами
+MEASURES_PER_LESSON = LESSON_MINUTES * 60 // MEASURE_INTERVAL
+ROWS_PER_DAY = MEASURES_PER_LESSON * len(LESSON_STARTS)
+# Последний день данных фиксирован, чтобы базу можно было переиспользовать в другие дни
+LAST_DAY = datetime.date(2025, 6, 30)
+
+# Каталог для файлов SQLite
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def database_url(template, name):
+    """
+    URL базы для набора данных: "sqlite" - файл в benchmarks/data,
+    иначе шаблон URL, в котором {name} заменяется названием набора
+    """
+    if template == "sqlite":
+        os.makedirs(DATA_DIR, exist_ok=True)
+        return f"sqlite:///{os.path.join(DATA_DIR, f'attendance_{name}.db')}"
+    return template.format(name=name)
+
+
+def use_database(url):
+    """
+    Переключает приложение (движок и фабрику сессий) на указанную базу
+
+    Returns:
+        Engine: Новый движок
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "mysql":
+        # Создаем базу, если ее еще нет
+        server = create_engine(url.set(database=None))
+        with server.connect() as conn:
+            conn.execute(text(f"CREATE DATABASE IF NOT EXISTS `{url.database}`"))
+        server.dispose()
+        engine = create_engine(url, pool_size=10, max_overflow=20, pool_pre_ping=True)
+    else:
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+
+    database.engine = engine
+    SessionLocal.configure(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def clear_database():
+    """
+    Удаляет все записи посещаемости и агрегаты из текущей базы
+    """
+    db = SessionLocal()
+    try:
+        for model in (Attendance, *ROLLUP_MODELS):
+            db.query(model).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def generate_rows(start, count, first_day, seed=0):
+    """
+    Генерирует записи с номерами start..start+count-1 (значения вычисляются массивами numpy)
+
+    Returns:
+        list: Словари записей для пакетной вставки
+    """
+    rng = np.random.default_rng(seed + start)
+    index = np.arange(start, start + count)
+    day, in_day = np.divmod(index, ROWS_PER_DAY)
+    lesson, measure = np.divmod(in_day, MEASURES_PER_LESSON)
+    starts = np.array([h * 3600 + m * 60 for h, m in LESSON_STARTS])
+    seconds = starts[lesson] + measure * MEASURE_INTERVAL
+    # Количество людей: у каждой пары свой уровень, внутри пары - небольшие колебания
+    level = (np.sin(day * 0.7 + lesson * 1.3) + 1.2) * 12
+    counts = np.clip(np.round(level + rng.normal(0, 2, count)), 0, 60).astype(int)
+
+    base = datetime.datetime.combine(first_day, datetime.time())
+    rows = []
+    for d, s, l, c in zip(day.tolist(), seconds.tolist(), lesson.tolist(), counts.tolist()):
+        timestamp = base + datetime.timedelta(days=d, seconds=s)
+        rows.append({"timestamp": timestamp, "count": c, "lesson_number": l + 1, "date": timestamp.date()})
+    return rows
+
+
+def ensure_dataset(url, rows, chunk_size=50000):
+    """
+    Создает базу с rows записями (если в ней уже столько записей - переиспользует)
+    и пересчитывает агрегаты
+
+    Returns:
+        dict: Описание набора данных (количество записей, последний день, время создания)
+    """
+    engine = use_database(url)
+    days = max(1, -(-rows // ROWS_PER_DAY))
+    first_day = LAST_DAY - datetime.timedelta(days=days - 1)
+
+    db = SessionLocal()
+    try:
+        existing = db.query(func.count(Attendance.id)).scalar()
+        first = db.query(func.min(Attendance.date)).scalar()
+        if existing == rows and first == first_day:
+            return {"rows": rows, "first_day": first_day.isoformat(), "last_day": LAST_DAY.isoformat(), "created": False}
+
+        started = time.perf_counter()
+        print(f"Создаем набор данных: {rows} записей в {engine.url.render_as_string(hide_password=True)}")
+        db.query(Attendance).delete(synchronize_session=False)
+        db.commit()
+        table = Attendance.__table__
+        for chunk_start in range(0, rows, chunk_size):
+            batch = generate_rows(chunk_start, min(chunk_size, rows - chunk_start), first_day)
+            db.execute(table.insert(), batch)
+            db.commit()
+            print(f"  {chunk_start + len(batch)}/{rows}", end="\r", flush=True)
+        print()
+        rebuild_rollups(db)
+        if engine.dialect.name == "sqlite":
+            db.execute(text("ANALYZE"))
+        print(f"Набор данных создан за {time.perf_counter() - started:.1f} с")
+        return {"rows": rows, "first_day": first_day.isoformat(), "last_day": LAST_DAY.isoformat(), "created": True}
+    finally:
+        db.close()
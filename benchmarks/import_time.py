@@ -0,0 +1,87 @@
+"""
+Замер времени импорта приложения (python -X importtime).
+
+Запуск из корня проекта:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --max-seconds 3 --top 15
+
+Завершается с кодом 1, если импорт дольше --max-seconds или при импорте
+загружаются тяжелые модули (torch, ultralytics), которые должны подгружаться
+только фоновой загрузкой модели.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# Модули, которые не должны импортироваться вместе с app.main
+FORBIDDEN_MODULES = ("torch", "ultralytics", "onnxruntime", "openvino")
+
+
+def measure_import(module, runs=3):
+    """
+    Импортирует модуль в отдельном процессе и разбирает вывод -X importtime
+
+    Returns:
+        tuple: (лучшее время в секундах, список (накопленное время в мкс, имя модуля) последнего запуска)
+    """
+    best = None
+    entries = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, cwd=os.getcwd()
+        )
+        elapsed = time.perf_counter() - started
+        if proc.returncode != 0:
+            print(proc.stderr[-2000:])
+            raise SystemExit(f"Не удалось импортировать {module}")
+        best = elapsed if best is None else min(best, elapsed)
+
+        entries = []
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            # Вложенность импорта обозначается отступом имени (по два пробела на уровень)
+            entries.append((int(cumulative), name[1:].rstrip()))
+    return best, entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Время импорта приложения")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="Сколько самых медленных модулей показать")
+    parser.add_argument("--max-seconds", type=float, default=None, help="Допустимое время импорта")
+    args = parser.parse_args()
+
+    best, entries = measure_import(args.module, args.runs)
+    print(f"Импорт {args.module}: {best:.2f} с (лучший из {args.runs}, вместе с запуском интерпретатора)")
+
+    # Прямые импорты проверяемого модуля (первый уровень вложенности)
+    direct = sorted(
+        ((cumulative, name.strip()) for cumulative, name in entries
+         if name.startswith("  ") and not name.startswith("    ")),
+        reverse=True
+    )
+    print(f"Самые медленные импорты {args.module}:")
+    for cumulative, name in direct[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} мс  {name}")
+
+    failed = False
+    loaded = {name.strip().split(".")[0] for _, name in entries}
+    forbidden = [name for name in FORBIDDEN_MODULES if name in loaded]
+    if forbidden:
+        print(f"ОШИБКА: при импорте загружены тяжелые модули: {', '.join(forbidden)}")
+        failed = True
+    if args.max_seconds is not None and best > args.max_seconds:
+        print(f"ОШИБКА: импорт дольше {args.max_seconds} с")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Нагрузочный тест работающего сервера: N имитируемых камер и M клиентов панели статистики.
+
+Камеры работают в одном из режимов:
+    push - клиент сам получает кадры из источника (synthetic, video, images - как в
+           CAMERA_SOURCES), кодирует их в JPEG и отправляет в /detect-image-binary;
+    live - клиент опрашивает /detect-live для камер с индексами --first-camera...,
+           которые на сервере настроены как источники кадров в CAMERA_SOURCES, например
+           CAMERA_SOURCES = {100 + i: "synthetic:1280x720@15" for i in range(8)}
+
+У каждой камеры не больше одного запроса в обработке (как у фронтенда): если сервер
+не успевает, фактическая частота кадров становится ниже заданной.
+
+Запуск (сервер уже запущен):
+    python -m benchmarks.load --cameras 8 --camera-fps 2 --dashboards 4 --duration 60
+    python -m benchmarks.load --mode live --cameras 4 --first-camera 100
+    python -m benchmarks.load --source images:debug_frames --output benchmarks/results/load.json
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+
+import cv2
+
+from app.ml.frame_sources import create_frame_source
+from benchmarks.report import summarize, save_results
+
+# Запросы одного обновления панели статистики (как у фронтенда)
+DASHBOARD_ENDPOINTS = [
+    "/api/v1/attendance",
+    "/api/v1/attendance-by-day",
+    "/api/v1/attendance-by-hour",
+    "/api/v1/cameras/latest",
+    "/api/v1/inference-queue",
+]
+
+
+class Client:
+    """
+    HTTP-клиент с постоянным соединением (отдельный на каждый поток)
+    """
+
+    def __init__(self, url, timeout=30.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        Returns:
+            tuple: (статус, заголовки, тело); статус 0 - ошибка соединения
+        """
+        for attempt in range(2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self._conn.request(method, path, body=body, headers=headers or {})
+                response = self._conn.getresponse()
+                return response.status, response.headers, response.read()
+            except (OSError, http.client.HTTPException) as e:
+                self._conn.close()
+                self._conn = None
+                if attempt:
+                    return 0, {}, str(e).encode()
+        return 0, {}, b""
+
+
+def parse_server_timing(value):
+    """
+    Время этапов из заголовка Server-Timing ("decode;dur=1.2, inference;dur=15.0")
+    """
+    stages = {}
+    for part in (value or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.startswith("dur="):
+            try:
+                stages[name] = float(params[4:])
+            except ValueError:
+                pass
+    return stages
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.stop_event = threading.Event()
+        self.started = None
+        self.measure_from = None
+        # (вид запроса, время от начала, задержка в мс, статус, данные ответа)
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def record(self, kind, latency_ms, status, info=None):
+        now = time.monotonic()
+        if now < self.measure_from:
+            return
+        with self._lock:
+            self.samples.append((kind, now - self.measure_from, latency_ms, status, info or {}))
+
+    def _timed(self, client, kind, method, path, body=None, headers=None):
+        started = time.perf_counter()
+        status, response_headers, data = client.request(method, path, body, headers)
+        latency_ms = (time.perf_counter() - started) * 1000
+        info = {"timing": parse_server_timing(response_headers.get("Server-Timing") if response_headers else None)}
+        if kind == "camera" and status == 200:
+            try:
+                result = json.loads(data)
+                info["inferred"] = result.get("inferred")
+                info["cached"] = result.get("cached")
+                info["error"] = result.get("error")
+            except ValueError:
+                pass
+        self.record(kind, latency_ms, status, info)
+        return status
+
+    def camera_push(self, index):
+        args = self.args
+        client = Client(args.url, args.timeout)
+        source = create_frame_source(args.source, seed=index)
+        # Частоту задает клиент: источник не должен ждать свои кадры
+        source.fps = None
+        path = f"/api/v1/detect-image-binary?compact=true&source=loadtest-camera-{index}"
+        if args.model:
+            path += f"&model_name={args.model}"
+        interval = 1.0 / args.camera_fps
+        next_frame = time.monotonic()
+        while not self.stop_event.is_set():
+            ok, frame = source.read()
+            if not ok:
+                break
+            scale = args.max_side / max(frame.shape[:2])
+            if scale < 1:
+                frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, args.jpeg_quality])[1].tobytes()
+            self._timed(client, "camera", "POST", path, jpeg, {"Content-Type": "image/jpeg"})
+            next_frame = max(next_frame + interval, time.monotonic())
+            self.stop_event.wait(next_frame - time.monotonic())
+        source.release()
+
+    def camera_live(self, index):
+        args = self.args
+        client = Client(args.url, args.timeout)
+        path = f"/api/v1/detect-live?compact=true&camera_id={args.first_camera + index}"
+        if args.model:
+            path += f"&model_name={args.model}"
+        interval = 1.0 / args.camera_fps
+        next_frame = time.monotonic()
+        while not self.stop_event.is_set():
+            self._timed(client, "camera", "GET", path)
+            next_frame = max(next_frame + interval, time.monotonic())
+            self.stop_event.wait(next_frame - time.monotonic())
+
+    def dashboard(self, index):
+        client = Client(self.args.url, self.args.timeout)
+        # Клиенты панели начинают обновление в разное время
+        if self.stop_event.wait(self.args.dashboard_interval * index / max(1, self.args.dashboards)):
+            return
+        while not self.stop_event.is_set():
+            cycle_started = time.monotonic()
+            for path in DASHBOARD_ENDPOINTS:
+                self._timed(client, f"dashboard {path}", "GET", path)
+            self.stop_event.wait(self.args.dashboard_interval - (time.monotonic() - cycle_started))
+
+    def run(self):
+        args = self.args
+        camera_target = self.camera_push if args.mode == "push" else self.camera_live
+        threads = [threading.Thread(target=camera_target, args=(i,), daemon=True) for i in range(args.cameras)]
+        threads += [threading.Thread(target=self.dashboard, args=(i,), daemon=True) for i in range(args.dashboards)]
+        self.started = time.monotonic()
+        self.measure_from = self.started + args.warmup
+        for thread in threads:
+            thread.start()
+        print(f"Нагрузка: {args.cameras} камер ({args.mode}, {args.camera_fps} кадр/с), "
+              f"{args.dashboards} клиентов панели; прогрев {args.warmup} с, замер {args.duration} с")
+        self.stop_event.wait(args.warmup + args.duration)
+        self.stop_event.set()
+        for thread in threads:
+            thread.join(timeout=args.timeout)
+        return self.report()
+
+    def report(self):
+        args = self.args
+        duration = args.duration
+        by_kind = defaultdict(list)
+        for sample in self.samples:
+            by_kind[sample[0]].append(sample)
+
+        results = {}
+        for kind, samples in sorted(by_kind.items()):
+            ok = [sample for sample in samples if sample[3] == 200 and not sample[4].get("error")]
+            stats = summarize([sample[2] for sample in ok]) if ok else {"runs": 0}
+            stats["requests"] = len(samples)
+            stats["errors"] = len(samples) - len(ok)
+            stats["status"] = dict(Counter(str(sample[3]) for sample in samples))
+            stats["requests_per_s"] = round(len(ok) / duration, 2)
+            timings = defaultdict(list)
+            for sample in ok:
+                for stage, value in sample[4].get("timing", {}).items():
+                    timings[stage].append(value)
+            stats["server_timing_ms"] = {stage: round(sum(values) / len(values), 2) for stage, values in timings.items()}
+            if kind == "camera":
+                stats["frames_per_s"] = stats["requests_per_s"]
+                stats["target_frames_per_s"] = args.cameras * args.camera_fps
+                stats["inferred"] = sum(1 for sample in ok if sample[4].get("inferred"))
+                stats["cached"] = sum(1 for sample in ok if sample[4].get("cached"))
+                # Кадры, рамки которых продвинул трекер без прохода модели
+                stats["tracked_only"] = sum(1 for sample in ok if "track" in sample[4]["timing"])
+            results[f"load.{kind}"] = stats
+        return results
+
+
+def print_report(results):
+    for name, stats in results.items():
+        print(name)
+        if stats.get("runs"):
+            print(f"  задержка: p50 {stats['median_ms']:.1f} мс, p95 {stats['p95_ms']:.1f} мс, p99 {stats['p99_ms']:.1f} мс")
+        print(f"  запросов: {stats['requests']}, ошибок: {stats['errors']}, статусы: {stats['status']}, "
+              f"{stats['requests_per_s']} в секунду")
+        if "frames_per_s" in stats:
+            print(f"  кадров в секунду: {stats['frames_per_s']} из {stats['target_frames_per_s']}, "
+                  f"через модель: {stats['inferred']}, из кэша: {stats['cached']}, трекером: {stats['tracked_only']}")
+        if stats["server_timing_ms"]:
+            print("  этапы на сервере (среднее, мс): " +
+                  ", ".join(f"{stage} {value}" for stage, value in stats["server_timing_ms"].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест: камеры и клиенты панели статистики")
+    parser.add_argument("--url", default="http://localhost:8000", help="Адрес сервера")
+    parser.add_argument("--cameras", type=int, default=4, help="Количество имитируемых камер")
+    parser.add_argument("--camera-fps", type=float, default=2.0, help="Кадров в секунду на камеру")
+    parser.add_argument("--mode", choices=("push", "live"), default="push",
+                        help="push - отправка кадров, live - опрос /detect-live")
+    parser.add_argument("--source", default="synthetic:1280x720",
+                        help="Источник кадров для режима push (как в CAMERA_SOURCES)")
+    parser.add_argument("--first-camera", type=int, default=100, help="Индекс первой камеры для режима live")
+    parser.add_argument("--max-side", type=int, default=640, help="Длинная сторона отправляемого кадра")
+    parser.add_argument("--jpeg-quality", type=int, default=80)
+    parser.add_argument("--model", default=None, help="Название модели детектора")
+    parser.add_argument("--dashboards", type=int, default=2, help="Количество клиентов панели статистики")
+    parser.add_argument("--dashboard-interval", type=float, default=5.0, help="Интервал обновления панели (секунд)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Длительность замера (секунд)")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Прогрев перед замером (секунд)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Таймаут запроса (секунд)")
+    parser.add_argument("--output", default=None, help="Сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    results = LoadTest(args).run()
+    print_report(results)
+    if args.output:
+        save_results(args.output, results, {"load": vars(args)})
+        print(f"Результаты сохранены: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Замеры этапов обработки кадра: декодирование base64 и JPEG, инференс YOLO
+при разных imgsz, разбор выхода модели и формирование ответа, запись посещаемости.
+"""
+import base64
+import datetime
+
+import cv2
+import numpy as np
+
+from app.api.v1.endpoints.detect import decode_base64, decode_image_bytes
+from app.core.attendance_writer import AttendanceWriter
+from app.core.config import DETECTOR_CONF_THRESHOLD, DETECTOR_IOU_THRESHOLD, DETECTOR_MAX_DET, FAKE_DETECTOR_COUNT
+from app.core.database import SessionLocal
+from app.ml.detector_base import Detections
+from app.ml.detector_backends import (
+    TorchDetector,
+    OnnxDetector,
+    OpenVinoDetector,
+    FakeDetector,
+    export_model,
+    postprocess,
+)
+from app.ml.frame_cache import content_hash
+from app.ml.yolo_detector import extract_detections, format_detections
+from benchmarks.report import measure
+
+
+def synthetic_frame(width=1280, height=720, seed=0):
+    """
+    Кадр аудитории без камеры: градиентный фон, «парты» и «головы»
+    (JPEG такого кадра сжимается примерно как снимок с камеры)
+    """
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(60, 200, width, dtype=np.float32)
+    img = np.repeat(np.tile(gradient, (height, 1))[:, :, None], 3, axis=2).astype(np.uint8)
+    for _ in range(40):
+        x, y = int(rng.integers(0, width - 80)), int(rng.integers(height // 3, height - 40))
+        cv2.rectangle(img, (x, y), (x + 80, y + 30), tuple(int(c) for c in rng.integers(40, 160, 3)), -1)
+        cv2.circle(img, (x + 40, y - 20), 18, tuple(int(c) for c in rng.integers(20, 220, 3)), -1)
+    noise = rng.normal(0, 6, img.shape)
+    return np.clip(img + noise, 0, 255).astype(np.uint8)
+
+
+def make_detector(backend, weights, imgsz):
+    """
+    Детектор бэкенда с заданным размером входа (экспорт .pt кэшируется в MODEL_CACHE_DIR)
+    """
+    if backend == "torch":
+        return TorchDetector(weights, imgsz)
+    if backend == "fake":
+        return FakeDetector(weights, FAKE_DETECTOR_COUNT)
+    path = export_model(weights, backend, imgsz) if weights.endswith(".pt") else weights
+    if backend == "onnx":
+        return OnnxDetector(path, imgsz)
+    return OpenVinoDetector(path, imgsz)
+
+
+def synthetic_prediction(num_classes=80, anchors=8400, objects=30, seed=0):
+    """
+    Выход YOLOv8 формы (4 + num_classes, anchors): несколько объектов, у каждого
+    несколько перекрывающихся рамок, остальное - шум с низкой уверенностью
+    """
+    rng = np.random.default_rng(seed)
+    prediction = np.zeros((4 + num_classes, anchors), np.float32)
+    prediction[0:2] = rng.uniform(0, 640, (2, anchors))
+    prediction[2:4] = rng.uniform(10, 120, (2, anchors))
+    prediction[4:] = rng.uniform(0, 0.05, (num_classes, anchors))
+    for i in range(objects):
+        candidates = rng.choice(anchors, 8, replace=False)
+        prediction[0:2, candidates] = rng.uniform(0, 640, (2, 1)) + rng.normal(0, 3, (2, 8))
+        prediction[2:4, candidates] = rng.uniform(30, 100, (2, 1))
+        prediction[4, candidates] = rng.uniform(0.3, 0.9, 8)
+    return prediction
+
+
+def bench_decode(results, frame, quality=90):
+    ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    image_bytes = jpeg.tobytes()
+    data_url = "data:image/jpeg;base64," + base64.b64encode(image_bytes).decode()
+    size = f"{frame.shape[1]}x{frame.shape[0]}"
+
+    results[f"pipeline.decode_base64.{size}"] = measure(lambda: decode_base64(data_url), repeat=50)
+    results[f"pipeline.decode_jpeg.{size}"] = measure(lambda: decode_image_bytes(image_bytes), repeat=30)
+    results[f"pipeline.frame_hash.{size}"] = measure(lambda: content_hash(image_bytes), repeat=50)
+
+
+def bench_inference(results, frame, backends, weights, imgsz_values, batch_sizes, repeat=10):
+    for backend in backends:
+        for imgsz in imgsz_values:
+            try:
+                detector = make_detector(backend, weights, imgsz)
+                detector.warmup(imgsz)
+            except Exception as e:
+                print(f"Пропускаем инференс {backend} imgsz={imgsz}: {e}")
+                continue
+            for batch_size in batch_sizes:
+                images = [frame] * batch_size
+                stats = measure(lambda: detector.predict(images), repeat=repeat, warmup=1)
+                stats["frames_per_s"] = round(batch_size * 1000 / stats["median_ms"], 2)
+                results[f"pipeline.inference.{backend}.imgsz{imgsz}.batch{batch_size}"] = stats
+
+
+def bench_postprocess(results, frame):
+    prediction = synthetic_prediction()
+    shape = frame.shape[:2]
+    ratio = 640 / max(shape)
+    results["pipeline.postprocess_nms"] = measure(
+        lambda: postprocess(prediction, ratio, (0, 0), shape,
+                            DETECTOR_CONF_THRESHOLD, DETECTOR_IOU_THRESHOLD, DETECTOR_MAX_DET),
+        repeat=50
+    )
+
+    rng = np.random.default_rng(0)
+    xyxy = rng.uniform(0, 600, (50, 4)).astype(np.float32)
+    detections = Detections(xyxy, rng.uniform(0, 1, 50).astype(np.float32), np.zeros(50, np.int64))
+    results["pipeline.format_boxes"] = measure(lambda: format_detections(*extract_detections(detections)), repeat=200)
+    results["pipeline.format_boxes_compact"] = measure(
+        lambda: format_detections(*extract_detections(detections), compact=True), repeat=200
+    )
+
+
+def bench_attendance_insert(results, label, batch_sizes=(1, 100, 1000), repeat=10):
+    """
+    Пропускная способность записи посещаемости (пакетная вставка и обновление агрегатов)
+    в текущую базу (benchmarks.dataset.use_database)
+    """
+    writer = AttendanceWriter(SessionLocal)
+    timestamp = datetime.datetime(2030, 1, 1, 9, 0)
+    for batch_size in batch_sizes:
+        def flush():
+            for i in range(batch_size):
+                writer.add(i % 40, timestamp + datetime.timedelta(seconds=i), lesson_number=1)
+            writer.flush()
+        stats = measure(flush, repeat=repeat, warmup=1)
+        stats["rows_per_s"] = round(batch_size * 1000 / stats["median_ms"], 1)
+        results[f"insert.{label}.batch{batch_size}"] = stats
+
+
+def run(results, backends, weights, imgsz_values, batch_sizes, frame_sizes=((1280, 720), (640, 480))):
+    for width, height in frame_sizes:
+        bench_decode(results, synthetic_frame(width, height))
+    frame = synthetic_frame(*frame_sizes[0])
+    bench_postprocess(results, frame)
+    if weights is not None or "fake" in backends:
+        bench_inference(results, frame, backends, weights, imgsz_values, batch_sizes)
+    else:
+        print("Файл весов модели не найден - инференс не замеряется (укажите --weights)")
@@ -0,0 +1,124 @@
+"""
+Замер времени, сохранение результатов в JSON и сравнение с сохраненной базовой линией.
+"""
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+
+def measure(fn, repeat=20, warmup=2, min_seconds=0.0):
+    """
+    Выполняет функцию несколько раз и возвращает статистику времени одного вызова
+
+    Args:
+        fn: Функция без аргументов
+        repeat: Минимальное количество замеров
+        warmup: Количество прогревочных вызовов (не учитываются)
+        min_seconds: Продолжать замеры, пока суммарное время меньше этого значения
+
+    Returns:
+        dict: Время в миллисекундах (min, median, p95, p99, mean) и количество замеров
+    """
+    for _ in range(warmup):
+        fn()
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < repeat or time.perf_counter() - started < min_seconds:
+        call_started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - call_started) * 1000)
+    return summarize(timings)
+
+
+def percentile(ordered, q):
+    """
+    Процентиль отсортированного списка (ближайшее значение снизу)
+    """
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def summarize(timings):
+    """
+    Статистика по списку замеров в миллисекундах
+    """
+    ordered = sorted(timings)
+    return {
+        "runs": len(ordered),
+        "min_ms": round(ordered[0], 4),
+        "median_ms": round(statistics.median(ordered), 4),
+        "p95_ms": round(percentile(ordered, 0.95), 4),
+        "p99_ms": round(percentile(ordered, 0.99), 4),
+        "mean_ms": round(statistics.fmean(ordered), 4),
+    }
+
+
+def environment():
+    """
+    Описание окружения, в котором выполнялись замеры
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit or None,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def save_results(path, results, meta=None):
+    """
+    Сохраняет результаты в JSON: {"meta": ..., "results": {название замера: статистика}}
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": {**environment(), **(meta or {})}, "results": results}, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Сравнивает медианы замеров с базовой линией
+
+    Args:
+        results: Текущие результаты
+        baseline: Результаты базовой линии
+        tolerance: Допустимое относительное замедление (0.2 - на 20%)
+
+    Returns:
+        tuple: (строки отчета, список замеров с замедлением больше допустимого)
+    """
+    lines = []
+    regressions = []
+    for name in sorted(set(results) & set(baseline)):
+        current, base = results[name].get("median_ms"), baseline[name].get("median_ms")
+        if current is None or not base:
+            continue
+        ratio = current / base
+        mark = ""
+        if ratio > 1 + tolerance:
+            mark = "  МЕДЛЕННЕЕ"
+            regressions.append(name)
+        elif ratio < 1 - tolerance:
+            mark = "  быстрее"
+        lines.append(f"{name:60s} {base:10.3f} -> {current:10.3f} мс  x{ratio:5.2f}{mark}")
+
+    missing = sorted(set(baseline) - set(results))
+    if missing:
+        lines.append(f"Нет в текущих результатах: {', '.join(missing)}")
+    return lines, regressions
@@ -0,0 +1,114 @@
+"""
+Набор замеров производительности: этапы обработки кадра и эндпоинты статистики
+на синтетических базах посещаемости.
+
+Запуск из корня проекта:
+    python -m benchmarks.run
+    python -m benchmarks.run --suite pipeline --backends torch,onnx --imgsz 320,480,640
+    python -m benchmarks.run --suite stats --sizes 10000,1000000,10000000 \\
+        --db sqlite --db "mysql+pymysql://root:@localhost/attendance_bench_{name}"
+
+Результаты сохраняются в JSON (--output). С --baseline медианы сравниваются
+с сохраненными результатами; с --fail-on-regression процесс завершается
+с кодом 1, если какой-либо замер медленнее базовой линии больше чем на --tolerance.
+"""
+import argparse
+import sys
+
+from app.core.config import DETECTOR_BACKEND, MODELS, INFERENCE_BATCH_SIZE
+from benchmarks.report import save_results, load_results, compare
+
+
+def parse_list(value, cast=str):
+    return [cast(item) for item in value.split(",") if item]
+
+
+def default_weights():
+    """
+    Веса модели по умолчанию - первый существующий путь из MODELS
+    """
+    from app.ml.model_registry import ModelRegistry
+    registry = ModelRegistry(MODELS)
+    for name in registry.models:
+        path = registry.resolve_path(name)
+        if path is not None:
+            return path
+    return None
+
+
+def run_stats(results, databases, sizes):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from benchmarks import dataset, pipeline, stats
+
+    meta = {}
+    # Без запуска событий startup: модель и фоновые потоки для замеров статистики не нужны
+    client = TestClient(app)
+    for template in databases:
+        db_label = "sqlite" if template == "sqlite" else template.split(":", 1)[0].split("+", 1)[0]
+        for rows in sizes:
+            url = dataset.database_url(template, str(rows))
+            info = dataset.ensure_dataset(url, rows)
+            meta[f"{db_label}.{rows}"] = info
+            print(f"Статистика: {db_label}, {rows} записей")
+            stats.run(results, client, f"{db_label}.{rows}", info["last_day"])
+
+        # Запись посещаемости - в отдельную базу, чтобы не менять наборы данных
+        dataset.use_database(dataset.database_url(template, "insert"))
+        dataset.clear_database()
+        print(f"Запись посещаемости: {db_label}")
+        pipeline.bench_attendance_insert(results, db_label)
+    return meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности")
+    parser.add_argument("--suite", default="pipeline,stats", help="Наборы замеров: pipeline, stats")
+    parser.add_argument("--backends", default=DETECTOR_BACKEND, help="Бэкенды детектора через запятую")
+    parser.add_argument("--weights", default=None, help="Файл весов модели (по умолчанию - из MODELS)")
+    parser.add_argument("--imgsz", default="320,480,640", help="Размеры входа модели через запятую")
+    parser.add_argument("--batch-sizes", default=f"1,{INFERENCE_BATCH_SIZE}", help="Размеры пакета инференса")
+    parser.add_argument("--sizes", default="10000", help="Размеры наборов данных (10000,1000000,10000000)")
+    parser.add_argument("--db", action="append", default=None,
+                        help="sqlite или шаблон URL MySQL с {name} (можно указать несколько раз)")
+    parser.add_argument("--output", default="benchmarks/results/latest.json", help="Файл результатов")
+    parser.add_argument("--baseline", default=None, help="Файл результатов для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Допустимое замедление (0.2 - 20%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    suites = parse_list(args.suite)
+    results = {}
+    meta = {}
+
+    if "pipeline" in suites:
+        from benchmarks import pipeline
+        weights = args.weights or default_weights()
+        backends = parse_list(args.backends)
+        meta["pipeline"] = {"weights": weights, "backends": backends}
+        print("Этапы обработки кадра")
+        pipeline.run(results, backends, weights, parse_list(args.imgsz, int), parse_list(args.batch_sizes, int))
+
+    if "stats" in suites:
+        meta["datasets"] = run_stats(results, args.db or ["sqlite"], parse_list(args.sizes, int))
+
+    for name, stats in sorted(results.items()):
+        extra = "".join(f"  {key}={stats[key]}" for key in ("frames_per_s", "rows_per_s") if key in stats)
+        print(f"{name:60s} {stats['median_ms']:10.3f} мс (p95 {stats['p95_ms']:.3f}){extra}")
+
+    save_results(args.output, results, meta)
+    print(f"Результаты сохранены: {args.output}")
+
+    if args.baseline:
+        lines, regressions = compare(results, load_results(args.baseline), args.tolerance)
+        print(f"Сравнение с {args.baseline}:")
+        for line in lines:
+            print("  " + line)
+        if regressions:
+            print(f"Замедление больше {args.tolerance:.0%}: {len(regressions)} замеров")
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
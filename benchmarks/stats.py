@@ -0,0 +1,52 @@
+"""
+Замеры эндпоинтов статистики посещаемости на синтетических базах разного размера.
+
+Кэшируемые эндпоинты замеряются дважды: с пустым кэшем статистики
+(запрос к БД) и с заполненным (ответ из кэша).
+"""
+from fastapi.testclient import TestClient
+
+from app.core.cache import stats_cache
+from benchmarks.report import measure
+
+
+def stats_endpoints(day):
+    """
+    Эндпоинты статистики: название замера -> (URL, кэшируется ли ответ)
+    """
+    return {
+        "attendance": ("/api/v1/attendance", False),
+        "by-lesson": (f"/api/v1/attendance/by-lesson?date={day}", True),
+        "daily-stats": (f"/api/v1/attendance/daily-stats?date={day}", True),
+        "lesson-stats": (f"/api/v1/attendance/lesson-stats?date={day}&lesson_number=1", True),
+        "by-day": ("/api/v1/attendance-by-day", True),
+        "by-hour": ("/api/v1/attendance-by-hour", True),
+        "history-page": ("/api/v1/attendance-history?limit=1000", False),
+        "export-day": (f"/api/v1/attendance/export?format=csv&date={day}", False),
+    }
+
+
+def run(results, client: TestClient, label, day, repeat=10):
+    """
+    Замеряет эндпоинты статистики на текущей базе (benchmarks.dataset.use_database)
+
+    Args:
+        label: Часть названия замера (база и размер набора данных)
+        day: Дата, за которую запрашивается статистика по дню и паре
+    """
+    for name, (url, cached) in stats_endpoints(day).items():
+        response = client.get(url)
+        if response.status_code != 200:
+            print(f"Пропускаем {name}: ответ {response.status_code} {response.text[:200]}")
+            continue
+
+        if not cached:
+            results[f"stats.{label}.{name}"] = measure(lambda: client.get(url), repeat=repeat, warmup=1)
+            continue
+
+        def cold():
+            stats_cache.clear()
+            client.get(url)
+
+        results[f"stats.{label}.{name}.cold"] = measure(cold, repeat=repeat, warmup=1)
+        results[f"stats.{label}.{name}.cached"] = measure(lambda: client.get(url), repeat=repeat, warmup=1)
@@ -25,6 +25,14 @@ ChartJS.register(
   Legend
 );
 
+// Идентификатор вкладки (новый при каждой загрузке страницы). Кадры каждой вкладки и каждой ее камеры -
+// отдельный источник: сервер сравнивает кадры и сопровождает людей только внутри источника
+const TAB_ID = window.crypto && window.crypto.randomUUID
+  ? window.crypto.randomUUID()
+  : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+
+const streamSource = (cameraIndex) => encodeURIComponent(`tab-${TAB_ID}:camera-${cameraIndex}`);
+
 function App() {
   // Состояние для авторизации
   const [isAuthenticated, setIsAuthenticated] = useState(false);
@@ -70,6 +78,8 @@ function App() {
   const canvasRef = useRef(null);
   const detectTimeoutRef = useRef(null);
   const streamRef = useRef(null);
+  // Профиль захвата кадров, который сообщает сервер (размер, качество JPEG, интервал)
+  const captureProfileRef = useRef({ max_side: 640, jpeg_quality: 0.8, interval_ms: 500 });
 
   // Получение списка доступных камер через MediaDevices API
   useEffect(() => {
@@ -272,7 +282,27 @@ function App() {
     }
   }, [tab, count]);
 
-  // Детекция людей каждую секунду
+  // Обновление профиля захвата: сервер подстраивает его под свою нагрузку
+  useEffect(() => {
+    if (tab !== "main") return;
+    
+    const fetchCaptureProfile = async () => {
+      try {
+        const res = await fetch(`http://10.241.1.170:8000/api/v1/capture-profile?source=${streamSource(selectedCamera)}`);
+        if (res.ok) {
+          captureProfileRef.current = await res.json();
+        }
+      } catch (e) {
+        console.error("Ошибка получения профиля захвата:", e);
+      }
+    };
+    
+    fetchCaptureProfile();
+    const intervalId = setInterval(fetchCaptureProfile, 10000);
+    return () => clearInterval(intervalId);
+  }, [tab, selectedCamera]);
+
+  // Детекция людей с интервалом из профиля захвата
   useEffect(() => {
     if (tab !== "main") return;
     
@@ -286,12 +316,17 @@ function App() {
         
         setError(null);
         
+      // Уменьшаем кадр до размера входа модели - больший кадр сервер все равно уменьшит
+      const profile = captureProfileRef.current;
+      const scale = Math.min(1, profile.max_side / Math.max(video.videoWidth, video.videoHeight));
       const canvas = document.createElement("canvas");
-      canvas.width = video.videoWidth;
-      canvas.height = video.videoHeight;
+      canvas.width = Math.round(video.videoWidth * scale);
+      canvas.height = Math.round(video.videoHeight * scale);
       const ctx = canvas.getContext("2d");
       ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
-      const dataUrl = canvas.toDataURL("image/jpeg");
+      // Отправляем кадр в двоичном виде (без base64 и JSON), это на треть меньше трафика
+      const blob = await new Promise((resolve) => canvas.toBlob(resolve, "image/jpeg", profile.jpeg_quality));
+      if (!blob) return;
         
         console.log("Отправка запроса на обнаружение...");
         
@@ -300,10 +335,10 @@ function App() {
         const timeoutId = setTimeout(() => controller.abort(), 5000); // 5 секунд таймаут
         
         try {
-          const res = await fetch("http://10.241.1.170:8000/api/v1/detect-image", {
+          const res = await fetch(`http://10.241.1.170:8000/api/v1/detect-image-binary?source=${streamSource(selectedCamera)}`, {
           method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({ image: dataUrl }),
+          headers: { "Content-Type": "image/jpeg" },
+          body: blob,
             signal: controller.signal
         });
           
@@ -322,8 +357,9 @@ function App() {
           // Вводим сглаживание - обновляем счетчик, только если разница значительная
           const newCount = data.count;
           
-          // Всегда обновляем счетчик, если вернулся положительный результат
-          if (newCount > 0) {
+          // Всегда обновляем счетчик, если вернулся положительный результат;
+          // количество по трекам сервера уже сглажено - его показываем как есть
+          if (newCount > 0 || data.tracked) {
             setCount(newCount);
             console.log("Обновлен счетчик:", newCount);
           } else {
@@ -340,7 +376,13 @@ function App() {
             }
           }
           
-        setBoxes(data.boxes || []);
+        // Рамки приходят в координатах уменьшенного кадра - переводим в координаты видео
+        setBoxes((data.boxes || []).map((box) => ({
+          xmin: box.xmin / scale,
+          ymin: box.ymin / scale,
+          xmax: box.xmax / scale,
+          ymax: box.ymax / scale,
+        })));
         if (data.error) {
           setError(data.error);
           }
@@ -367,12 +409,12 @@ function App() {
         
         setBoxes([]);
       } finally {
-        // Уменьшаем интервал между распознаваниями до 0.5 секунды
+        // Интервал между распознаваниями задает сервер (0.5 секунды без нагрузки)
         detectTimeoutRef.current = setTimeout(() => {
           if (tab === "main") {
             detect();
           }
-        }, 500);
+        }, captureProfileRef.current.interval_ms);
       }
     };
 
@@ -0,0 +1,55 @@
+import os
+import tempfile
+
+import app.core.config as config
+
+# Тесты работают с временной базой SQLite и тестовым бэкендом детектора (без весов и ultralytics).
+# Настройки меняются до импорта модулей приложения - они читают их при импорте
+_db_dir = tempfile.mkdtemp(prefix="attendance-tests-")
+config.DB_TYPE = "sqlite"
+config.DATABASE_URL = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+config.settings["DATABASE_URL"] = config.DATABASE_URL
+config.DETECTOR_BACKEND = "fake"
+config.MODEL_WARMUP_RUNS = 0
+
+import pytest  # noqa: E402
+
+from app.core.database import Base, SessionLocal, init_db  # noqa: E402
+
+
+def _clear_tables(session):
+    for table in reversed(Base.metadata.sorted_tables):
+        session.execute(table.delete())
+    session.commit()
+
+
+@pytest.fixture
+def db():
+    """
+    Сессия пустой временной базы (записи, оставленные запросами к API, удаляются до и после теста)
+    """
+    init_db()
+    session = SessionLocal()
+    _clear_tables(session)
+    try:
+        yield session
+    finally:
+        session.rollback()
+        _clear_tables(session)
+        session.close()
+
+
+@pytest.fixture(scope="session")
+def api_client():
+    """
+    Клиент запущенного приложения (startup/shutdown) с загруженной тестовой моделью.
+    Один на все тесты: при остановке приложения закрываются общие пулы потоков
+    """
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.ml import yolo_detector
+
+    with TestClient(app) as client:
+        assert yolo_detector.wait_until_ready(10)
+        yield client
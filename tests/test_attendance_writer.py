@@ -0,0 +1,97 @@
+import datetime
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import attendance_writer as writer_module
+from app.core.attendance_writer import AttendanceWriter
+from app.core.database import SessionLocal
+from app.models.student import Attendance, AttendanceLessonRollup
+
+# База, которую нельзя открыть (каталога нет) - OperationalError, как при недоступном сервере
+UnavailableSession = sessionmaker(bind=create_engine("sqlite:////nonexistent-attendance-dir/test.db"))
+
+START = datetime.datetime(2026, 3, 2, 9, 0)
+
+
+def make_writer(session_factory=SessionLocal, **kwargs):
+    return AttendanceWriter(session_factory, flush_size=1000, flush_interval=60, **kwargs)
+
+
+def test_rows_are_kept_while_database_is_unavailable(db):
+    writer = make_writer(UnavailableSession, max_retries=1)
+    for i in range(3):
+        writer.add(i + 1, START + datetime.timedelta(minutes=i), lesson_number=1)
+
+    # Недоступность БД не считается ошибкой в данных: повторы без ограничения
+    for _ in range(5):
+        assert writer.flush() == 0
+    assert writer.backlog == 3
+    assert writer.rows_dropped == 0
+
+    writer.session_factory = SessionLocal
+    assert writer.flush() == 3
+    assert [row.count for row in db.query(Attendance).order_by(Attendance.timestamp)] == [1, 2, 3]
+    assert db.query(AttendanceLessonRollup).one().total_records == 3
+
+
+def test_bad_row_is_dropped_after_max_retries(db):
+    writer = make_writer(max_retries=3)
+    writer.add(5, START, lesson_number=1)
+    # Строка, которую БД не примет (время не datetime)
+    writer._buffer.append({"timestamp": "not a time", "count": 1, "lesson_number": 1, "date": START.date()})
+    writer.add(7, START + datetime.timedelta(minutes=1), lesson_number=1)
+
+    for _ in range(2):
+        assert writer.flush() == 0
+        assert writer.backlog == 3
+    assert writer.rows_dropped == 0
+
+    assert writer.flush() == 2
+    assert writer.backlog == 0
+    assert writer.rows_dropped == 1
+    assert writer.failed_flushes == 3
+    assert sorted(row.count for row in db.query(Attendance)) == [5, 7]
+    assert db.query(AttendanceLessonRollup).one().sum_count == 12
+
+
+def test_overflow_drops_oldest_rows(db):
+    writer = make_writer(UnavailableSession, max_backlog=3)
+    for i in range(5):
+        writer.add(i, START + datetime.timedelta(minutes=i))
+    assert [row["count"] for row in writer._buffer] == [2, 3, 4]
+    assert writer.rows_dropped == 2
+
+    # Возвращенные после неудачного сброса записи тоже ограничены
+    writer.flush()
+    writer.add(5, START + datetime.timedelta(minutes=5))
+    assert [row["count"] for row in writer._buffer] == [3, 4, 5]
+    assert writer.rows_dropped == 3
+
+
+def test_background_thread_survives_flush_errors(db, monkeypatch):
+    calls = []
+
+    def failing_invalidate(tags):
+        calls.append(tags)
+        if len(calls) == 1:
+            raise RuntimeError("cache failure")
+        return 0
+
+    monkeypatch.setattr(writer_module.stats_cache, "invalidate_tags", failing_invalidate)
+    writer = AttendanceWriter(SessionLocal, flush_size=1, flush_interval=60)
+    writer.start()
+    try:
+        writer.add(1, START)
+        deadline = time.monotonic() + 5
+        while not calls and time.monotonic() < deadline:
+            time.sleep(0.01)
+        writer.add(2, START + datetime.timedelta(minutes=1))
+        while len(calls) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer._thread.is_alive()
+        assert len(calls) == 2
+    finally:
+        writer.stop()
+    assert db.query(Attendance).count() == 2
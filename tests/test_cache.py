@@ -0,0 +1,55 @@
+import time
+
+from app.core.cache import TTLCache
+
+
+def test_invalidate_tags_removes_only_tagged_entries():
+    cache = TTLCache("test", max_entries=10, ttl=60)
+    cache.store("by-day", 1, tags=("date:2026-01-01",))
+    cache.store("by-lesson", 2, tags=("date:2026-01-01", "lesson:1"))
+    cache.store("by-hour", 3, tags=("date:2026-01-02",))
+
+    assert cache.invalidate_tags(["date:2026-01-01"]) == 2
+
+    assert cache.lookup("by-day") == (False, None)
+    assert cache.lookup("by-lesson") == (False, None)
+    assert cache.lookup("by-hour") == (True, 3)
+    assert cache.invalidations == 2
+
+
+def test_value_computed_before_invalidation_is_not_stored():
+    cache = TTLCache("test", max_entries=10, ttl=60)
+    tags = ("date:2026-01-01",)
+    versions = cache.versions(tags)
+    # Пока значение вычислялось, в БД появились новые записи
+    cache.invalidate_tags(tags)
+    cache.store("stats", "stale", tags, versions)
+
+    assert cache.lookup("stats") == (False, None)
+
+
+def test_get_or_compute_caches_until_invalidated():
+    cache = TTLCache("test", max_entries=10, ttl=60)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_compute("stats", compute, tags=("lesson:1",)) == 1
+    assert cache.get_or_compute("stats", compute, tags=("lesson:1",)) == 1
+    cache.invalidate_tags(["lesson:1"])
+    assert cache.get_or_compute("stats", compute, tags=("lesson:1",)) == 2
+
+
+def test_entries_expire_and_lru_is_evicted():
+    cache = TTLCache("test", max_entries=2, ttl=0.05)
+    cache.store("a", 1)
+    cache.store("b", 2)
+    cache.lookup("a")
+    cache.store("c", 3)
+
+    assert cache.lookup("b") == (False, None)
+    assert cache.evictions == 1
+    time.sleep(0.06)
+    assert cache.lookup("a") == (False, None)
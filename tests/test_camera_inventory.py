@@ -0,0 +1,28 @@
+import time
+
+from app.ml.camera_inventory import CameraInventory
+
+
+def test_failed_first_refresh_is_retried_by_background_thread():
+    inventory = CameraInventory(refresh_interval=60, poll_interval=0.01)
+    calls = []
+
+    def refresh():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError("probe failed")
+        inventory._cameras = [{"id": 0, "name": "Камера 0", "device": None}]
+        inventory._signature = inventory._device_signature()
+        return inventory._cameras
+
+    inventory.refresh = refresh
+    inventory.start()
+    try:
+        deadline = time.monotonic() + 5
+        while inventory._cameras is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert inventory._thread.is_alive()
+        assert inventory._cameras is not None
+        assert len(calls) == 2
+    finally:
+        inventory.stop()
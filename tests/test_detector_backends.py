@@ -0,0 +1,25 @@
+import os
+
+from app.ml.detector_backends import export_path
+
+
+def test_export_cache_separates_weights_with_same_name(tmp_path):
+    first, second = tmp_path / "train2" / "best.pt", tmp_path / "train5" / "best.pt"
+    for path in (first, second):
+        path.parent.mkdir()
+        path.write_bytes(b"weights")
+    os.utime(second, ns=(os.stat(first).st_atime_ns, os.stat(first).st_mtime_ns))
+
+    assert export_path(str(first), "onnx", 640) != export_path(str(second), "onnx", 640)
+    assert export_path(str(first), "onnx", 640) == export_path(str(first), "onnx", 640)
+    assert export_path(str(first), "onnx", 640) != export_path(str(first), "onnx", 320)
+    assert export_path(str(first), "openvino", 640).endswith("_openvino_model")
+
+
+def test_export_cache_changes_when_weights_are_replaced(tmp_path):
+    weights = tmp_path / "best.pt"
+    weights.write_bytes(b"old")
+    before = export_path(str(weights), "onnx", 640)
+
+    weights.write_bytes(b"retrained")
+    assert export_path(str(weights), "onnx", 640) != before
@@ -0,0 +1,89 @@
+import csv
+import datetime
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.export import _iter_chunks
+from app.main import app
+from app.models.student import Attendance
+
+START = datetime.datetime(2026, 3, 2, 9, 0)
+
+
+@pytest.fixture
+def records(db):
+    """
+    Записи с повторяющимся временем: по три подряд с одинаковым timestamp
+    """
+    rows = [Attendance(timestamp=START + datetime.timedelta(minutes=i // 3), count=i + 1, date=START.date())
+            for i in range(10)]
+    db.add_all(rows)
+    db.commit()
+    return [(row.id, row.timestamp) for row in sorted(rows, key=lambda row: (row.timestamp, row.id))]
+
+
+@pytest.fixture
+def client():
+    # Без запуска приложения (startup): модель для выгрузок не нужна
+    return TestClient(app)
+
+
+def test_pages_forward_split_equal_timestamps_without_gaps(client, records):
+    seen, params = [], {"limit": 4}
+    while True:
+        page = client.get("/api/v1/attendance-history", params={**params, "format": "ndjson"})
+        items = [json.loads(line) for line in page.text.splitlines()]
+        if not items:
+            break
+        seen += [item["id"] for item in items]
+        params = {"limit": 4, "after_timestamp": items[-1]["timestamp"], "after_id": items[-1]["id"]}
+
+    assert seen == [record_id for record_id, _ in records]
+
+
+def test_pages_backward_split_equal_timestamps_without_gaps(client, records):
+    seen, params = [], {"limit": 4}
+    while True:
+        items = client.get("/api/v1/attendance", params=params).json()
+        if not items:
+            break
+        seen += [item["id"] for item in items]
+        params = {"limit": 4, "before_timestamp": items[-1]["timestamp"], "before_id": items[-1]["id"]}
+
+    assert seen == [record_id for record_id, _ in reversed(records)]
+
+
+@pytest.mark.parametrize("fmt", ["json", "ndjson", "csv"])
+def test_streamed_export_is_well_formed(client, records, fmt):
+    response = client.get("/api/v1/attendance/export", params={"format": fmt})
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == f'attachment; filename="attendance.{fmt}"'
+
+    if fmt == "json":
+        items = response.json()
+    elif fmt == "ndjson":
+        assert response.text.endswith("\n")
+        items = [json.loads(line) for line in response.text.splitlines()]
+    else:
+        items = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(item["id"]) for item in items] == [record_id for record_id, _ in records]
+    assert [datetime.datetime.fromisoformat(item["timestamp"]) for item in items] == [ts for _, ts in records]
+
+
+@pytest.mark.parametrize("fmt", ["json", "ndjson"])
+def test_chunk_boundaries_keep_output_valid(records, fmt):
+    def build_query(db):
+        return db.query(Attendance.id, Attendance.count).order_by(Attendance.id)
+
+    chunks = list(_iter_chunks(build_query, ["id", "count"], fmt, chunk_size=3))
+    assert len(chunks) > 3
+    text = "".join(chunks)
+    items = json.loads(text) if fmt == "json" else [json.loads(line) for line in text.splitlines()]
+    assert [item["count"] for item in items] == list(range(1, 11))
+
+
+def test_empty_export_is_valid_json(client, db):
+    assert client.get("/api/v1/attendance-history").json() == []
@@ -0,0 +1,65 @@
+import cv2
+import numpy as np
+import pytest
+
+from app.ml import yolo_detector
+from app.ml.frame_cache import frame_cache
+from app.ml.tracker import get_tracker
+from app.ml.yolo_detector import BOX_KEYS
+
+URL = "/api/v1/detect-image-binary"
+
+
+def jpeg(width, height, quality=90, seed=0):
+    img = np.random.default_rng(seed).integers(0, 256, (height, width, 3), np.uint8)
+    ok, encoded = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    assert ok
+    return encoded.tobytes()
+
+
+def detect(client, body, source):
+    response = client.post(URL, params={"source": source}, content=body,
+                           headers={"Content-Type": "image/jpeg"})
+    assert response.status_code == 200
+    return response.json()
+
+
+def boxes(result):
+    return [[box[key] for key in BOX_KEYS] for box in result["boxes"]]
+
+
+@pytest.fixture
+def client(api_client):
+    frame_cache.clear()
+    return api_client
+
+
+def test_cached_frame_goes_through_requesting_source_tracker(client):
+    frame = jpeg(640, 480)
+    first = detect(client, frame, "cache-a")
+    assert first["inferred"] is True and not first.get("cached")
+
+    # У источника B другие люди на других местах (рамки тестового бэкенда зависят от размера кадра)
+    own = detect(client, jpeg(320, 240, seed=1), "cache-b")
+    assert own["count"] == 3
+
+    reused = detect(client, frame, "cache-b")
+    assert reused["cached"] is True and reused["inferred"] is False
+    assert reused["tracked"] is True
+    # Ответ построен треками B, а не скопирован из результата источника A
+    assert boxes(reused) != boxes(first)
+    assert sorted(box["id"] for box in reused["boxes"]) == sorted(box["id"] for box in own["boxes"])
+    np.testing.assert_allclose(boxes(reused), boxes(own), atol=2)
+    # Детекции из кэша дошли до трекера B: появились новые (пока неподтвержденные) треки
+    assert len(get_tracker(f"cache-b|{yolo_detector.registry.model_key()}").tracks) == 6
+
+
+def test_result_reused_without_inference_is_not_cached(client):
+    detect(client, jpeg(640, 480, seed=2), "cache-c")
+    # Тот же кадр с другим сжатием JPEG: сцена не изменилась, модель не вызывается
+    recompressed = jpeg(640, 480, quality=70, seed=2)
+    reused = detect(client, recompressed, "cache-c")
+    assert reused["inferred"] is False and not reused.get("cached")
+
+    other = detect(client, recompressed, "cache-d")
+    assert other["inferred"] is True and not other.get("cached")
@@ -0,0 +1,128 @@
+import threading
+
+import pytest
+
+from app.ml.inference_batcher import InferenceBatcher, QueueFullError
+
+
+def double(images):
+    return [img * 2 for img in images]
+
+
+@pytest.fixture
+def batches():
+    return []
+
+
+def test_concurrent_submits_are_batched_and_results_routed(batches):
+    def infer(images):
+        batches.append(len(images))
+        return double(images)
+
+    batcher = InferenceBatcher(infer, max_batch_size=8, max_wait_ms=200)
+    try:
+        futures = [batcher.submit(i) for i in range(5)]
+        assert [future.result(2) for future in futures] == [0, 2, 4, 6, 8]
+        assert batches == [5]
+        assert batcher.stats()["last_batch_size"] == 5
+    finally:
+        batcher.stop()
+
+
+def test_batch_is_limited_by_max_batch_size(batches):
+    def infer(images):
+        batches.append(len(images))
+        return double(images)
+
+    batcher = InferenceBatcher(infer, max_batch_size=3, max_wait_ms=200)
+    try:
+        futures = [batcher.submit(i) for i in range(7)]
+        assert [future.result(2) for future in futures] == [i * 2 for i in range(7)]
+        assert max(batches) == 3
+        assert sum(batches) == 7
+    finally:
+        batcher.stop()
+
+
+def test_queue_overflow_raises_and_stop_fails_pending():
+    started, release = threading.Event(), threading.Event()
+
+    def blocking(images):
+        started.set()
+        release.wait(2)
+        return double(images)
+
+    batcher = InferenceBatcher(blocking, max_batch_size=1, max_wait_ms=0, max_queue_size=2)
+    try:
+        running = batcher.submit(1)
+        assert started.wait(2)
+        pending = [batcher.submit(2), batcher.submit(3)]
+        with pytest.raises(QueueFullError):
+            batcher.submit(4)
+    finally:
+        release.set()
+    assert running.result(2) == 2
+
+    batcher.stop()
+    for future in pending:
+        if future.exception(2) is not None:
+            assert isinstance(future.exception(), RuntimeError)
+    with pytest.raises(RuntimeError):
+        batcher.submit(5)
+
+
+def test_infer_fn_error_is_passed_to_every_caller():
+    def failing(images):
+        raise ValueError("bad batch")
+
+    batcher = InferenceBatcher(failing, max_batch_size=4, max_wait_ms=100)
+    try:
+        futures = [batcher.submit(i) for i in range(3)]
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result(2)
+    finally:
+        batcher.stop()
+
+
+def test_short_result_list_fails_callers_without_results():
+    batcher = InferenceBatcher(lambda images: double(images)[:1], max_batch_size=4, max_wait_ms=200)
+    try:
+        futures = [batcher.submit(i) for i in range(3)]
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result(2)
+        # Поток планировщика продолжает работать
+        assert batcher.submit(5).result(2) == 10
+        assert batcher._thread.is_alive()
+    finally:
+        batcher.stop()
+
+
+def test_error_after_partial_results_keeps_delivered_results():
+    class Results(list):
+        def __iter__(self):
+            yield 0
+            raise ValueError("broken result list")
+
+    batcher = InferenceBatcher(lambda images: Results(images), max_batch_size=4, max_wait_ms=200)
+    try:
+        first, second = batcher.submit(0), batcher.submit(1)
+        assert first.result(2) == 0
+        with pytest.raises(ValueError):
+            second.result(2)
+        assert batcher._thread.is_alive()
+    finally:
+        batcher.stop()
+
+
+def test_infer_times_out_and_leaves_the_queue():
+    release = threading.Event()
+    batcher = InferenceBatcher(lambda images: release.wait(2) and double(images), max_batch_size=1, max_wait_ms=0)
+    try:
+        batcher.submit(1)
+        with pytest.raises(TimeoutError):
+            batcher.infer(2, timeout=0.05)
+    finally:
+        release.set()
+        batcher.stop()
@@ -0,0 +1,27 @@
+from app.core import metrics
+from app.core.metrics import camera_label, set_known_cameras, task_labels
+
+
+def test_unknown_camera_ids_share_one_label(monkeypatch):
+    monkeypatch.setattr(metrics, "_known_cameras", metrics._known_cameras)
+    set_known_cameras([0, 2])
+
+    assert camera_label(0) == "0"
+    assert camera_label("2") == "2"
+    assert camera_label(123456) == "other"
+    assert camera_label("") == ""
+
+    set_known_cameras([5])
+    assert camera_label(0) == "other"
+    assert camera_label(5) == "5"
+
+
+def test_stage_series_use_limited_camera_label(monkeypatch):
+    monkeypatch.setattr(metrics, "_known_cameras", metrics._known_cameras)
+    set_known_cameras([1])
+    for camera_id in (1, 1000, 1001):
+        with task_labels("test-camera-label", camera_id):
+            metrics.observe_stage("decode", 0.01)
+
+    series = {labels for labels in metrics.stage_seconds._series if labels[1] == "test-camera-label"}
+    assert {labels[2] for labels in series} == {"1", "other"}
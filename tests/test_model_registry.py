@@ -0,0 +1,68 @@
+import time
+
+import numpy as np
+import pytest
+
+from app.ml.model_registry import ModelRegistry, ModelNotFoundError
+
+MODELS = {"main": ["yolov8n.pt"], "extra": ["runs/detect/extra/weights/extra.pt"]}
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def registry():
+    registry = ModelRegistry(MODELS)
+    assert registry.wait_until_ready(10)
+    yield registry
+    registry.stop()
+
+
+def test_swap_keeps_old_slot_until_its_requests_finish(registry):
+    old = registry.acquire("main")
+    assert old.key == "main:1"
+
+    new = registry.load("main")
+    assert new.key == "main:2"
+    assert registry.model_key("main") == "main:2"
+
+    # Принятый до замены запрос дорабатывает на старой модели
+    assert len(old.batcher.infer(np.zeros((480, 640, 3), np.uint8), timeout=5)) == 3
+    time.sleep(0.1)
+    assert not old.batcher._stop_event.is_set()
+
+    old.release()
+    assert wait_for(old.batcher._stop_event.is_set)
+    assert not new.batcher._stop_event.is_set()
+
+
+def test_unload_drains_and_default_cannot_be_unloaded(registry):
+    assert registry.default_name == "main"
+    with pytest.raises(ValueError):
+        registry.unload("main")
+
+    extra = registry.load("extra")
+    registry.unload("extra")
+    assert wait_for(extra.batcher._stop_event.is_set)
+    with pytest.raises(ModelNotFoundError):
+        registry.unload("extra")
+
+
+def test_load_rejects_weights_outside_allowed_dirs(registry, tmp_path):
+    outside = tmp_path / "evil.pt"
+    outside.write_bytes(b"")
+
+    assert registry.path_allowed("runs/detect/new/weights/best.pt")
+    assert registry.path_allowed("yolov8n.pt")
+    assert not registry.path_allowed(str(outside))
+    assert not registry.path_allowed("runs/detect/../../etc/passwd")
+    with pytest.raises(PermissionError):
+        registry.load("main", str(outside))
+    assert registry.model_key("main") == "main:1"
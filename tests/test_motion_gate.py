@@ -0,0 +1,38 @@
+import cv2
+import numpy as np
+
+URL = "/api/v1/detect-image-binary"
+
+
+def jpeg(quality, seed=0):
+    img = np.random.default_rng(seed).integers(0, 256, (480, 640, 3), np.uint8)
+    ok, encoded = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    assert ok
+    return encoded.tobytes()
+
+
+def detect(client, body, source=None):
+    params = {"source": source} if source is not None else {}
+    response = client.post(URL, params=params, content=body, headers={"Content-Type": "image/jpeg"})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_unchanged_frame_of_same_source_skips_inference(api_client):
+    assert detect(api_client, jpeg(90, seed=10), "gate-a")["inferred"] is True
+    # Тот же кадр с другим сжатием JPEG (другие байты - мимо кэша кадров)
+    reused = detect(api_client, jpeg(70, seed=10), "gate-a")
+    assert reused["inferred"] is False and not reused.get("cached")
+
+
+def test_gate_is_not_shared_between_sources(api_client):
+    detect(api_client, jpeg(90, seed=11), "gate-b")
+    assert detect(api_client, jpeg(70, seed=11), "gate-c")["inferred"] is True
+
+
+def test_frames_without_source_are_always_inferred(api_client):
+    # Клиенты за одним адресом (вкладки, NAT) не должны получать чужие результаты
+    detect(api_client, jpeg(90, seed=12))
+    result = detect(api_client, jpeg(70, seed=12))
+    assert result["inferred"] is True
+    assert result.get("tracked") is None
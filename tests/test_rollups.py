@@ -0,0 +1,61 @@
+import datetime
+
+from app.core.rollups import apply_rollups, rebuild_rollups
+from app.models.student import Attendance, AttendanceLessonRollup, AttendanceHourRollup, AttendanceWeekdayRollup
+
+
+def row(timestamp, count, lesson_number=1):
+    return {"timestamp": timestamp, "count": count, "lesson_number": lesson_number, "date": timestamp.date()}
+
+
+def snapshot(db):
+    return (
+        sorted((r.date, r.lesson_number, r.sum_count, r.max_count, r.total_records, r.last_count)
+               for r in db.query(AttendanceLessonRollup)),
+        sorted((r.hour, r.sum_count, r.max_count, r.total_records) for r in db.query(AttendanceHourRollup)),
+        sorted((r.weekday, r.sum_count, r.max_count, r.total_records) for r in db.query(AttendanceWeekdayRollup)),
+    )
+
+
+def test_upsert_accumulates_across_batches(db):
+    start = datetime.datetime(2026, 3, 2, 9, 0)
+    apply_rollups(db, [row(start, 10), row(start + datetime.timedelta(minutes=5), 12)])
+    db.commit()
+    # Второй пакет: более ранняя запись не должна менять последнее количество пары
+    apply_rollups(db, [row(start + datetime.timedelta(minutes=10), 7), row(start - datetime.timedelta(minutes=1), 30)])
+    db.commit()
+
+    lesson = db.query(AttendanceLessonRollup).one()
+    assert (lesson.sum_count, lesson.max_count, lesson.total_records) == (59, 30, 4)
+    assert lesson.last_count == 7
+    assert lesson.last_timestamp == start + datetime.timedelta(minutes=10)
+
+    hours = {r.hour: (r.sum_count, r.total_records) for r in db.query(AttendanceHourRollup)}
+    assert hours == {9: (29, 3), 8: (30, 1)}
+    weekday = db.query(AttendanceWeekdayRollup).one()
+    assert (weekday.weekday, weekday.total_records) == (start.weekday(), 4)
+
+
+def test_rows_without_lesson_update_only_hour_and_weekday(db):
+    timestamp = datetime.datetime(2026, 3, 2, 23, 0)
+    apply_rollups(db, [row(timestamp, 3, lesson_number=None)])
+    db.commit()
+
+    assert db.query(AttendanceLessonRollup).count() == 0
+    assert db.query(AttendanceHourRollup).one().sum_count == 3
+
+
+def test_incremental_rollups_match_rebuild(db):
+    start = datetime.datetime(2026, 3, 2, 8, 40)
+    rows = [row(start + datetime.timedelta(hours=i, minutes=7 * i), i % 5 + 1, lesson_number=i % 3 + 1)
+            for i in range(12)]
+    for batch in (rows[:5], rows[5:]):
+        db.execute(Attendance.__table__.insert(), batch)
+        apply_rollups(db, batch)
+        db.commit()
+    incremental = snapshot(db)
+
+    rebuild_rollups(db)
+    db.commit()
+
+    assert snapshot(db) == incremental
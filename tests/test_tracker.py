@@ -0,0 +1,127 @@
+import time
+
+import numpy as np
+
+from app.api.v1.endpoints import detect
+from app.core.config import CONFIDENCE_THRESHOLD, COUNT_ADJUSTMENT, TRACKER_MIN_HITS, TRACKER_COUNT_GRACE, TRACKER_MAX_AGE
+from app.ml.tracker import ByteTracker, get_tracker
+
+PEOPLE = np.array([[10, 10, 60, 110], [200, 20, 250, 120], [400, 30, 450, 130]], np.float64)
+CONF = np.full(3, 0.9, np.float32)
+
+
+def test_first_frame_tracks_are_confirmed_immediately():
+    tracker = ByteTracker("first")
+    xyxy, conf, ids = tracker.update(PEOPLE, CONF)
+
+    assert len(ids) == 3
+    np.testing.assert_allclose(xyxy, PEOPLE, atol=1)
+
+
+def test_new_person_is_counted_after_min_hits_and_forces_inference():
+    tracker = ByteTracker("new-person", infer_every=100)
+    tracker.update(PEOPLE, CONF)
+    newcomer = np.vstack([PEOPLE, [[550, 40, 600, 140]]])
+    conf = np.full(4, 0.9, np.float32)
+
+    for _ in range(TRACKER_MIN_HITS - 1):
+        _, _, ids = tracker.update(newcomer, conf)
+        assert len(ids) == 3
+        # Неподтвержденный трек подтверждается только проходами модели
+        assert tracker.needs_inference()
+
+    _, _, ids = tracker.update(newcomer, conf)
+    assert len(ids) == 4
+    assert not tracker.needs_inference()
+
+
+def test_single_false_detection_does_not_change_count():
+    tracker = ByteTracker("false-positive")
+    tracker.update(PEOPLE, CONF)
+    _, _, ids = tracker.update(np.vstack([PEOPLE, [[550, 40, 600, 140]]]), np.full(4, 0.9, np.float32))
+    assert len(ids) == 3
+    _, _, ids = tracker.update(PEOPLE, CONF)
+    assert len(ids) == 3
+    assert len(tracker.tracks) == 3
+
+
+def test_predict_moves_boxes_with_velocity():
+    tracker = ByteTracker("moving", infer_every=100)
+    step = np.array([5, 0, 5, 0], np.float64)
+    for i in range(6):
+        tracker.update(PEOPLE + i * step, CONF)
+
+    xyxy, _, ids = tracker.predict()
+    assert len(ids) == 3
+    # Рамки продолжают движение вправо без прохода модели
+    assert np.all(xyxy[:, 0] > PEOPLE[:, 0] + 5 * step[0])
+
+
+def test_missed_person_is_counted_within_grace_and_removed_after_max_age():
+    tracker = ByteTracker("missed")
+    tracker.update(PEOPLE, CONF)
+
+    for _ in range(TRACKER_COUNT_GRACE):
+        _, _, ids = tracker.update(PEOPLE[:2], CONF[:2])
+        assert len(ids) == 3
+    _, _, ids = tracker.update(PEOPLE[:2], CONF[:2])
+    assert len(ids) == 2
+
+    for _ in range(TRACKER_MAX_AGE):
+        tracker.update(PEOPLE[:2], CONF[:2])
+    assert len(tracker.tracks) == 2
+
+
+def test_needs_inference_every_n_frames_and_after_max_skip():
+    tracker = ByteTracker("schedule", infer_every=3, max_skip_seconds=60)
+    assert tracker.needs_inference()
+    tracker.update(PEOPLE, CONF)
+
+    assert not tracker.needs_inference()
+    tracker.predict()
+    assert not tracker.needs_inference()
+    tracker.predict()
+    assert tracker.needs_inference()
+
+    tracker = ByteTracker("stale", infer_every=100, max_skip_seconds=0.01)
+    tracker.update(PEOPLE, CONF)
+    assert not tracker.needs_inference()
+    time.sleep(0.02)
+    assert tracker.needs_inference()
+
+
+def test_trackers_are_separate_per_source():
+    first = get_tracker("test-source-a")
+    assert get_tracker("test-source-a") is first
+    assert get_tracker("test-source-b") is not first
+
+
+def test_low_confidence_person_is_counted_after_min_hits():
+    # Детекции от порога модели до TRACKER_HIGH_THRESHOLD тоже начинают треки
+    tracker = ByteTracker("low-confidence", infer_every=100)
+    tracker.update(PEOPLE, CONF)
+    newcomer = np.vstack([PEOPLE, [[550, 40, 600, 140]]])
+    conf = np.append(CONF, CONFIDENCE_THRESHOLD + 0.05).astype(np.float32)
+
+    for _ in range(TRACKER_MIN_HITS - 1):
+        assert len(tracker.update(newcomer, conf)[2]) == 3
+    assert len(tracker.update(newcomer, conf)[2]) == 4
+
+
+def test_first_frame_count_matches_model_threshold():
+    tracker = ByteTracker("first-low")
+    conf = np.array([0.9, CONFIDENCE_THRESHOLD + 0.01, 0.2], np.float32)
+    assert len(tracker.update(PEOPLE, conf)[2]) == 3
+
+
+def record(monkeypatch, result):
+    rows = []
+    monkeypatch.setattr(detect, "last_db_save_time", 0)
+    monkeypatch.setattr(detect.attendance_writer, "add", lambda count, timestamp: rows.append(count))
+    detect.record_detection(result)
+    return rows
+
+
+def test_tracked_count_is_recorded_without_adjustment(monkeypatch):
+    assert record(monkeypatch, {"count": 3, "boxes": [], "tracked": True}) == [3]
+    assert record(monkeypatch, {"count": 3, "boxes": []}) == [3 - COUNT_ADJUSTMENT]
@@ -57,4 +57,5 @@ for record in records:
 # Закрываем соединение
 conn.close()
 
-print("Готово! Тестовые данные добавлены в базу данных.") 
\ No newline at end of file
+print("Готово! Тестовые данные добавлены в базу данных.")
+print("Для обновления статистики пересчитайте агрегаты: python -m utils.backfill_rollups")
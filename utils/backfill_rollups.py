@@ -0,0 +1,21 @@
+from app.core.database import SessionLocal, init_db
+from app.core.rollups import rebuild_rollups
+
+def backfill_rollups():
+    """
+    Разовое заполнение таблиц агрегатов по уже накопленным записям посещаемости.
+    
+    Запускать после миграции при остановленном приложении:
+    python -m utils.backfill_rollups
+    """
+    init_db()
+    db = SessionLocal()
+    try:
+        print("Пересчитываем агрегаты посещаемости...")
+        rebuild_rollups(db)
+        print("Агрегаты успешно заполнены!")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    backfill_rollups()
@@ -20,6 +20,12 @@ print(f"Количество записей до удаления: {count_before
 
 # Удаляем все записи из таблицы attendance
 cursor.execute("DELETE FROM attendance")
+
+# Очищаем таблицы агрегатов, если они созданы, чтобы статистика не расходилась с данными
+for table in ("attendance_lesson_rollup", "attendance_hour_rollup", "attendance_weekday_rollup"):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    if cursor.fetchone():
+        cursor.execute(f"DELETE FROM {table}")
 conn.commit()
 
 # Проверяем количество записей после удаления